@@ -0,0 +1,232 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+# Prueba de rendimiento de la extracción de canales contra el servidor local
+# de fake_youtube.py. Mide videos por segundo, latencia por video (p50/p99),
+# memoria máxima y llamadas a la API, sin usar los servicios reales.
+
+
+def _serve(config_kwargs, connection):
+    """Proceso del servidor: envía su URL por `connection` y atiende solicitudes."""
+    from fake_youtube import FakeYouTubeConfig, FakeYouTubeServer
+    server = FakeYouTubeServer(('127.0.0.1', 0), FakeYouTubeConfig(**config_kwargs))
+    connection.send(server.url)
+    connection.close()
+    server.serve_forever()
+
+
+def start_server_process(**config_kwargs):
+    """Arranca fake_youtube en otro proceso (para no competir por el GIL ni sumar su memoria).
+
+    Devuelve `(proceso, url)`.
+    """
+    parent, child = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_serve, args=(config_kwargs, child), daemon=True)
+    process.start()
+    url = parent.recv()
+    return process, url
+
+
+def fetch_server_stats(url, reset=False):
+    """Devuelve el número de solicitudes por endpoint que ha recibido el servidor."""
+    with urllib.request.urlopen(f"{url}/_stats{'?reset=1' if reset else ''}") as response:
+        return json.loads(response.read())
+
+
+def percentile(values, fraction):
+    """Percentil por el método del rango más cercano (0 si no hay valores)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb():
+    """Memoria residente máxima del proceso en MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB y macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_benchmark(server_url, videos=1000, workers=8, rate=0, store='txt', formats='txt',
+                  quiet=True):
+    """Extrae el canal sintético de `videos` videos y devuelve las métricas.
+
+    Debe ejecutarse en un proceso que todavía no haya importado main, porque
+    la configuración (clave, servidores y pausas) se lee de las variables de
+    entorno al importar los módulos.
+    """
+    os.environ.update({
+        'YOUTUBE_API_KEY': os.getenv('YOUTUBE_API_KEY') or 'benchmark',
+        'YOUTUBE_API_ENDPOINT': server_url,
+        'YOUTUBE_WEB_URL': server_url,
+        'TRANSCRIPT_CACHE_ENABLED': '0',
+        'PAGINATION_DELAY': '0',
+    })
+    import main
+    from core import quota_tracker
+    from formatters import parse_formats
+
+    latencies = []
+    lock = threading.Lock()
+    process_video_transcript = main.process_video_transcript
+
+    def timed_process_video_transcript(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return process_video_transcript(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+
+    main.process_video_transcript = timed_process_video_transcript
+
+    output_dir = tempfile.mkdtemp(prefix='benchmark_')
+    channel_id = f"UCfake_{videos}"
+    fetch_server_stats(server_url, reset=True)
+    try:
+        out = open(os.devnull, 'w') if quiet else None
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+            main.process_channel(channel_id, output_dir, workers=workers, rate=rate,
+                                 resume=False, formats=parse_formats(formats), store=store)
+        elapsed = time.perf_counter() - started
+        if out is not None:
+            out.close()
+    finally:
+        main.process_video_transcript = process_video_transcript
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return {
+        'channel_id': channel_id,
+        'videos': len(latencies),
+        'workers': workers,
+        'store': store,
+        'seconds': round(elapsed, 3),
+        'videos_per_second': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'latency_p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'latency_p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'api_calls': quota_tracker.session_used,
+        'api_calls_by_method': quota_tracker.by_method(),
+        'server_requests': fetch_server_stats(server_url),
+    }
+
+
+def _run_in_child(connection, server_url, kwargs):
+    connection.send(run_benchmark(server_url, **kwargs))
+    connection.close()
+
+
+def run_isolated(server_url, **kwargs):
+    """Ejecuta `run_benchmark` en un proceso nuevo, para que cada ejecución
+    importe main desde cero y mida su propia memoria máxima."""
+    context = multiprocessing.get_context('spawn')
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=_run_in_child, args=(child, server_url, kwargs))
+    process.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = None
+    process.join()
+    if result is None:
+        raise RuntimeError(f"La ejecución de la prueba terminó con código {process.exitcode}")
+    return result
+
+
+def print_result(result):
+    print(f"Canal: {result['channel_id']} ({result['videos']} videos, {result['workers']} hilos, "
+          f"almacén {result['store']})")
+    print(f"  Tiempo total: {result['seconds']:.2f} s")
+    print(f"  Videos por segundo: {result['videos_per_second']:.2f}")
+    print(f"  Latencia por video: p50 {result['latency_p50_ms']:.1f} ms, "
+          f"p99 {result['latency_p99_ms']:.1f} ms")
+    print(f"  Memoria máxima: {result['peak_rss_mb']:.1f} MB")
+    print(f"  Llamadas a la API de datos: {result['api_calls']} {result['api_calls_by_method']}")
+    print(f"  Solicitudes recibidas por el servidor: {result['server_requests']}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Prueba de rendimiento contra un servidor local que imita a YouTube')
+    parser.add_argument('--videos', type=int, nargs='+', default=[1000],
+                        help='Número de videos del canal sintético; se admiten varios (por defecto: 1000)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Hilos de transcripción (por defecto: 8)')
+    parser.add_argument('--rate', type=float, default=0,
+                        help='Límite de solicitudes de transcripción por segundo (por defecto: 0, sin límite)')
+    parser.add_argument('--store', choices=['txt', 'packed'], default='txt',
+                        help='Almacenamiento de las transcripciones (por defecto: txt)')
+    parser.add_argument('--formats', type=str, default='txt',
+                        help='Formatos de archivo separados por comas (por defecto: txt)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Repeticiones de cada prueba (por defecto: 1)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Latencia media del servidor en segundos (por defecto: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Proporción de respuestas 503 del servidor (por defecto: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Proporción de respuestas 429 del servidor (por defecto: 0)')
+    parser.add_argument('--no-transcript-every', type=int, default=10,
+                        help='Uno de cada N videos no tiene subtítulos (0 = todos tienen, por defecto: 10)')
+    parser.add_argument('--segments', type=int, default=200,
+                        help='Segmentos por transcripción (por defecto: 200)')
+    parser.add_argument('--json', type=str, default=None,
+                        help='Archivo donde guardar los resultados en formato JSON')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Mostrar la salida normal de la extracción')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    server, url = start_server_process(
+        latency=args.latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        no_transcript_every=args.no_transcript_every, segments=args.segments, seed=0
+    )
+    print(f"Servidor de pruebas en {url}")
+
+    results = []
+    try:
+        for videos in args.videos:
+            for _ in range(args.repeat):
+                result = run_isolated(url, videos=videos, workers=args.workers, rate=args.rate,
+                                      store=args.store, formats=args.formats,
+                                      quiet=not args.verbose)
+                print_result(result)
+                results.append(result)
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'server': {
+                    'latency': args.latency,
+                    'error_rate': args.error_rate,
+                    'throttle_rate': args.throttle_rate,
+                    'no_transcript_every': args.no_transcript_every,
+                    'segments': args.segments,
+                },
+                'results': results
+            }, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
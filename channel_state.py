@@ -0,0 +1,95 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class ChannelState:
+    """Registro persistente (SQLite) de los videos vistos y procesados por canal.
+
+    Permite la sincronización incremental: en cada ejecución solo hace falta
+    paginar la lista de subidas hasta encontrar un video ya procesado.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "channel_id TEXT NOT NULL, video_id TEXT NOT NULL, video TEXT NOT NULL, "
+            "first_seen TEXT NOT NULL, processed_at TEXT, success INTEGER, "
+            "PRIMARY KEY (channel_id, video_id))"
+        )
+        self._conn.commit()
+
+    def mark_seen(self, video):
+        """Registra un video recibido de la API (si no estaba registrado ya)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO videos (channel_id, video_id, video, first_seen) "
+                "VALUES (?, ?, ?, ?)",
+                (video['channel_id'], video['id'], json.dumps(self._serializable(video), ensure_ascii=False),
+                 datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    def mark_processed(self, video):
+        """Registra que un video ya se ha procesado, con o sin transcripción."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO videos (channel_id, video_id, video, first_seen, processed_at, success) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (channel_id, video_id) DO UPDATE SET "
+                "processed_at = excluded.processed_at, success = excluded.success",
+                (video['channel_id'], video['id'], json.dumps(self._serializable(video), ensure_ascii=False),
+                 datetime.now().isoformat(), datetime.now().isoformat(),
+                 1 if video.get('transcript_success') else 0)
+            )
+            self._conn.commit()
+
+    def is_processed(self, channel_id, video_id):
+        """Indica si un video del canal ya se procesó en una ejecución anterior."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT processed_at FROM videos WHERE channel_id = ? AND video_id = ?",
+                (channel_id, video_id)
+            ).fetchone()
+        return row is not None and row[0] is not None
+
+    def pending_videos(self, channel_id):
+        """Devuelve los videos vistos pero aún no procesados de un canal."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video FROM videos WHERE channel_id = ? AND processed_at IS NULL "
+                "ORDER BY first_seen",
+                (channel_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, channel_id):
+        """Devuelve el número de videos procesados de un canal."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM videos WHERE channel_id = ? AND processed_at IS NOT NULL",
+                (channel_id,)
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _serializable(video):
+        return {key: value for key, value in video.items()
+                if key in ('id', 'url', 'title', 'published_at', 'channel_title', 'channel_id')}
+
+
+def get_channel_state(output_dir):
+    """Abre el registro de canales del directorio de salida."""
+    return ChannelState(os.path.join(output_dir, 'estado_canales.sqlite'))
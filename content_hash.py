@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from formatters import iter_segments
+
+
+def transcript_hash(transcript_info):
+    """Huella (SHA-256) del contenido de una transcripción.
+
+    Incluye el idioma, si es automática y, por cada segmento, el texto y los
+    tiempos redondeados a milisegundos, de modo que cambia cuando YouTube
+    regenera los subtítulos automáticos o se elige otra pista, pero no por
+    diferencias de representación de los números.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{transcript_info.get('language_code', '')}\t"
+                  f"{transcript_info.get('translated_from') or ''}\t"
+                  f"{int(bool(transcript_info.get('is_generated')))}\n".encode('utf-8'))
+    for text, start, duration in iter_segments(transcript_info['transcript_data']):
+        digest.update(f"{round(start * 1000)}\t{round(duration * 1000)}\t{text}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ContentHashStore:
+    """Registro persistente (SQLite) de la huella de cada transcripción guardada.
+
+    Permite que el modo de actualización (`--refresh`) vuelva a descargar las
+    transcripciones y reescriba solo las que han cambiado. Los cambios
+    detectados en la ejecución se acumulan en `changes`.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.changes = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "video_id TEXT PRIMARY KEY, hash TEXT NOT NULL, language_code TEXT, "
+            "is_generated INTEGER, updated_at TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, video_id):
+        """Devuelve `{'hash', 'language_code', 'is_generated'}` de un video, o None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hash, language_code, is_generated FROM hashes WHERE video_id = ?",
+                (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'hash': row[0], 'language_code': row[1], 'is_generated': bool(row[2])}
+
+    def set(self, video_id, transcript_info, digest=None):
+        """Registra la huella de la transcripción guardada de un video."""
+        digest = digest or transcript_hash(transcript_info)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO hashes (video_id, hash, language_code, is_generated, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (video_id, digest, transcript_info.get('language_code', ''),
+                 1 if transcript_info.get('is_generated') else 0, datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    def record_change(self, video, previous, transcript_info, reason):
+        """Anota un cambio detectado en esta ejecución."""
+        change = {
+            'id': video['id'],
+            'title': video.get('title', ''),
+            'reason': reason,
+            'previous_language': previous['language_code'] if previous else None,
+            'previous_is_generated': previous['is_generated'] if previous else None,
+            'language': transcript_info.get('language_code', ''),
+            'is_generated': transcript_info.get('is_generated', False)
+        }
+        with self._lock:
+            self.changes.append(change)
+
+    def write_changes(self, path):
+        """Guarda los cambios de la ejecución en un archivo JSON y devuelve la ruta."""
+        with self._lock:
+            changes = list(self.changes)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(changes, f, ensure_ascii=False, indent=2)
+        return path
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_content_hashes(output_dir):
+    """Abre el registro de huellas de las transcripciones del directorio de salida."""
+    return ContentHashStore(os.path.join(output_dir, 'huellas_transcripciones.sqlite'))
@@ -0,0 +1,497 @@
+import os
+import threading
+import time
+
+from metrics import run_metrics, video_log
+from quota import MeteredYouTube, QuotaExceededError, QuotaTracker
+from retry import call_with_retries, is_retryable
+from transcript_cache import get_default_cache
+
+# Funciones comunes a main.py, simple_extractor.py y extractor.py. Las
+# dependencias pesadas (googleapiclient, youtube_transcript_api) se importan
+# solo cuando se usan, para que las ejecuciones cortas arranquen rápido.
+
+
+class MissingApiKeyError(Exception):
+    """Se lanza al usar la API de YouTube sin haber configurado YOUTUBE_API_KEY."""
+
+
+# Cuota usada por el cliente de la API de YouTube
+quota_tracker = QuotaTracker()
+
+_youtube = None
+_youtube_lock = threading.Lock()
+
+
+def has_api_key():
+    """Indica si la clave de la API de YouTube está configurada."""
+    return bool(os.getenv('YOUTUBE_API_KEY'))
+
+
+def get_youtube():
+    """Devuelve el cliente de la API de YouTube, construyéndolo la primera vez.
+
+    Se usa el documento de descubrimiento incluido en googleapiclient, sin
+    descargarlo ni guardarlo en caché; las solicitudes reutilizan una conexión
+    persistente por hilo y cada llamada se contabiliza en `quota_tracker`.
+    Lanza MissingApiKeyError si no hay clave configurada.
+    """
+    global _youtube
+    with _youtube_lock:
+        if _youtube is None:
+            api_key = os.getenv('YOUTUBE_API_KEY')
+            if not api_key:
+                raise MissingApiKeyError(
+                    "No se ha configurado la clave API de YouTube (variable YOUTUBE_API_KEY).")
+            from googleapiclient.discovery import build
+            from http_pool import ThreadLocalHttp
+            # YOUTUBE_API_ENDPOINT permite usar otro servidor (por ejemplo, fake_youtube.py)
+            endpoint = os.getenv('YOUTUBE_API_ENDPOINT')
+            service = build('youtube', 'v3', developerKey=api_key, http=ThreadLocalHttp(),
+                            static_discovery=True, cache_discovery=False,
+                            client_options={'api_endpoint': endpoint} if endpoint else None)
+            _youtube = MeteredYouTube(service, quota_tracker)
+        return _youtube
+
+
+def execute_conditional(request, key):
+    """Ejecuta una solicitud de la API de YouTube Data reutilizando su ETag.
+
+    Si la caché tiene una respuesta anterior para `key`, la solicitud se
+    envía con `If-None-Match` y, cuando YouTube responde 304 (sin cambios),
+    se devuelve la respuesta guardada sin descargarla ni analizarla de nuevo.
+    Sin caché, equivale a `call_with_retries(request.execute)`.
+    """
+    cache = get_default_cache()
+    stored = cache.get_response(key) if cache else None
+    if stored:
+        request.headers['If-None-Match'] = stored['etag']
+    try:
+        response = call_with_retries(request.execute)
+    except Exception as e:
+        # googleapiclient trata el 304 como un error HTTP
+        if stored and getattr(getattr(e, 'resp', None), 'status', None) == 304:
+            run_metrics.increment('not_modified')
+            return stored['response']
+        raise
+    if cache and response.get('etag'):
+        cache.set_response(key, response['etag'], response)
+    return response
+
+
+def _parse_channel_item(channel_id, channel_info):
+    """Convierte un elemento de `channels().list` en el diccionario de información del canal."""
+    return {
+        'id': channel_id,
+        'title': channel_info['snippet']['title'],
+        'description': channel_info['snippet'].get('description', ''),
+        'published_at': channel_info['snippet']['publishedAt'],
+        'video_count': channel_info['statistics'].get('videoCount', 0),
+        'subscriber_count': channel_info['statistics'].get('subscriberCount', 0),
+        'view_count': channel_info['statistics'].get('viewCount', 0),
+        'uploads_playlist_id': channel_info['contentDetails']['relatedPlaylists']['uploads']
+    }
+
+
+def fetch_channel_info(channel_id):
+    """Obtiene información básica del canal, o None si el canal no existe.
+
+    A diferencia de `get_channel_info`, los errores (falta de cuota, errores
+    persistentes de la API) se propagan, para distinguirlos de un canal que
+    no existe.
+    """
+    with run_metrics.span('channel_info'):
+        channel_response = call_with_retries(get_youtube().channels().list(
+            part='snippet,statistics,contentDetails',
+            id=channel_id
+        ).execute)
+    
+    if not channel_response.get('items'):
+        return None
+    return _parse_channel_item(channel_id, channel_response['items'][0])
+
+
+def get_channel_info(channel_id):
+    """Obtiene información básica del canal."""
+    try:
+        channel_info = fetch_channel_info(channel_id)
+    except Exception as e:
+        print(f"Error al obtener información del canal: {e}")
+        return None
+    
+    if channel_info is None:
+        print(f"No se encontró el canal con ID: {channel_id}")
+    return channel_info
+
+
+def get_channels_info(channel_ids, batch_size=50):
+    """Obtiene la información de varios canales en lotes de hasta 50 IDs por solicitud."""
+    channels = {}
+    for i in range(0, len(channel_ids), batch_size):
+        batch = channel_ids[i:i + batch_size]
+        try:
+            channel_response = call_with_retries(get_youtube().channels().list(
+                part='snippet,statistics,contentDetails',
+                id=','.join(batch),
+                maxResults=batch_size
+            ).execute)
+        except Exception as e:
+            print(f"Error al obtener información de los canales: {e}")
+            continue
+        
+        for item in channel_response.get('items', []):
+            channels[item['id']] = _parse_channel_item(item['id'], item)
+    return channels
+
+
+def iter_channel_videos(channel_info, limit=None, stop_at=None):
+    """Genera los videos de un canal página a página.
+
+    Cada página de la lista de subidas se entrega en cuanto llega, de modo
+    que el procesamiento puede empezar sin esperar al resto del canal. Si se
+    indica `limit`, la paginación se detiene al alcanzarlo. Si se indica
+    `stop_at`, la paginación se detiene en el primer video para el que
+    `stop_at(video_id)` devuelva True (la lista de subidas va de más nuevo a
+    más antiguo).
+    """
+    channel_id = channel_info['id']
+    uploads_playlist_id = channel_info['uploads_playlist_id']
+    # Pausa en segundos entre páginas (PAGINATION_DELAY, se lee al paginar)
+    pagination_delay = float(os.getenv('PAGINATION_DELAY', 0.5))
+    next_page_token = None
+    total_videos = 0
+
+    # Recuperar videos de la lista de reproducción de subidas. Los errores
+    # temporales se reintentan; si persisten, se propaga la excepción en lugar
+    # de devolver una lista de videos incompleta.
+    while True:
+        # Con ETag: si la página no ha cambiado, se reutiliza la guardada
+        with run_metrics.span('pagination'):
+            playlist_response = execute_conditional(get_youtube().playlistItems().list(
+                playlistId=uploads_playlist_id,
+                part='snippet,contentDetails',
+                maxResults=50,  # Máximo permitido por solicitud
+                pageToken=next_page_token
+            ), f"playlistItems:{uploads_playlist_id}:{next_page_token or ''}")
+
+        for item in playlist_response.get('items', []):
+            video_id = item['contentDetails']['videoId']
+            if stop_at and stop_at(video_id):
+                print(f"Encontrado el video ya procesado {video_id}. Deteniendo la paginación.")
+                return
+            yield {
+                'id': video_id,
+                'url': f"https://www.youtube.com/watch?v={video_id}",
+                'title': item['snippet']['title'],
+                'published_at': item['snippet']['publishedAt'],
+                'channel_title': channel_info['title'],
+                'channel_id': channel_id
+            }
+            total_videos += 1
+            if limit and total_videos >= limit:
+                print(f"Alcanzado el límite de {limit} videos.")
+                return
+        
+        video_log(f"Obtenidos {total_videos} videos hasta ahora...")
+        next_page_token = playlist_response.get('nextPageToken')
+        if not next_page_token:
+            return
+
+        # Pequeña pausa para evitar límites de la API
+        if pagination_delay > 0:
+            time.sleep(pagination_delay)
+
+
+def iter_video_details(video_ids, batch_size=50):
+    """Obtiene la información de varios videos en lotes de hasta 50 IDs por solicitud.
+
+    Los videos de un lote cuya solicitud falla tras los reintentos se
+    entregan con `details_error` (ver `video_without_details`), de modo que
+    quien los procesa puede contarlos como errores temporales. Sin clave API
+    (`MissingApiKeyError`) o sin cuota (`QuotaExceededError`), se propaga la
+    excepción.
+    """
+    for i in range(0, len(video_ids), batch_size):
+        batch = video_ids[i:i + batch_size]
+        try:
+            with run_metrics.span('video_details'):
+                video_response = execute_conditional(get_youtube().videos().list(
+                    part='snippet',
+                    id=','.join(batch),
+                    maxResults=batch_size
+                ), f"videos:snippet:{','.join(batch)}")
+        except (MissingApiKeyError, QuotaExceededError):
+            # Sin clave o sin cuota fallarían también los lotes siguientes
+            raise
+        except Exception as e:
+            # Error persistente tras los reintentos: los videos del lote se
+            # entregan igualmente, marcados, para registrarlos como errores temporales
+            print(f"Error al obtener información de los videos: {e}")
+            for video_id in batch:
+                yield video_without_details(video_id, f"No se pudo obtener la información del video: {e}")
+            continue
+        
+        items = {item['id']: item for item in video_response.get('items', [])}
+        for video_id in batch:
+            if video_id not in items:
+                print(f"No se encontró el video con ID: {video_id}")
+                continue
+            yield parse_video_item(items[video_id])
+
+
+def parse_video_item(item):
+    """Convierte un elemento de `videos().list` en el diccionario de información del video."""
+    snippet = item['snippet']
+    return {
+        'id': item['id'],
+        'url': f"https://www.youtube.com/watch?v={item['id']}",
+        'title': snippet['title'],
+        'channel_title': snippet['channelTitle'],
+        'channel_id': snippet['channelId'],
+        'published_at': snippet['publishedAt']
+    }
+
+
+def video_without_details(video_id, error):
+    """Diccionario de un video cuya información no se pudo obtener de la API."""
+    return {
+        'id': video_id,
+        'url': f"https://www.youtube.com/watch?v={video_id}",
+        'title': '',
+        'channel_title': '',
+        'channel_id': '',
+        'published_at': '',
+        'details_error': error
+    }
+
+
+def get_video_id_from_url(url):
+    """Extrae el ID del video de una URL de YouTube."""
+    if "youtube.com/watch?v=" in url:
+        return url.split("watch?v=")[1].split("&")[0]
+    elif "youtu.be/" in url:
+        return url.split("youtu.be/")[1].split("?")[0]
+    else:
+        return url  # Asumimos que ya es un ID
+
+
+def _track_field(track, name, default=None):
+    """Lee un campo de una transcripción (objeto Transcript o diccionario de la caché)."""
+    if isinstance(track, dict):
+        return track.get(name, default)
+    return getattr(track, name, default)
+
+
+def _language_rank(language_code, languages):
+    """Posición de un idioma en la lista de preferencia (admite variantes como es-419)."""
+    for rank, preferred in enumerate(languages):
+        if language_code == preferred or language_code.split('-')[0] == preferred:
+            return rank
+    return len(languages)
+
+
+def rank_transcripts(tracks, languages=None, prefer_generated=False):
+    """Ordena las transcripciones disponibles según la preferencia de idioma y tipo.
+
+    Primero por la posición del idioma en `languages` (las de idiomas no
+    listados van al final, en su orden original) y, dentro del mismo idioma,
+    las manuales antes que las automáticas (o al revés con `prefer_generated`).
+    Solo usa los metadatos de la lista, sin descargar ninguna transcripción.
+    """
+    languages = languages or []
+    
+    def key(item):
+        position, track = item
+        is_generated = bool(_track_field(track, 'is_generated'))
+        kind_rank = int(is_generated != prefer_generated)
+        return (_language_rank(_track_field(track, 'language_code', ''), languages), kind_rank, position)
+    
+    return [track for _, track in sorted(enumerate(tracks), key=key)]
+
+
+def _needs_translation(tracks, translate_to):
+    """Indica si hay que traducir porque no existe una transcripción en `translate_to`."""
+    if not translate_to:
+        return False
+    return not any(_language_rank(_track_field(track, 'language_code', ''), [translate_to]) == 0
+                   for track in tracks)
+
+
+def get_cached_transcript(cache, video_id, languages=None, prefer_generated=False, translate_to=None):
+    """Busca en la caché una transcripción ya obtenida de un video.
+
+    Aplica la misma preferencia de idioma que `get_transcript` y devuelve el
+    mismo diccionario, o None si hay que consultar a YouTube.
+    """
+    cached_list = cache.get_transcript_list(video_id)
+    if cached_list is None:
+        return None
+    
+    if not cached_list['tracks']:
+        video_log(f"Sin transcripción para el video {video_id} (desde caché)")
+        run_metrics.increment('no_transcript')
+        return {
+            'success': False,
+            'error': cached_list['error']
+        }
+    
+    tracks = rank_transcripts(cached_list['tracks'], languages, prefer_generated)
+    best = tracks[0]
+    if _needs_translation(tracks, translate_to) and translate_to in best.get('translation_languages', []):
+        transcript_data = cache.get_segments(video_id, f"{best['language_code']}>{translate_to}")
+        if transcript_data is None:
+            return None
+        video_log(f"Traducción a {translate_to} obtenida desde caché")
+        run_metrics.increment('successes')
+        return {
+            'success': True,
+            'language': translate_to,
+            'language_code': translate_to,
+            'is_generated': True,
+            'translated_from': best['language_code'],
+            'transcript_data': transcript_data
+        }
+    
+    # Solo se acepta la transcripción preferida: si no está en la caché, se
+    # descarga en lugar de conformarse con otra peor
+    transcript_data = cache.get_segments(video_id, best['language_code'])
+    if transcript_data is None:
+        return None
+    video_log(f"Transcripción en {best['language']} obtenida desde caché")
+    run_metrics.increment('successes')
+    return {
+        'success': True,
+        'language': best['language'],
+        'language_code': best['language_code'],
+        'is_generated': best['is_generated'],
+        'transcript_data': transcript_data
+    }
+
+
+def get_transcript(video_id_or_url, rate_limiter=None, languages=None, prefer_generated=False,
+                   translate_to=None, use_cache=True):
+    """Obtiene la transcripción de un video de YouTube.
+    
+    La transcripción se elige a partir de los metadatos de la lista antes de
+    descargar nada: primero según `languages` (por ejemplo ['es', 'en']; si
+    está vacía, cualquier idioma) y, dentro de cada idioma, las manuales antes
+    que las automáticas (o al revés con `prefer_generated`). Con
+    `translate_to`, si no hay transcripción en ese idioma se pide a YouTube la
+    traducción de la mejor disponible. En el caso normal se hace una sola
+    descarga por video; solo se prueba la siguiente candidata si la elegida
+    falla de forma permanente.
+    
+    Los errores temporales (limitaciones del servidor, errores 5xx o de red)
+    se reintentan con retroceso exponencial. Si persisten, el resultado lleva
+    `retryable` a True para no confundirlo con un video sin transcripción.
+    `rate_limiter` (AdaptiveRateController) regula cada solicitud. Con
+    `use_cache` a False se consulta siempre a YouTube (el resultado se guarda
+    igualmente en la caché).
+    """
+    video_id = get_video_id_from_url(video_id_or_url)
+    video_log(f"Obteniendo transcripción para el video ID: {video_id}")
+    
+    # Reutilizar la caché si ya se obtuvo este video anteriormente
+    cache = get_default_cache()
+    if cache and use_cache:
+        with run_metrics.span('cache_lookup'):
+            cached_info = get_cached_transcript(cache, video_id, languages, prefer_generated,
+                                                translate_to)
+        if cached_info:
+            run_metrics.increment('cache_hits')
+            return cached_info
+    
+    # Importación diferida: la biblioteca (y requests) solo se cargan si hay que
+    # consultar a YouTube, no cuando la transcripción está en la caché
+    from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisabled
+    from http_pool import list_transcripts
+    
+    try:
+        # Obtener la lista de transcripciones disponibles
+        with run_metrics.span('list_transcripts'):
+            transcript_list = call_with_retries(
+                lambda: list_transcripts(video_id), rate_limiter)
+        if cache:
+            cache.set_transcript_list(video_id, transcript_list)
+        
+        # Elegir la transcripción a partir de los metadatos: una sola descarga
+        # salvo que la elegida falle de forma permanente
+        ranked = rank_transcripts(list(transcript_list), languages, prefer_generated)
+        candidates = [(transcript, None) for transcript in ranked]
+        if ranked and _needs_translation(ranked, translate_to):
+            best = ranked[0]
+            if best.is_translatable and any(language['language_code'] == translate_to
+                                            for language in best.translation_languages):
+                candidates.insert(0, (best.translate(translate_to), best.language_code))
+        
+        for transcript, translated_from in candidates:
+            try:
+                video_log(f"Intentando con transcripción en {transcript.language} "
+                          f"(generada automáticamente: {transcript.is_generated})")
+                with run_metrics.span('fetch'):
+                    transcript_data = call_with_retries(transcript.fetch, rate_limiter)
+                
+                if cache:
+                    cache_code = transcript.language_code
+                    if translated_from:
+                        cache_code = f"{translated_from}>{transcript.language_code}"
+                    cache.set_segments(video_id, cache_code,
+                                       transcript_data, transcript.is_generated)
+                
+                transcript_info = {
+                    'success': True,
+                    'language': transcript.language,
+                    'language_code': transcript.language_code,
+                    'is_generated': transcript.is_generated,
+                    'transcript_data': transcript_data
+                }
+                if translated_from:
+                    transcript_info['translated_from'] = translated_from
+                run_metrics.increment('successes')
+                return transcript_info
+            except Exception as e:
+                print(f"Error al obtener transcripción en {transcript.language}: {e}")
+                if is_retryable(e):
+                    # El servidor sigue fallando: no es un video sin transcripción
+                    run_metrics.increment('errors')
+                    return {
+                        'success': False,
+                        'error': str(e),
+                        'retryable': True
+                    }
+                continue
+        
+        # Si llegamos aquí, no se encontró ninguna transcripción utilizable
+        video_log("No se encontró ninguna transcripción para este video.")
+        run_metrics.increment('no_transcript')
+        return {
+            'success': False,
+            'error': "No se encontró ninguna transcripción utilizable."
+        }
+    
+    except NoTranscriptFound:
+        video_log(f"No se encontró transcripción para el video {video_id}")
+        run_metrics.increment('no_transcript')
+        if cache:
+            cache.set_no_transcript(video_id, "No se encontró ninguna transcripción.")
+        return {
+            'success': False,
+            'error': "No se encontró ninguna transcripción."
+        }
+    except TranscriptsDisabled:
+        video_log(f"Las transcripciones están deshabilitadas para el video {video_id}")
+        run_metrics.increment('disabled')
+        if cache:
+            cache.set_no_transcript(video_id, "Las transcripciones están deshabilitadas para este video.")
+        return {
+            'success': False,
+            'error': "Las transcripciones están deshabilitadas para este video."
+        }
+    except Exception as e:
+        print(f"Error al obtener transcripciones: {e}")
+        run_metrics.increment('errors')
+        return {
+            'success': False,
+            'error': str(e),
+            'retryable': is_retryable(e)
+        }
@@ -0,0 +1,191 @@
+import csv
+import gzip
+import os
+import re
+
+from output_index import iter_transcript_entries
+from pipeline import ReorderBuffer, run_bounded
+
+# Cabecera del CSV de frases (la misma que videos.csv)
+SENTENCE_HEADER = ['URL', 'Title', 'Published At', 'Sentence', 'Sentence Index']
+
+TRANSCRIPT_MARKER = '--- TRANSCRIPCIÓN ---'
+_TIMESTAMP = re.compile(r'^\[(\d+):(\d\d):(\d\d)\]\s?')
+# Fin de frase: signo de puntuación final (y comillas o paréntesis de cierre) seguido de espacio
+_SENTENCE_END = re.compile(r'(?<=[.!?…])["\'»)\]]*\s+')
+
+
+def read_transcript_file(path):
+    """Lee un archivo de transcripción guardado por `save_transcript_to_file`.
+
+    Devuelve `(metadatos, segmentos)`, donde `metadatos` es un diccionario
+    con las líneas de la cabecera (`Título`, `URL`, ...) y `segmentos` una
+    lista de tuplas `(inicio en segundos, texto)`.
+    """
+    metadata = {}
+    segments = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line == TRANSCRIPT_MARKER:
+                break
+            key, sep, value = line.partition(': ')
+            if sep:
+                metadata[key] = value
+        for line in f:
+            line = line.strip()
+            match = _TIMESTAMP.match(line)
+            start = 0
+            if match:
+                hours, minutes, seconds = match.groups()
+                start = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+                line = line[match.end():]
+            if line:
+                segments.append((start, line))
+    return metadata, segments
+
+
+def split_sentences(texts):
+    """Une los textos de los segmentos y los divide en frases.
+
+    Los segmentos de YouTube cortan las frases por la mitad, así que primero
+    se unen y después se divide por los signos de fin de frase.
+    """
+    joined = ' '.join(' '.join(texts).split())
+    for sentence in _SENTENCE_END.split(joined):
+        sentence = sentence.strip()
+        if sentence:
+            yield sentence
+
+
+def segment_file(path):
+    """Devuelve las filas del CSV de frases de un archivo de transcripción."""
+    metadata, segments = read_transcript_file(path)
+    url = metadata.get('URL', '')
+    title = metadata.get('Título', '')
+    published_at = metadata.get('Fecha de publicación', '')
+    return [[url, title, published_at, sentence, index]
+            for index, sentence in enumerate(split_sentences(text for _, text in segments), 1)]
+
+
+def segment_files(paths):
+    """Procesa un lote de archivos (una tarea del grupo de procesos)."""
+    rows = []
+    for path in paths:
+        try:
+            rows.extend(segment_file(path))
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Error al leer {path}: {e}")
+    return rows
+
+
+class ChunkedCsvWriter:
+    """Escribe filas en uno o varios archivos CSV, opcionalmente comprimidos.
+
+    Con `rows_per_file`, se empieza un archivo nuevo (`nombre_0001.csv`,
+    `nombre_0002.csv`, ...) cada vez que se alcanza ese número de filas; cada
+    archivo lleva la cabecera.
+    """
+
+    def __init__(self, path, header, compress=False, rows_per_file=0):
+        self.path = path
+        self.header = header
+        self.compress = compress
+        self.rows_per_file = rows_per_file or 0
+        self.files = []
+        self.rows = 0
+        self._file = None
+        self._writer = None
+        self._rows_in_file = 0
+
+    def _next_path(self):
+        base, ext = os.path.splitext(self.path)
+        if ext == '.gz':
+            base, ext = os.path.splitext(base)
+        ext = ext or '.csv'
+        if self.rows_per_file:
+            base = f"{base}_{len(self.files) + 1:04d}"
+        return base + ext + ('.gz' if self.compress else '')
+
+    def _open(self):
+        self.close()
+        path = self._next_path()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.compress:
+            self._file = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.header)
+        self._rows_in_file = 0
+        self.files.append(path)
+
+    def writerows(self, rows):
+        for row in rows:
+            if self._file is None or (self.rows_per_file and self._rows_in_file >= self.rows_per_file):
+                self._open()
+            self._writer.writerow(row)
+            self._rows_in_file += 1
+            self.rows += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is None and not self.files:
+            # Sin filas: se crea igualmente un archivo con la cabecera
+            self._open()
+        self.close()
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_corpus(text_dir, output_path, workers=None, compress=False, rows_per_file=0,
+                  batch_size=16):
+    """Exporta todas las transcripciones de `text_dir` a un CSV de frases.
+
+    Los archivos se dividen en frases en un grupo de `workers` procesos, en
+    lotes de `batch_size` archivos. Las filas se escriben a medida que llegan,
+    en el orden de los nombres de archivo (por ID de video), de modo que el
+    resultado no depende del número de procesos y solo se guardan en memoria
+    los lotes pendientes de reordenar. Devuelve un diccionario con el número
+    de videos y de frases y la lista de archivos generados.
+    """
+    # multiprocessing solo se importa al exportar: search_index también usa este módulo
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Ordenados por nombre de archivo (por ID de video) con cualquier disposición del directorio
+    paths = [entry.path for _, entry in sorted(iter_transcript_entries(text_dir),
+                                                key=lambda item: item[1].name)
+             if entry.name.endswith('.txt')]
+    workers = workers or os.cpu_count() or 1
+    reorder = ReorderBuffer()
+
+    with ChunkedCsvWriter(output_path, SENTENCE_HEADER, compress, rows_per_file) as writer:
+        results = run_bounded(segment_files, _batches(paths, batch_size), workers=workers,
+                              executor_class=ProcessPoolExecutor)
+        for index, _, future in results:
+            for rows in reorder.add(index, future.result()):
+                writer.writerows(rows)
+
+    return {
+        'videos': len(paths),
+        'sentences': writer.rows,
+        'files': writer.files
+    }
@@ -0,0 +1,182 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from core import (get_channel_info, get_transcript, get_video_id_from_url, iter_channel_videos,
+                  iter_video_details)
+from metrics import quiet_output
+from retry import AdaptiveRateController
+
+# API para usar el extractor desde otros programas con asyncio, sin pasar por
+# la línea de comandos:
+#
+#     async for result in extract_channel('UC...', concurrency=8, rate=10):
+#         print(result.video_id, result.success, len(result.segments))
+#
+# Los resultados se entregan a medida que termina cada video (no en el orden
+# del canal) y nunca hay más de `concurrency * 2` videos en curso, así que la
+# memoria no depende del tamaño del canal. Las transcripciones no se guardan
+# en disco; de eso se encarga quien consume los resultados.
+
+
+class ChannelNotFoundError(Exception):
+    """Se lanza cuando no se puede obtener la información de un canal."""
+
+
+class VideoResult:
+    """Resultado de la extracción de un video.
+
+    Atributos:
+        video_id, title, url, channel_id, channel_title, published_at (str):
+            metadatos del video (vacíos si no se obtuvieron).
+        success (bool): si se obtuvo la transcripción.
+        language, language_code (str): idioma de la transcripción.
+        is_generated (bool): si la transcripción es automática.
+        translated_from (str o None): idioma original si es una traducción.
+        segments (list): segmentos `{'text', 'start', 'duration'}`.
+        error (str o None): motivo si no se obtuvo la transcripción.
+        retryable (bool): si el error es temporal y conviene reintentar.
+    """
+
+    __slots__ = ('video_id', 'title', 'url', 'channel_id', 'channel_title', 'published_at',
+                 'success', 'language', 'language_code', 'is_generated', 'translated_from',
+                 'segments', 'error', 'retryable')
+
+    def __init__(self, video, transcript_info):
+        self.video_id = video['id']
+        self.title = video.get('title', '')
+        self.url = video.get('url') or f"https://www.youtube.com/watch?v={video['id']}"
+        self.channel_id = video.get('channel_id', '')
+        self.channel_title = video.get('channel_title', '')
+        self.published_at = video.get('published_at', '')
+        self.success = transcript_info['success']
+        self.language = transcript_info.get('language', '')
+        self.language_code = transcript_info.get('language_code', '')
+        self.is_generated = transcript_info.get('is_generated', False)
+        self.translated_from = transcript_info.get('translated_from')
+        self.segments = transcript_info.get('transcript_data', []) if self.success else []
+        self.error = transcript_info.get('error')
+        self.retryable = transcript_info.get('retryable', False)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        status = self.language_code if self.success else f"error={self.error!r}"
+        return f"VideoResult({self.video_id!r}, {status})"
+
+
+async def _extract(source, concurrency, rate, transcript_options, quiet):
+    """Obtiene las transcripciones de los videos de `source` y las entrega al terminar.
+
+    `source` es un iterador (bloqueante) de diccionarios de video; se recorre
+    en un hilo aparte, un elemento cada vez, solo cuando hay sitio para más
+    videos en curso. Si el iterador falla (por ejemplo, por falta de cuota al
+    paginar), se terminan los videos en curso y después se propaga el error.
+    Con `quiet`, los hilos del extractor no muestran los mensajes por video;
+    el resto del programa no se ve afectado.
+    """
+    concurrency = max(1, concurrency or 1)
+    window = concurrency * 2
+    rate_limiter = AdaptiveRateController(rate, max_concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    source_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='extractor-source')
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='extractor')
+    end = object()
+
+    def process(video):
+        if video.get('details_error'):
+            # No se pudo obtener la información del video (error temporal de la API)
+            return VideoResult(video, {'success': False, 'error': video['details_error'],
+                                       'retryable': True})
+        with quiet_output(quiet):
+            return VideoResult(video, get_transcript(video['id'], rate_limiter, **transcript_options))
+
+    def next_item():
+        with quiet_output(quiet):
+            return next(source, end)
+
+    def next_video():
+        return loop.run_in_executor(source_executor, next_item)
+
+    pending = set()
+    upcoming = next_video()
+    source_error = None
+    try:
+        while upcoming is not None or pending:
+            waiting = set(pending)
+            if upcoming is not None and len(pending) < window:
+                waiting.add(upcoming)
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if upcoming in done:
+                done.discard(upcoming)
+                try:
+                    video = upcoming.result()
+                except Exception as e:
+                    video, source_error = end, e
+                if video is end:
+                    upcoming = None
+                else:
+                    pending.add(loop.run_in_executor(executor, process, video))
+                    upcoming = next_video()
+            for future in done:
+                pending.discard(future)
+                yield future.result()
+        if source_error is not None:
+            raise source_error
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        source_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _transcript_options(languages, prefer_generated, translate_to):
+    return {
+        'languages': list(languages or []),
+        'prefer_generated': prefer_generated,
+        'translate_to': translate_to
+    }
+
+
+async def extract_videos(video_ids, concurrency=4, rate=5, languages=None, prefer_generated=False,
+                         translate_to=None, fetch_metadata=True, quiet=True):
+    """Genera un `VideoResult` por cada video de `video_ids` a medida que terminan.
+
+    Con `fetch_metadata`, el título, el canal y la fecha se obtienen con la
+    API de YouTube Data en lotes de 50 (requiere clave API; los videos que no
+    existen se omiten). Sin él, se usan solo los IDs y no hace falta clave.
+    `concurrency` es el número de transcripciones en paralelo y `rate`, el
+    máximo de solicitudes por segundo (0 = sin límite). `languages`,
+    `prefer_generated` y `translate_to` tienen el mismo sentido que en
+    `get_transcript`. Con `quiet` no se muestran los mensajes por video.
+    Sin clave API se lanza `MissingApiKeyError`; si se agota la cuota, se
+    lanza `QuotaExceededError` después de entregar los videos ya recibidos.
+    """
+    video_ids = list(dict.fromkeys(get_video_id_from_url(video_id) for video_id in video_ids))
+    if fetch_metadata:
+        source = iter_video_details(video_ids)
+    else:
+        source = iter([{'id': video_id} for video_id in video_ids])
+    options = _transcript_options(languages, prefer_generated, translate_to)
+    async for result in _extract(source, concurrency, rate, options, quiet):
+        yield result
+
+
+async def extract_channel(channel_id, limit=None, concurrency=4, rate=5, languages=None,
+                          prefer_generated=False, translate_to=None, quiet=True):
+    """Genera un `VideoResult` por cada video del canal a medida que terminan.
+
+    La paginación de la lista de subidas avanza solo cuando hay sitio para más
+    videos en curso. Lanza `ChannelNotFoundError` si no se puede obtener la
+    información del canal; los errores persistentes al paginar (por ejemplo,
+    `QuotaExceededError`) se lanzan después de entregar los videos ya
+    recibidos. El resto de parámetros son los de `extract_videos`.
+    """
+    loop = asyncio.get_running_loop()
+    channel_info = await loop.run_in_executor(None, get_channel_info, channel_id)
+    if not channel_info:
+        raise ChannelNotFoundError(f"No se pudo obtener información del canal {channel_id}")
+    source = iter_channel_videos(channel_info, limit)
+    options = _transcript_options(languages, prefer_generated, translate_to)
+    async for result in _extract(source, concurrency, rate, options, quiet):
+        yield result
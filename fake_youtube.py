@@ -0,0 +1,329 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Servidor local que imita la API de YouTube Data v3 (channels, playlistItems,
+# videos), la página de los videos y el servicio de subtítulos (timedtext),
+# para medir el rendimiento sin usar los servicios reales.
+#
+# Los canales son sintéticos: `UCfake_N` tiene N videos. El ID de cada video
+# (11 caracteres) codifica el número de videos del canal y su posición.
+
+CHANNEL_PREFIX = 'UCfake_'
+# Uno de cada N videos tiene subtítulos automáticos que cambian con la revisión
+REGENERATED_EVERY = 7
+
+
+def channel_size(channel_id):
+    """Número de videos de un canal sintético, o None si el ID no es válido."""
+    if not channel_id.startswith(CHANNEL_PREFIX):
+        return None
+    try:
+        return int(channel_id[len(CHANNEL_PREFIX):])
+    except ValueError:
+        return None
+
+
+def fake_video_id(size, position):
+    return f"{size:06d}{position:05d}"
+
+
+def published_at(size, position):
+    """Fecha de publicación sintética: la lista de subidas va del más nuevo al más antiguo."""
+    moment = datetime(2020, 1, 1, tzinfo=timezone.utc) + timedelta(hours=size - position)
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_video_id(video_id):
+    """Devuelve `(tamaño del canal, posición)` de un ID sintético, o None."""
+    if len(video_id) != 11 or not video_id.isdigit():
+        return None
+    size, position = int(video_id[:6]), int(video_id[6:])
+    if position >= size:
+        return None
+    return size, position
+
+
+class FakeYouTubeConfig:
+    """Comportamiento del servidor.
+
+    `latency` es la latencia media en segundos de cada respuesta (con una
+    variación de ±50 %), `error_rate` la proporción de respuestas 503 y
+    `throttle_rate` la de respuestas 429. Uno de cada `no_transcript_every`
+    videos no tiene subtítulos (0 = todos tienen) y cada transcripción tiene
+    `segments` segmentos. Al cambiar `revision`, cambian las transcripciones
+    automáticas de uno de cada `REGENERATED_EVERY` videos (como cuando
+    YouTube las regenera).
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, throttle_rate=0.0,
+                 no_transcript_every=10, segments=200, seed=None, revision=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.no_transcript_every = no_transcript_every
+        self.segments = segments
+        self.revision = revision
+        self.random = random.Random(seed)
+
+
+class FakeYouTubeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self.stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def snapshot(self, reset=False):
+        with self.stats_lock:
+            stats = dict(self.stats)
+            if reset:
+                self.stats.clear()
+        return stats
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type + '; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, data, status=200):
+        self._send(status, json.dumps(data, ensure_ascii=False))
+
+    def _send_api(self, data):
+        """Responde con un ETag del contenido y 304 si coincide con If-None-Match."""
+        body = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:20] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.server.count('not_modified')
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        data = dict(data, etag=etag)
+        data_bytes = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data_bytes)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data_bytes)
+
+    def _simulate(self, name):
+        """Aplica la latencia y los errores configurados. Devuelve False si respondió con error."""
+        config = self.server.config
+        self.server.count(name)
+        if config.latency > 0:
+            time.sleep(config.latency * config.random.uniform(0.5, 1.5))
+        roll = config.random.random()
+        if roll < config.throttle_rate:
+            self.server.count('throttled')
+            self._send_json({'error': {'code': 429, 'message': 'Too Many Requests',
+                                       'errors': [{'reason': 'rateLimitExceeded'}]}}, 429)
+            return False
+        if roll < config.throttle_rate + config.error_rate:
+            self.server.count('errors')
+            self._send_json({'error': {'code': 503, 'message': 'Backend Error'}}, 503)
+            return False
+        return True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        routes = {
+            '/youtube/v3/channels': self._channels,
+            '/youtube/v3/playlistItems': self._playlist_items,
+            '/youtube/v3/videos': self._videos,
+            '/watch': self._watch,
+            '/api/timedtext': self._timedtext,
+            '/_stats': self._stats,
+        }
+        handler = routes.get(url.path)
+        if handler is None:
+            self._send_json({'error': {'code': 404, 'message': 'Not Found'}}, 404)
+            return
+        if url.path != '/_stats' and not self._simulate(url.path.rsplit('/', 1)[-1]):
+            return
+        handler(query)
+
+    # API de YouTube Data v3
+
+    def _channels(self, query):
+        items = []
+        for channel_id in query.get('id', '').split(','):
+            size = channel_size(channel_id)
+            if size is None:
+                continue
+            items.append({
+                'id': channel_id,
+                'snippet': {'title': f"Canal sintético de {size} videos", 'description': '',
+                            'publishedAt': '2010-01-01T00:00:00Z'},
+                'statistics': {'videoCount': str(size), 'subscriberCount': '0', 'viewCount': '0'},
+                'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + channel_id[2:]}}
+            })
+        self._send_api({'items': items})
+
+    def _playlist_items(self, query):
+        size = channel_size('UC' + query.get('playlistId', '')[2:])
+        if size is None:
+            self._send_json({'error': {'code': 404, 'message': 'playlistNotFound'}}, 404)
+            return
+        start = int(query.get('pageToken') or 0)
+        page_size = min(50, int(query.get('maxResults', 5)))
+        items = [{
+            'snippet': {'title': f"Video {position}", 'publishedAt': published_at(size, position)},
+            'contentDetails': {'videoId': fake_video_id(size, position),
+                               'videoPublishedAt': published_at(size, position)}
+        } for position in range(start, min(start + page_size, size))]
+        response = {'items': items, 'pageInfo': {'totalResults': size}}
+        if start + page_size < size:
+            response['nextPageToken'] = str(start + page_size)
+        self._send_api(response)
+
+    def _videos(self, query):
+        items = []
+        for video_id in query.get('id', '').split(','):
+            parsed = parse_video_id(video_id)
+            if parsed is None:
+                continue
+            size, position = parsed
+            # Uno de cada 100 videos es una emisión programada y uno de cada 20, música
+            upcoming = position % 100 == 99
+            music = position % 20 == 5
+            item = {
+                'id': video_id,
+                'snippet': {'title': f"Video {position}", 'channelTitle': f"Canal sintético de {size} videos",
+                            'channelId': f"{CHANNEL_PREFIX}{size}",
+                            'publishedAt': published_at(size, position),
+                            'categoryId': '10' if music else '22',
+                            'liveBroadcastContent': 'upcoming' if upcoming else 'none'},
+                'contentDetails': {'duration': 'P0D' if upcoming else f"PT{1 + position % 60}M{position % 60}S",
+                                   'caption': 'false' if music or position % 2 else 'true'}
+            }
+            items.append(item)
+        self._send_api({'items': items})
+
+    # Página del video y subtítulos
+
+    def _has_transcript(self, position):
+        every = self.server.config.no_transcript_every
+        return not every or position % every != every - 1
+
+    def _watch(self, query):
+        video_id = query.get('v', '')
+        parsed = parse_video_id(video_id)
+        if parsed is None:
+            self._send(200, '<html><body>Video no disponible</body></html>', 'text/html')
+            return
+        if not self._has_transcript(parsed[1]):
+            self._send(200, '<html><script>var ytInitialPlayerResponse = '
+                            '{"playabilityStatus":{"status":"OK"}};</script></html>', 'text/html')
+            return
+        base_url = f"{self.server.url}/api/timedtext?v={video_id}"
+        captions = {
+            'playerCaptionsTracklistRenderer': {
+                'captionTracks': [
+                    {'baseUrl': base_url + '&lang=es', 'name': {'simpleText': 'Español'},
+                     'languageCode': 'es', 'isTranslatable': True},
+                    {'baseUrl': base_url + '&lang=en&kind=asr',
+                     'name': {'simpleText': 'English (auto-generated)'},
+                     'languageCode': 'en', 'kind': 'asr', 'isTranslatable': True},
+                ],
+                'translationLanguages': [
+                    {'languageCode': 'fr', 'languageName': {'simpleText': 'French'}},
+                ]
+            }
+        }
+        html = ('<html><script>var ytInitialPlayerResponse = {"playabilityStatus":{"status":"OK"},'
+                f'"captions":{json.dumps(captions)},"videoDetails":{{"videoId":"{video_id}"}}}};'
+                '</script></html>')
+        self._send(200, html, 'text/html')
+
+    def _timedtext(self, query):
+        video_id = query.get('v', '')
+        language = query.get('tlang') or query.get('lang', 'es')
+        revision = ''
+        parsed = parse_video_id(video_id)
+        if (self.server.config.revision and query.get('kind') == 'asr'
+                and parsed and parsed[1] % REGENERATED_EVERY == 0):
+            revision = f" (revisión {self.server.config.revision})"
+        lines = ['<?xml version="1.0" encoding="utf-8" ?><transcript>']
+        for number in range(self.server.config.segments):
+            text = escape(f"Frase {number} del video {video_id} en {language}. Sigue aquí{revision}")
+            lines.append(f'<text start="{number * 2.5:.2f}" dur="2.5">{text}</text>')
+        lines.append('</transcript>')
+        self._send(200, ''.join(lines), 'text/xml')
+
+    def _stats(self, query):
+        self._send_json(self.server.snapshot(reset='reset' in query))
+
+
+def start_server(config=None, host='127.0.0.1', port=0):
+    """Arranca el servidor en un hilo de fondo y lo devuelve."""
+    server = FakeYouTubeServer((host, port), config or FakeYouTubeConfig())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita a YouTube para pruebas de rendimiento')
+    parser.add_argument('--host', type=str, default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Latencia media de cada respuesta en segundos (por defecto: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Proporción de respuestas 503 (por defecto: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Proporción de respuestas 429 (por defecto: 0)')
+    parser.add_argument('--no-transcript-every', type=int, default=10,
+                        help='Uno de cada N videos no tiene subtítulos (0 = todos tienen, por defecto: 10)')
+    parser.add_argument('--segments', type=int, default=200,
+                        help='Segmentos por transcripción (por defecto: 200)')
+    parser.add_argument('--revision', type=int, default=0,
+                        help=f'Revisión de las transcripciones automáticas de uno de cada '
+                             f'{REGENERATED_EVERY} videos (por defecto: 0)')
+    args = parser.parse_args()
+
+    config = FakeYouTubeConfig(args.latency, args.error_rate, args.throttle_rate,
+                               args.no_transcript_every, args.segments, revision=args.revision)
+    server = FakeYouTubeServer((args.host, args.port), config)
+    print(f"Servidor de pruebas en {server.url}")
+    print(f"  YOUTUBE_API_ENDPOINT={server.url}")
+    print(f"  YOUTUBE_WEB_URL={server.url}")
+    print(f"Canales disponibles: {CHANNEL_PREFIX}N (N videos, por ejemplo {CHANNEL_PREFIX}1000)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
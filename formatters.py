@@ -0,0 +1,93 @@
+import json
+
+# Formatos de salida de las transcripciones. Cada formato es una función que
+# recibe los segmentos y genera las líneas del archivo, de modo que se pueden
+# escribir directamente en disco sin construir el texto completo en memoria.
+
+
+def iter_segments(transcript_data):
+    """Genera `(texto, inicio, duración)` de cada segmento.
+
+    Acepta tanto diccionarios (los de la caché) como objetos con atributos
+    `text`, `start` y `duration`.
+    """
+    for item in transcript_data:
+        if isinstance(item, dict):
+            yield item.get('text', ''), item.get('start', 0), item.get('duration', 0)
+        else:
+            yield getattr(item, 'text', ''), getattr(item, 'start', 0), getattr(item, 'duration', 0)
+
+
+def _clock(seconds, millis_separator=None):
+    """Convierte segundos a HH:MM:SS (con milisegundos si se indica el separador)."""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    if millis_separator is None:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{millis_separator}{millis:03d}"
+
+
+def iter_text_lines(transcript_data):
+    """Formato de texto del proyecto: `[HH:MM:SS] texto` por segmento."""
+    for text, start, _ in iter_segments(transcript_data):
+        yield f"[{_clock(int(start))}] {text}\n"
+
+
+def iter_srt_lines(transcript_data):
+    """Subtítulos SubRip (.srt)."""
+    for number, (text, start, duration) in enumerate(iter_segments(transcript_data), 1):
+        yield f"{number}\n{_clock(start, ',')} --> {_clock(start + duration, ',')}\n{text}\n\n"
+
+
+def iter_vtt_lines(transcript_data):
+    """Subtítulos WebVTT (.vtt)."""
+    yield "WEBVTT\n\n"
+    for text, start, duration in iter_segments(transcript_data):
+        yield f"{_clock(start, '.')} --> {_clock(start + duration, '.')}\n{text}\n\n"
+
+
+def iter_jsonl_lines(transcript_data):
+    """Un objeto JSON por segmento con `text`, `start` y `duration`."""
+    for text, start, duration in iter_segments(transcript_data):
+        yield json.dumps({'text': text, 'start': start, 'duration': duration},
+                         ensure_ascii=False) + "\n"
+
+
+# Formato -> función que genera las líneas. La extensión del archivo es el
+# nombre del formato.
+FORMATS = {
+    'txt': iter_text_lines,
+    'srt': iter_srt_lines,
+    'vtt': iter_vtt_lines,
+    'jsonl': iter_jsonl_lines,
+}
+
+
+def parse_formats(value):
+    """Convierte una lista separada por comas ("txt,srt") en una lista de formatos.
+
+    El formato txt se incluye siempre, porque el índice de transcripciones se
+    basa en los archivos .txt. Lanza ValueError si algún formato no existe.
+    """
+    formats = ['txt']
+    for name in (value or '').split(','):
+        name = name.strip().lower()
+        if not name or name in formats:
+            continue
+        if name not in FORMATS:
+            raise ValueError(f"Formato no soportado: {name} "
+                             f"(disponibles: {', '.join(FORMATS)})")
+        formats.append(name)
+    return formats
+
+
+def render(transcript_data, fmt='txt'):
+    """Devuelve la transcripción completa en el formato indicado, en una sola pasada."""
+    return ''.join(FORMATS[fmt](transcript_data))
+
+
+def write_transcript(f, transcript_data, fmt='txt'):
+    """Escribe la transcripción en el archivo abierto `f` segmento a segmento."""
+    f.writelines(FORMATS[fmt](transcript_data))
@@ -0,0 +1,94 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Conexiones que cada sesión mantiene abiertas por servidor
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+# Tiempos de espera en segundos para establecer la conexión y para recibir la respuesta
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+# Servidor que sustituye a https://www.youtube.com (por ejemplo, fake_youtube.py en las pruebas)
+YOUTUBE_WEB_URL = os.getenv('YOUTUBE_WEB_URL')
+
+_YOUTUBE_WEB_ORIGIN = 'https://www.youtube.com'
+
+
+class PooledSession(requests.Session):
+    """Sesión de requests con conexiones persistentes y tiempo de espera por defecto.
+
+    Los reintentos no se hacen aquí sino en `retry.call_with_retries`, que
+    conoce los tipos de error y la tasa de solicitudes.
+    """
+
+    def __init__(self, pool_size=None, timeout=None):
+        super().__init__()
+        pool_size = pool_size or HTTP_POOL_SIZE
+        self.timeout = timeout or (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if YOUTUBE_WEB_URL and url.startswith(_YOUTUBE_WEB_ORIGIN):
+            url = YOUTUBE_WEB_URL.rstrip('/') + url[len(_YOUTUBE_WEB_ORIGIN):]
+        return super().request(method, url, **kwargs)
+
+
+_local = threading.local()
+
+
+def get_session():
+    """Devuelve la sesión HTTP del hilo actual, creándola la primera vez.
+
+    Cada hilo reutiliza su sesión (y sus conexiones TCP/TLS abiertas) en
+    todas las solicitudes de transcripciones; las sesiones no se comparten
+    entre hilos porque requests no garantiza que sean seguras en ese caso.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = PooledSession()
+        _local.session = session
+    return session
+
+
+def list_transcripts(video_id):
+    """Equivalente a `YouTubeTranscriptApi.list_transcripts` usando la sesión del hilo.
+
+    La biblioteca abre una sesión nueva en cada llamada; aquí la lista (y las
+    descargas posteriores con `transcript.fetch()`, que usan la misma sesión)
+    reutilizan las conexiones abiertas.
+    """
+    from youtube_transcript_api._transcripts import TranscriptListFetcher
+    return TranscriptListFetcher(get_session()).fetch(video_id)
+
+
+class ThreadLocalHttp:
+    """Objeto `http` para googleapiclient con una conexión persistente por hilo.
+
+    httplib2.Http reutiliza la conexión entre solicitudes pero no es seguro
+    entre hilos, así que cada hilo (por ejemplo, los de paginación de varios
+    canales) usa su propia instancia.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or HTTP_READ_TIMEOUT
+        self._local = threading.local()
+
+    def _http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            import httplib2
+            http = httplib2.Http(timeout=self.timeout)
+            # Igual que googleapiclient: 308 no se trata como redirección
+            http.redirect_codes = http.redirect_codes - {308}
+            self._local.http = http
+        return http
+
+    def request(self, *args, **kwargs):
+        return self._http().request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._http(), name)
@@ -1,70 +1,68 @@
-from googleapiclient.discovery import build
 import csv
 import os
 import time
 import json
 import sys
 import argparse
+import itertools
 from datetime import datetime
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import NoTranscriptFound, TranscriptsDisabled
 from dotenv import load_dotenv
+from formatters import parse_formats, render, write_transcript
+from channel_state import get_channel_state
+from content_hash import get_content_hashes, transcript_hash
+from core import (execute_conditional, fetch_channel_info, get_channel_info, get_channels_info,
+                  get_transcript, get_video_id_from_url, get_youtube, has_api_key,
+                  iter_channel_videos, iter_video_details, parse_video_item, quota_tracker)
+from output_index import LAYOUTS, TranscriptIndex, transcript_path
+from output_writer import (TranscriptWriter, commit_staged, register_transcript,
+                           stage_transcript_files)
+from packed_store import PackedArchive
+from metrics import run_metrics, set_quiet, video_log
+from prefilter import PRIORITIES, Prefilter
+from pipeline import Prefetcher, ReorderBuffer, round_robin, run_bounded
+from progress_journal import ProgressJournal
+from quota import QuotaExceededError
+from retry import AdaptiveRateController, call_with_retries
+from search_index import get_default_index, open_default_index
+from transcript_cache import disable_default_cache, set_default_cache_dir
+from work_queue import LeaseKeeper, WorkQueue, default_worker_id
 
 # Cargar variables de entorno desde el archivo .env
 load_dotenv()
 
 # Obtener variables de entorno
-API_KEY = os.getenv('YOUTUBE_API_KEY')
 DEFAULT_CHANNEL_ID = os.getenv('DEFAULT_CHANNEL_ID')
 DEFAULT_OUTPUT_DIR = os.getenv('DEFAULT_OUTPUT_DIR', 'transcripciones')
 DEFAULT_VIDEO_LIMIT = int(os.getenv('DEFAULT_VIDEO_LIMIT', 0))
+DEFAULT_WORKERS = int(os.getenv('DEFAULT_WORKERS', 1))
+DEFAULT_RATE = float(os.getenv('DEFAULT_RATE', 5))
+DEFAULT_QUOTA_BUDGET = int(os.getenv('DEFAULT_QUOTA_BUDGET', 0))
+DEFAULT_LANGUAGES = os.getenv('DEFAULT_LANGUAGES', '')
+DEFAULT_FORMATS = os.getenv('DEFAULT_FORMATS', 'txt')
+DEFAULT_STORE = os.getenv('DEFAULT_STORE', 'txt')
+DEFAULT_LAYOUT = os.getenv('DEFAULT_LAYOUT', 'flat')
+# Archivos que se confirman juntos con fsync (0 = sin fsync)
+DEFAULT_FSYNC_BATCH = int(os.getenv('DEFAULT_FSYNC_BATCH', 0))
 
-# Verificar que la clave API esté configurada
-if not API_KEY:
-    print("Error: No se ha configurado la clave API de YouTube.")
-    print("Por favor, crea un archivo .env con la variable YOUTUBE_API_KEY.")
-    sys.exit(1)
-
-# Construir el objeto de servicio de YouTube
-youtube = build('youtube', 'v3', developerKey=API_KEY)
-
-def get_video_id_from_url(url):
-    """Extrae el ID del video de una URL de YouTube."""
-    if "youtube.com/watch?v=" in url:
-        return url.split("watch?v=")[1].split("&")[0]
-    elif "youtu.be/" in url:
-        return url.split("youtu.be/")[1].split("?")[0]
-    else:
-        return url  # Asumimos que ya es un ID
+# El cliente de la API de YouTube se construye la primera vez que se usa
+# (core.get_youtube), de modo que los modos que no necesitan metadatos
+# arrancan rápido y no requieren clave API.
 
-def get_channel_info(channel_id):
-    """Obtiene información básica del canal."""
-    try:
-        channel_response = youtube.channels().list(
-            part='snippet,statistics,contentDetails',
-            id=channel_id
-        ).execute()
-        
-        if not channel_response.get('items'):
-            print(f"No se encontró el canal con ID: {channel_id}")
-            return None
-        
-        channel_info = channel_response['items'][0]
-        return {
-            'id': channel_id,
-            'title': channel_info['snippet']['title'],
-            'description': channel_info['snippet'].get('description', ''),
-            'published_at': channel_info['snippet']['publishedAt'],
-            'video_count': channel_info['statistics'].get('videoCount', 0),
-            'subscriber_count': channel_info['statistics'].get('subscriberCount', 0),
-            'view_count': channel_info['statistics'].get('viewCount', 0),
-            'uploads_playlist_id': channel_info['contentDetails']['relatedPlaylists']['uploads']
-        }
-    except Exception as e:
-        print(f"Error al obtener información del canal: {e}")
-        return None
+def estimate_pagination_cost(channel_info, limit=None, incremental=False, prefilter=False):
+    """Estima las unidades de cuota necesarias para paginar los videos de un canal.
 
-def get_channel_videos(channel_id):
+    Con `prefilter`, cada página de 50 videos cuesta una unidad más por la
+    consulta de sus detalles.
+    """
+    if incremental:
+        return 2 if prefilter else 1
+    video_count = int(channel_info.get('video_count', 0) or 0)
+    if limit and limit > 0:
+        video_count = min(video_count, limit)
+    pages = max(1, -(-video_count // 50))
+    return pages * 2 if prefilter else pages
+
+def get_channel_videos(channel_id, limit=None):
     """Obtiene todos los videos de un canal de YouTube."""
     print(f"Obteniendo videos para el canal ID: {channel_id}")
     
@@ -75,173 +73,72 @@ def get_channel_videos(channel_id):
     
     print(f"Nombre del canal: {channel_info['title']}")
     print(f"Total de videos en el canal: {channel_info['video_count']}")
-    uploads_playlist_id = channel_info['uploads_playlist_id']
-
-    videos = []
-    next_page_token = None
-    total_videos = 0
-
-    # Recuperar videos de la lista de reproducción de subidas
-    while True:
-        try:
-            playlist_response = youtube.playlistItems().list(
-                playlistId=uploads_playlist_id,
-                part='snippet,contentDetails',
-                maxResults=50,  # Máximo permitido por solicitud
-                pageToken=next_page_token
-            ).execute()
-
-            for item in playlist_response.get('items', []):
-                video_id = item['contentDetails']['videoId']
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                video_title = item['snippet']['title']
-                video_published_at = item['snippet']['publishedAt']
-                videos.append({
-                    'id': video_id,
-                    'url': video_url,
-                    'title': video_title,
-                    'published_at': video_published_at,
-                    'channel_title': channel_info['title'],
-                    'channel_id': channel_id
-                })
-                total_videos += 1
-            
-            print(f"Obtenidos {total_videos} videos hasta ahora...")
-            next_page_token = playlist_response.get('nextPageToken')
-            if not next_page_token:
-                break
 
-            # Pequeña pausa para evitar límites de la API
-            time.sleep(0.5)
-            
-        except Exception as e:
-            print(f"Error al obtener videos: {e}")
-            break
+    videos = list(iter_channel_videos(channel_info, limit))
 
     print(f"Total de videos encontrados: {len(videos)}")
     return videos
 
-def get_transcript(video_id_or_url):
-    """Obtiene la transcripción de un video de YouTube en cualquier idioma disponible."""
-    video_id = get_video_id_from_url(video_id_or_url)
-    print(f"Obteniendo transcripción para el video ID: {video_id}")
-    
-    try:
-        # Obtener la lista de transcripciones disponibles
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+def get_transcript_path(video_info, output_dir, layout='flat'):
+    """Devuelve la ruta del archivo de texto de la transcripción de un video."""
+    return transcript_path(video_info, output_dir, layout)
 
-        # Intentar todas las transcripciones disponibles, empezando por las manuales
-        for transcript in transcript_list:
-            try:
-                print(f"Intentando con transcripción en {transcript.language} "
-                      f"(generada automáticamente: {transcript.is_generated})")
-                transcript_data = transcript.fetch()
-                
-                # Convertir a texto plano
-                transcript_text = ""
-                for item in transcript_data:
-                    # Acceder a los atributos correctamente
-                    # Los objetos FetchedTranscriptSnippet tienen atributos text, start y duration
-                    text = item.text if hasattr(item, 'text') else item['text'] if isinstance(item, dict) and 'text' in item else ""
-                    start = item.start if hasattr(item, 'start') else item['start'] if isinstance(item, dict) and 'start' in item else 0
-                    
-                    # Formato: [HH:MM:SS] Texto
-                    seconds = start
-                    hours, remainder = divmod(seconds, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    time_str = f"[{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}]"
-                    transcript_text += f"{time_str} {text}\n"
-                
-                return {
-                    'success': True,
-                    'language': transcript.language,
-                    'is_generated': transcript.is_generated,
-                    'transcript_data': transcript_data,
-                    'transcript_text': transcript_text
-                }
-            except Exception as e:
-                print(f"Error al obtener transcripción en {transcript.language}: {e}")
-                continue
-        
-        # Si llegamos aquí, no se encontró ninguna transcripción utilizable
-        print("No se encontró ninguna transcripción para este video.")
-        return {
-            'success': False,
-            'error': "No se encontró ninguna transcripción utilizable."
-        }
+def save_transcript_to_file(video_info, transcript_info, output_dir, index=None, formats=None,
+                            layout='flat'):
+    """Guarda la transcripción en un archivo de texto (en el hilo actual).
     
-    except NoTranscriptFound:
-        print(f"No se encontró transcripción para el video {video_id}")
-        return {
-            'success': False,
-            'error': "No se encontró ninguna transcripción."
-        }
-    except TranscriptsDisabled:
-        print(f"Las transcripciones están deshabilitadas para el video {video_id}")
-        return {
-            'success': False,
-            'error': "Las transcripciones están deshabilitadas para este video."
-        }
-    except Exception as e:
-        print(f"Error al obtener transcripciones: {e}")
-        return {
-            'success': False,
-            'error': str(e)
-        }
-
-def save_transcript_to_file(video_info, transcript_info, output_dir):
-    """Guarda la transcripción en un archivo de texto."""
+    `formats` puede añadir otros formatos (srt, vtt, jsonl), que se guardan
+    junto al .txt con el mismo nombre y su extensión. Los archivos se
+    escriben con un nombre temporal y se renombran al terminar. Si se indica
+    `index`, el archivo se registra en él y se elimina el de una versión
+    anterior del mismo video con otro título. Si existe el índice de
+    búsqueda, los segmentos se añaden también a él. Para muchos videos,
+    `TranscriptWriter` hace lo mismo en segundo plano.
+    """
     if not transcript_info['success']:
         print(f"No se pudo guardar la transcripción: {transcript_info.get('error', 'Error desconocido')}")
         return False
     
-    # Crear un nombre de archivo seguro basado en el título del video
-    safe_title = "".join([c if c.isalnum() or c in [' ', '-', '_'] else '_' for c in video_info['title']])
-    safe_title = safe_title[:100]  # Limitar la longitud del título
-    
-    output_file = os.path.join(output_dir, f"{video_info['id']}_{safe_title}.txt")
+    output_file = get_transcript_path(video_info, output_dir, layout)
     
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(f"Título: {video_info['title']}\n")
-            f.write(f"URL: {video_info['url']}\n")
-            f.write(f"Canal: {video_info['channel_title']}\n")
-            f.write(f"ID del Canal: {video_info.get('channel_id', '')}\n")
-            f.write(f"Fecha de publicación: {video_info['published_at']}\n")
-            f.write(f"Idioma: {transcript_info['language']}\n")
-            f.write(f"Generada automáticamente: {'Sí' if transcript_info['is_generated'] else 'No'}\n")
-            f.write("\n--- TRANSCRIPCIÓN ---\n\n")
-            f.write(transcript_info['transcript_text'])
-        
-        print(f"Transcripción guardada en: {output_file}")
+        commit_staged(stage_transcript_files(output_file, video_info, transcript_info, formats))
+        register_transcript(video_info, transcript_info, output_file, index)
+        video_log(f"Transcripción guardada en: {output_file}")
         return True
     except Exception as e:
         print(f"Error al guardar la transcripción: {e}")
         return False
 
+CSV_HEADER = [
+    'ID', 'URL', 'Título', 'Canal', 'ID del Canal', 
+    'Fecha de Publicación', 'Idioma', 'Generada Automáticamente', 
+    'Éxito', 'Error'
+]
+
+def video_to_csv_row(video):
+    """Convierte un video procesado en una fila del CSV de resultados."""
+    return [
+        video['id'],
+        video['url'], 
+        video['title'], 
+        video['channel_title'],
+        video.get('channel_id', ''),
+        video['published_at'], 
+        video.get('transcript_language', ''),
+        video.get('transcript_is_generated', ''),
+        video.get('transcript_success', False),
+        video.get('transcript_error', '')
+    ]
+
 def save_videos_to_csv(videos, filename):
     """Guarda los videos y sus transcripciones en un archivo CSV."""
     with open(filename, mode='w', newline='', encoding='utf-8') as file:
         writer = csv.writer(file)
-        writer.writerow([
-            'ID', 'URL', 'Título', 'Canal', 'ID del Canal', 
-            'Fecha de Publicación', 'Idioma', 'Generada Automáticamente', 
-            'Éxito', 'Error'
-        ])
+        writer.writerow(CSV_HEADER)
         
         for video in videos:
-            writer.writerow([
-                video['id'],
-                video['url'], 
-                video['title'], 
-                video['channel_title'],
-                video.get('channel_id', ''),
-                video['published_at'], 
-                video.get('transcript_language', ''),
-                video.get('transcript_is_generated', ''),
-                video.get('transcript_success', False),
-                video.get('transcript_error', '')
-            ])
+            writer.writerow(video_to_csv_row(video))
 
 def save_channel_info_to_file(channel_info, output_dir):
     """Guarda la información del canal en un archivo JSON."""
@@ -260,76 +157,77 @@ def save_channel_info_to_file(channel_info, output_dir):
         print(f"Error al guardar la información del canal: {e}")
         return False
 
-def save_progress(videos, processed_count, output_dir, channel_id):
-    """Guarda el progreso actual para poder reanudar más tarde."""
-    progress_file = os.path.join(output_dir, f"progreso_{channel_id}.json")
-    
-    # Solo guardar los videos que aún no se han procesado
-    remaining_videos = videos[processed_count:]
-    
-    # Convertir a un formato serializable
-    serializable_videos = []
-    for video in remaining_videos:
-        video_copy = video.copy()
-        # Eliminar datos de transcripción que no son serializables
-        if 'transcript_data' in video_copy:
-            del video_copy['transcript_data']
-        serializable_videos.append(video_copy)
-    
-    with open(progress_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'channel_id': channel_id,
-            'processed_count': processed_count,
-            'remaining_videos': serializable_videos,
-            'timestamp': datetime.now().isoformat()
-        }, f, ensure_ascii=False, indent=2)
-    
-    print(f"Progreso guardado en {progress_file}. Puedes reanudar más tarde.")
-
 def load_progress(output_dir, channel_id):
-    """Carga el progreso guardado anteriormente."""
-    progress_file = os.path.join(output_dir, f"progreso_{channel_id}.json")
+    """Carga el progreso guardado anteriormente.
     
-    if os.path.exists(progress_file):
+    Reconstruye el estado reproduciendo el diario `progreso_CHANNEL_ID.jsonl`.
+    Si solo existe un archivo de progreso antiguo (`.json`), lo convierte.
+    """
+    progress_file = os.path.join(output_dir, f"progreso_{channel_id}.jsonl")
+    journal = ProgressJournal.load(progress_file, channel_id)
+    
+    legacy_file = os.path.join(output_dir, f"progreso_{channel_id}.json")
+    if not journal.has_progress() and os.path.exists(legacy_file):
         try:
-            with open(progress_file, 'r', encoding='utf-8') as f:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
                 progress_data = json.load(f)
-                if progress_data.get('channel_id') == channel_id:
-                    return progress_data.get('processed_count', 0), progress_data.get('remaining_videos', [])
-                else:
-                    print(f"El archivo de progreso es para otro canal "
-                          f"({progress_data.get('channel_id')}). Ignorando.")
+            if progress_data.get('channel_id') == channel_id:
+                journal.pending = {video['id']: video
+                                   for video in progress_data.get('remaining_videos', [])}
+                journal.pagination_complete = progress_data.get('pagination_complete', True)
+                journal.compact()
+                os.remove(legacy_file)
+            else:
+                print(f"El archivo de progreso es para otro canal "
+                      f"({progress_data.get('channel_id')}). Ignorando.")
         except Exception as e:
             print(f"Error al cargar el progreso: {e}")
     
-    return 0, []
+    return journal
+
+def process_single_video(video_url, output_dir, transcript_options=None, formats=None,
+                         layout=DEFAULT_LAYOUT):
+    """Procesa un solo video y guarda su transcripción.
 
-def process_single_video(video_url, output_dir):
-    """Procesa un solo video y guarda su transcripción."""
+    `transcript_options` son los argumentos de preferencia de idioma de
+    `get_transcript` (`languages`, `prefer_generated` y `translate_to`).
+    Sin clave API, la transcripción se guarda sin los metadatos del video.
+    """
     video_id = get_video_id_from_url(video_url)
     
     # Obtener información del video
     try:
-        video_response = youtube.videos().list(
-            part='snippet',
-            id=video_id
-        ).execute()
-        
-        if not video_response.get('items'):
-            print(f"No se encontró el video con ID: {video_id}")
-            return False
-        
-        video_info = {
-            'id': video_id,
-            'url': video_url,
-            'title': video_response['items'][0]['snippet']['title'],
-            'channel_title': video_response['items'][0]['snippet']['channelTitle'],
-            'channel_id': video_response['items'][0]['snippet']['channelId'],
-            'published_at': video_response['items'][0]['snippet']['publishedAt']
-        }
+        if has_api_key():
+            video_response = call_with_retries(get_youtube().videos().list(
+                part='snippet',
+                id=video_id
+            ).execute)
+            
+            if not video_response.get('items'):
+                print(f"No se encontró el video con ID: {video_id}")
+                return False
+            
+            video_info = {
+                'id': video_id,
+                'url': video_url,
+                'title': video_response['items'][0]['snippet']['title'],
+                'channel_title': video_response['items'][0]['snippet']['channelTitle'],
+                'channel_id': video_response['items'][0]['snippet']['channelId'],
+                'published_at': video_response['items'][0]['snippet']['publishedAt']
+            }
+        else:
+            print("Sin clave API de YouTube: se omiten los metadatos del video.")
+            video_info = {
+                'id': video_id,
+                'url': f"https://www.youtube.com/watch?v={video_id}",
+                'title': video_id,
+                'channel_title': '',
+                'channel_id': '',
+                'published_at': ''
+            }
         
         # Obtener la transcripción
-        transcript_info = get_transcript(video_id)
+        transcript_info = get_transcript(video_id, **(transcript_options or {}))
         
         if transcript_info['success']:
             # Crear directorio para las transcripciones si no existe
@@ -337,13 +235,13 @@ def process_single_video(video_url, output_dir):
             os.makedirs(text_output_dir, exist_ok=True)
             
             # Guardar la transcripción
-            save_transcript_to_file(video_info, transcript_info, text_output_dir)
+            save_transcript_to_file(video_info, transcript_info, text_output_dir, formats=formats,
+                                    layout=layout)
             
             # Mostrar una vista previa
             print("\n--- VISTA PREVIA DE LA TRANSCRIPCIÓN ---")
-            preview_lines = transcript_info['transcript_text'].split('\n')[:10]
-            print('\n'.join(preview_lines))
-            if len(preview_lines) < 10:
+            print(render(transcript_info['transcript_data'][:10]), end='')
+            if len(transcript_info['transcript_data']) <= 10:
                 print("(Transcripción completa)")
             else:
                 print("...")
@@ -358,126 +256,1090 @@ def process_single_video(video_url, output_dir):
         print(f"Error al procesar el video: {e}")
         return False
 
-def process_channel(channel_id, output_dir, limit=None, force_refresh=False):
-    """Procesa todos los videos de un canal."""
-    # Crear directorios para los resultados
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+def read_video_ids(source):
+    """Lee URLs o IDs de videos de un archivo (o de la entrada estándar si es '-').
+
+    Ignora líneas vacías y comentarios (#) y elimina los duplicados
+    conservando el orden original.
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
     
-    text_output_dir = os.path.join(output_dir, "texto")
-    if not os.path.exists(text_output_dir):
-        os.makedirs(text_output_dir)
+    video_ids = []
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        video_id = get_video_id_from_url(line)
+        if video_id not in seen:
+            seen.add(video_id)
+            video_ids.append(video_id)
+    return video_ids
+
+def _refresh_change(video, transcript_info, digest, previous, exists, output_file, index, store):
+    """Motivo por el que hay que reescribir una transcripción en el modo de actualización.
+
+    Devuelve None si la transcripción guardada sigue siendo válida.
+    """
+    if not exists:
+        return 'nueva'
+    if previous is None:
+        return 'sin huella anterior'
+    if previous['hash'] != digest:
+        if previous['language_code'] != transcript_info.get('language_code', ''):
+            return 'otra pista'
+        return 'contenido'
+    # Mismo contenido, pero el archivo depende del título y de la disposición del directorio
+    if store is None and index is not None and index.get(video['id']) != output_file:
+        return 'archivo'
+    return None
+
+def process_video_transcript(video, text_output_dir, force_refresh=False, rate_limiter=None,
+                             index=None, transcript_options=None, formats=None, store=None,
+                             hashes=None, refresh=False, writer=None):
+    """Obtiene y guarda la transcripción de un video del canal.
+
+    Actualiza el diccionario `video` con el resultado y devuelve True si el
+    video tiene transcripción (nueva o ya existente). Con `index`, la
+    comprobación de archivos existentes se hace por ID de video en memoria.
+    `transcript_options` se pasa a `get_transcript` (preferencia de idioma) y
+    `formats` indica los formatos de archivo que se guardan. Con `store`
+    (PackedArchive), la transcripción se guarda en el almacén compacto en
+    lugar de en un archivo .txt. Con `hashes` (ContentHashStore) se registra
+    la huella de cada transcripción guardada. Con `refresh`, la transcripción
+    se vuelve a descargar (sin usar la caché) y solo se reescribe si su huella
+    ha cambiado; los cambios se anotan en `hashes`. Con `writer`
+    (TranscriptWriter), los archivos de texto se escriben en segundo plano y
+    `video['transcript_write']` queda con el `Future` de la escritura.
+    """
+    if writer is not None:
+        output_file = writer.path_for(video)
+    else:
+        output_file = get_transcript_path(video, text_output_dir)
     
-    # Obtener información del canal y guardarla
-    channel_info = get_channel_info(channel_id)
-    if not channel_info:
-        print(f"No se pudo obtener información del canal {channel_id}. Abortando.")
-        return False
+    # Verificar si la transcripción ya está guardada
+    if store is not None:
+        exists = video['id'] in store
+    elif index is not None:
+        exists = video['id'] in index
+    else:
+        exists = os.path.exists(output_file)
+    
+    if exists and not force_refresh and not refresh:
+        video_log(f"La transcripción ya existe para el video {video['id']}. Omitiendo...")
+        run_metrics.increment('skipped')
+        video['transcript_success'] = True
+        video['transcript_language'] = "already_processed"
+        video['transcript_is_generated'] = "unknown"
+        return True
     
-    save_channel_info_to_file(channel_info, output_dir)
+    # Obtener la transcripción respetando el límite de tasa compartido entre todos los hilos
+    transcript_info = get_transcript(video['id'], rate_limiter, **(transcript_options or {}),
+                                     use_cache=not refresh)
     
-    # Verificar si hay un progreso guardado
-    processed_count, remaining_videos = load_progress(output_dir, channel_id)
+    # Guardar información de la transcripción en el objeto de video
+    video['transcript_success'] = transcript_info['success']
+    video['transcript_retryable'] = transcript_info.get('retryable', False)
     
-    # Si hay videos restantes y no se fuerza el refresco, preguntar si se quiere reanudar
-    if remaining_videos and not force_refresh:
-        print(f"Se encontró un progreso guardado con {len(remaining_videos)} videos pendientes.")
-        resume = input("¿Deseas reanudar el procesamiento anterior? (s/n): ").lower()
+    if transcript_info['success']:
+        video['transcript_language'] = transcript_info['language']
+        video['transcript_is_generated'] = transcript_info['is_generated']
+        
+        digest = None
+        if hashes is not None:
+            digest = transcript_hash(transcript_info)
+        if refresh and hashes is not None:
+            previous = hashes.get(video['id'])
+            reason = _refresh_change(video, transcript_info, digest, previous, exists,
+                                     output_file, index, store)
+            if reason is None:
+                video_log(f"La transcripción del video {video['id']} no ha cambiado.")
+                run_metrics.increment('unchanged')
+                return True
+            video_log(f"La transcripción del video {video['id']} ha cambiado ({reason}).")
+            run_metrics.increment('changed')
+            hashes.record_change(video, previous, transcript_info, reason)
         
-        if resume == 's':
-            videos = remaining_videos
-            print(f"Reanudando procesamiento desde el video {processed_count + 1}...")
+        if store is not None:
+            with run_metrics.span('write_packed'):
+                store.add(video, transcript_info)
+            search_index = get_default_index()
+            if search_index is not None:
+                with run_metrics.span('search_index'):
+                    search_index.add_transcript(video['id'], video['title'],
+                                                transcript_info['transcript_data'])
+            saved = True
+        elif writer is not None:
+            # La huella se registra cuando el archivo ya está escrito
+            on_written = None
+            if hashes is not None:
+                on_written = lambda: hashes.set(video['id'], transcript_info, digest)
+            video['transcript_write'] = writer.submit(video, transcript_info, formats, index, on_written)
+            return True
         else:
-            # Obtener todos los videos del canal
-            videos = get_channel_videos(channel_id)
-            processed_count = 0
-    else:
-        # Obtener todos los videos del canal
-        videos = get_channel_videos(channel_id)
-        processed_count = 0
+            # Guardar la transcripción como archivo de texto
+            saved = save_transcript_to_file(video, transcript_info, text_output_dir, index, formats)
+        if saved and hashes is not None:
+            hashes.set(video['id'], transcript_info, digest)
+        return True
     
-    # Limitar el número de videos si se especifica
-    if limit and limit > 0:
-        videos = videos[:limit]
-        print(f"Limitando el procesamiento a {limit} videos.")
+    video['transcript_error'] = transcript_info.get('error', 'Error desconocido')
+    return False
+
+def _incremental_source(channel_info, state, limit=None):
+    """Genera solo los videos nuevos de un canal.
+
+    Pagina hasta el primer video ya procesado y después añade los videos que
+    se vieron en ejecuciones anteriores pero no llegaron a procesarse.
+    """
+    channel_id = channel_info['id']
+    yielded = set()
+    for video in iter_channel_videos(channel_info, limit,
+                                     stop_at=lambda video_id: state.is_processed(channel_id, video_id)):
+        yielded.add(video['id'])
+        yield video
+    for video in state.pending_videos(channel_id):
+        if limit and len(yielded) >= limit:
+            return
+        if video['id'] not in yielded:
+            yielded.add(video['id'])
+            yield video
+
+def _resume_source(journal, channel_info):
+    """Genera los videos pendientes de un progreso guardado.
+
+    Si la paginación no había terminado, continúa recorriendo el canal
+    omitiendo los videos ya procesados o ya pendientes.
+    """
+    pending_videos = list(journal.pending.values())
+    known_ids = set(journal.pending) | journal.done
+    yield from pending_videos
+    if not journal.pagination_complete:
+        for video in iter_channel_videos(channel_info):
+            if video['id'] not in known_ids:
+                yield video
+
+class ChannelRun:
+    """Estado de la extracción de un canal.
+
+    Agrupa lo que cada canal necesita por separado (información del canal,
+    diario de progreso, CSV de resultados y contadores) para que varios
+    canales puedan compartir el mismo grupo de hilos.
+    """
+
+    def __init__(self, channel_id, output_dir, state, limit=None, force_refresh=False,
+                 incremental=False, resume=None, queue_size=100, prefilter=None):
+        self.channel_id = channel_id
+        self.output_dir = output_dir
+        self.state = state
+        self.limit = limit
+        self.force_refresh = force_refresh
+        self.incremental = incremental
+        self.resume = resume
+        self.queue_size = queue_size
+        self.prefilter = prefilter
+        self.channel_info = None
+        self.journal = None
+        self.source = None
+        self.prefetcher = None
+        self.processed_count = 0
+        self.videos_with_transcripts = 0
+        self.finished = 0
+        self.csv_filename = None
+        self._csv_file = None
+        self._csv_writer = None
+        self._reorder = None
+        self.quota_exhausted = False
+        self.pagination_error = None
+        self.retryable_errors = 0
+
+    def prepare(self, channel_info=None):
+        """Obtiene la información del canal y decide qué videos procesar.
+
+        Se puede pasar `channel_info` si ya se obtuvo antes. Devuelve False si
+        no se pudo obtener la información del canal.
+        """
+        channel_id = self.channel_id
+        
+        # Obtener información del canal y guardarla
+        self.channel_info = channel_info or get_channel_info(channel_id)
+        if not self.channel_info:
+            print(f"No se pudo obtener información del canal {channel_id}. Abortando.")
+            return False
+        
+        save_channel_info_to_file(self.channel_info, self.output_dir)
+        print(f"Nombre del canal: {self.channel_info['title']}")
+        print(f"Total de videos en el canal: {self.channel_info['video_count']}")
+        
+        # Verificar si hay un progreso guardado
+        journal = load_progress(self.output_dir, channel_id)
+        limit = self.limit
+        
+        # Si hay videos restantes y no se fuerza el refresco, reanudar
+        if journal.has_progress() and not self.force_refresh:
+            print(f"Se encontró un progreso guardado con {len(journal.pending)} videos pendientes "
+                  f"y {len(journal.done)} ya procesados.")
+            resume = self.resume
+            if resume is None:
+                if sys.stdin.isatty():
+                    resume = input("¿Deseas reanudar el procesamiento anterior? (s/n): ").lower() == 's'
+                else:
+                    print("Sin terminal interactiva: se reanuda automáticamente.")
+                    resume = True
+            
+            if resume:
+                self.source = _resume_source(journal, self.channel_info)
+                if limit and limit > 0:
+                    self.source = itertools.islice(self.source, limit)
+                self.processed_count = len(journal.done)
+                print(f"Reanudando procesamiento desde el video {self.processed_count + 1}...")
+        
+        if self.source is None:
+            # Empezar un progreso nuevo
+            journal.remove()
+            journal = ProgressJournal(journal.path, channel_id)
+        self.journal = journal
+        
+        if self.source is None and self.incremental:
+            print(f"Sincronización incremental: {self.state.count(channel_id)} videos ya procesados.")
+            self.source = _incremental_source(self.channel_info, self.state, limit)
+        elif self.source is None:
+            # Recorrer los videos del canal a medida que se paginan
+            self.source = iter_channel_videos(self.channel_info, limit)
+        
+        if limit and limit > 0:
+            print(f"Limitando el procesamiento a {limit} videos.")
+        
+        # Omitir los videos que no pueden tener transcripción y ordenar el resto
+        if self.prefilter is not None:
+            print(f"Filtrando los videos sin subtítulos posibles (prioridad: {self.prefilter.priority}).")
+            self.source = self.prefilter.filter(self.source)
+        
+        # Los resultados se escriben en el CSV a medida que terminan, en el orden
+        # original de los videos. El progreso se registra en el diario con una
+        # línea por video recibido y otra por video terminado.
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.csv_filename = os.path.join(self.output_dir,
+                                         f"videos_transcripciones_{channel_id}_{timestamp}.csv")
+        self._csv_file = open(self.csv_filename, mode='w', newline='', encoding='utf-8')
+        self._csv_writer = csv.writer(self._csv_file)
+        self._csv_writer.writerow(CSV_HEADER)
+        self._reorder = ReorderBuffer(start=self.processed_count)
+        return True
+
+    def videos(self):
+        """Genera tuplas `(run, posición, video)` con los videos a procesar.
+
+        La paginación se hace en segundo plano con una cola acotada y empieza
+        la primera vez que se pide un video.
+        """
+        self.prefetcher = Prefetcher(self.source, maxsize=self.queue_size)
+        position = self.processed_count
+        try:
+            for video in self.prefetcher:
+                if video['id'] not in self.journal.pending:
+                    self.journal.record_seen(video)
+                self.state.mark_seen(video)
+                yield self, position, video
+                position += 1
+        except QuotaExceededError as e:
+            # Se procesan los videos ya recibidos y el resto queda pendiente
+            print(f"{e}. Paginación de {self.channel_info['title']} detenida.")
+            self.quota_exhausted = True
+        except Exception as e:
+            # Error persistente tras los reintentos: el canal queda incompleto
+            # (no se trata la lista parcial como si fuera el canal completo)
+            print(f"Error al obtener videos de {self.channel_info['title']}: {e}. "
+                  f"Paginación detenida; se reanudará en la próxima ejecución.")
+            self.pagination_error = str(e)
+        finally:
+            self.prefetcher.close()
+
+    def complete(self, position, video, has_transcript):
+        """Registra un video terminado y escribe en orden las filas del CSV.
+
+        Los videos que fallaron por errores temporales no se marcan como
+        procesados, para reintentarlos en la próxima ejecución.
+        """
+        if has_transcript:
+            self.videos_with_transcripts += 1
+        self.finished += 1
+        if video.get('transcript_retryable'):
+            self.retryable_errors += 1
+        else:
+            self.journal.record_done(video)
+            self.state.mark_processed(video)
+        video_log(f"Procesado video {self.processed_count + self.finished} "
+                  f"de {self.channel_info['title']}: {video['title']}")
+        
+        for ready in self._reorder.add(position, video):
+            self._csv_writer.writerow(video_to_csv_row(ready))
+        
+        if self.finished % 10 == 0:
+            self._csv_file.flush()
+
+    def checkpoint(self):
+        """Cierra el CSV y deja el diario listo para reanudar más tarde."""
+        if self.prefetcher:
+            self.prefetcher.close()
+            if self.prefetcher.exhausted and not self.journal.pagination_complete:
+                self.journal.record_paginated()
+        if self._csv_file:
+            self._csv_file.close()
+        self.journal.close()
+        print(f"Progreso guardado en {self.journal.path}. Puedes reanudar más tarde.")
+
+    def finish(self):
+        """Cierra el CSV y elimina el diario tras completar el canal.
+
+        Si la paginación se detuvo por falta de cuota, el diario se conserva
+        para continuar en la próxima ejecución.
+        """
+        self._csv_file.close()
+        if self.quota_exhausted or self.pagination_error or self.retryable_errors:
+            if self.prefetcher.exhausted and not self.journal.pagination_complete:
+                self.journal.record_paginated()
+            self.journal.close()
+            if self.quota_exhausted:
+                reason = "falta de cuota"
+            elif self.pagination_error:
+                reason = "errores al paginar"
+            else:
+                reason = f"{self.retryable_errors} videos con errores temporales"
+            print(f"Canal {self.channel_id} incompleto por {reason}. "
+                  f"Progreso guardado en {self.journal.path}.")
+            return
+        # Eliminar el archivo de progreso si se completó todo
+        self.journal.remove()
+
+    def print_summary(self):
+        print(f"Canal: {self.channel_info['title']} (ID: {self.channel_id})")
+        print(f"Total de videos procesados: {self._reorder.next_index}")
+        print(f"Videos con transcripciones: {self.videos_with_transcripts}")
+        print(f"Videos sin transcripciones: "
+              f"{self.finished - self.videos_with_transcripts - self.retryable_errors}")
+        if self.retryable_errors:
+            print(f"Videos con errores temporales (pendientes): {self.retryable_errors}")
+        if self.prefilter is not None:
+            print(f"Videos omitidos por el filtro previo: {self.prefilter.skipped} "
+                  f"(procesados al final: {self.prefilter.deferred})")
+        print(f"Resultados guardados en CSV: {self.csv_filename}")
+
+def _complete_written(waiting, wait=False):
+    """Registra como terminados los videos cuya transcripción ya está escrita.
+
+    `waiting` es una lista de tuplas `(complete, posición, video, tiene
+    transcripción)`, donde `complete` es la función que registra el video
+    (por ejemplo, `ChannelRun.complete`). Un video solo se registra cuando su
+    archivo tiene el nombre definitivo; si no se pudo guardar, se registra sin
+    transcripción y como error temporal, para reintentarlo en la próxima
+    ejecución. Devuelve los que siguen esperando (ninguno con `wait`).
+    """
+    remaining = []
+    for item in waiting:
+        complete, position, video, has_transcript = item
+        written = video.get('transcript_write')
+        if written is not None:
+            if not wait and not written.done():
+                remaining.append(item)
+                continue
+            del video['transcript_write']
+            if not written.result():
+                video['transcript_success'] = False
+                video['transcript_retryable'] = True
+                video['transcript_error'] = "No se pudo guardar la transcripción"
+                has_transcript = False
+        complete(position, video, has_transcript)
+    return remaining
+
+def _run_channels(runs, text_output_dir, force_refresh=False, workers=DEFAULT_WORKERS,
+                  rate=DEFAULT_RATE, queue_size=100, active_channels=None, transcript_options=None,
+                  formats=None, store=None, hashes=None, refresh=False, layout=DEFAULT_LAYOUT,
+                  fsync_batch=DEFAULT_FSYNC_BATCH):
+    """Procesa los videos de uno o varios canales con un único grupo de hilos.
+
+    Los videos de los canales se intercalan por turnos y todos los hilos
+    comparten el mismo límite de tasa. Los archivos de texto se escriben en
+    segundo plano (`TranscriptWriter`, con la disposición `layout` y
+    confirmaciones en grupos de `fsync_batch`), de modo que los hilos de
+    descarga no esperan al disco. Devuelve el índice de transcripciones.
+    """
+    workers = max(1, workers or 1)
+    rate_limiter = AdaptiveRateController(rate, max_concurrency=workers)
     
-    # Procesar cada video para obtener su transcripción
-    total_videos = len(videos)
-    videos_with_transcripts = 0
+    if workers > 1:
+        print(f"Procesando con {workers} hilos en paralelo.")
+    
+    # Índice de las transcripciones ya guardadas, por ID de video
+    index = TranscriptIndex.scan(text_output_dir)
+    writer = None
+    if store is None:
+        writer = TranscriptWriter(text_output_dir, layout, queue_size, fsync_batch)
+    
+    def process(item):
+        run, position, video = item
+        return process_video_transcript(video, text_output_dir, force_refresh, rate_limiter, index,
+                                        transcript_options, formats, store, hashes, refresh, writer)
+    
+    def drain(waiting):
+        # Terminar de escribir lo ya descargado antes de guardar el progreso
+        if writer is not None:
+            writer.close()
+        _complete_written(waiting, wait=True)
     
+    source = round_robin((run.videos() for run in runs), max_active=active_channels)
+    results = run_bounded(process, source, workers=workers, window=max(queue_size, workers * 4))
+    waiting = []
     try:
-        for i, video in enumerate(videos):
-            print(f"\nProcesando video {processed_count + i + 1}/{processed_count + total_videos}: "
-                  f"{video['title']}")
-            
-            # Verificar si el archivo de texto ya existe
-            safe_title = "".join([c if c.isalnum() or c in [' ', '-', '_'] else '_' for c in video['title']])
-            safe_title = safe_title[:100]
-            
-            transcript_file = os.path.join(text_output_dir, f"{video['id']}_{safe_title}.txt")
-            
-            if os.path.exists(transcript_file) and not force_refresh:
-                print(f"La transcripción ya existe para este video. Omitiendo...")
-                video['transcript_success'] = True
-                video['transcript_language'] = "already_processed"
-                video['transcript_is_generated'] = "unknown"
-                videos_with_transcripts += 1
-                continue
-            
-            # Obtener la transcripción
-            transcript_info = get_transcript(video['id'])
-            
-            # Guardar información de la transcripción en el objeto de video
-            video['transcript_success'] = transcript_info['success']
-            
-            if transcript_info['success']:
-                video['transcript_language'] = transcript_info['language']
-                video['transcript_is_generated'] = transcript_info['is_generated']
-                videos_with_transcripts += 1
-                
-                # Guardar la transcripción como archivo de texto
-                save_transcript_to_file(video, transcript_info, text_output_dir)
-            else:
-                video['transcript_error'] = transcript_info.get('error', 'Error desconocido')
-            
-            # Guardar progreso cada 10 videos
-            if (i + 1) % 10 == 0:
-                save_progress(videos, processed_count + i + 1, output_dir, channel_id)
-            
-            # Pequeña pausa para evitar límites de la API
-            time.sleep(0.2)
+        for _, (run, position, video), future in results:
+            waiting.append((run.complete, position, video, future.result()))
+            waiting = _complete_written(waiting)
+        drain(waiting)
     
     except KeyboardInterrupt:
         print("\nProcesamiento interrumpido por el usuario.")
-        save_progress(videos, processed_count + i, output_dir, channel_id)
+        results.close()
+        drain(waiting)
+        for run in runs:
+            run.checkpoint()
         print("Progreso guardado. Puedes reanudar más tarde.")
         sys.exit(0)
     except Exception as e:
         print(f"\nError durante el procesamiento: {e}")
-        save_progress(videos, processed_count + i, output_dir, channel_id)
+        results.close()
+        drain(waiting)
+        for run in runs:
+            run.checkpoint()
         print("Progreso guardado debido a un error. Puedes reanudar más tarde.")
         raise
     
-    # Guardar resultados
+    if rate_limiter.throttled or rate_limiter.retries:
+        print(f"\nLimitaciones del servidor: {rate_limiter.throttled}, reintentos: {rate_limiter.retries}, "
+              f"pausas globales: {rate_limiter.breaker_trips}")
+    
+    return index
+
+def open_packed_archive(output_dir):
+    """Abre el almacén compacto de transcripciones del directorio de salida."""
+    return PackedArchive(os.path.join(output_dir, "paquetes"))
+
+def process_channel(channel_id, output_dir, limit=None, force_refresh=False,
+                    workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, queue_size=100,
+                    incremental=False, resume=None, transcript_options=None, formats=None,
+                    store='txt', prefilter=None, priority_window=50, refresh=False,
+                    layout=DEFAULT_LAYOUT, fsync_batch=DEFAULT_FSYNC_BATCH, channel_info=None):
+    """Procesa todos los videos de un canal.
+
+    Los videos se obtienen de la API en segundo plano y se envían a los hilos
+    de transcripción en cuanto llega cada página; `queue_size` limita cuántos
+    videos recibidos pueden esperar en memoria. Con `incremental`, solo se
+    procesan los videos subidos desde la última ejecución. `resume` indica si
+    se reanuda un progreso guardado; si es None se pregunta al usuario cuando
+    hay una terminal interactiva y se reanuda automáticamente en otro caso.
+    `transcript_options` indica la preferencia de idioma de las transcripciones
+    y `formats`, los formatos de archivo que se guardan. Con `store='packed'`
+    las transcripciones se guardan en el almacén compacto (`paquetes/`) en
+    lugar de en archivos .txt. Con `prefilter` (una prioridad de
+    `prefilter.PRIORITIES`, por ejemplo 'newest'), se consultan los detalles
+    de los videos en lotes de 50 para omitir los que no pueden tener
+    subtítulos y ordenar el resto en bloques de `priority_window` videos.
+    Con `refresh`, se recorre el canal completo, se vuelven a descargar las
+    transcripciones y solo se reescriben las que han cambiado. `layout`
+    ('flat' o 'sharded') es la disposición del directorio `texto/` y
+    `fsync_batch`, el número de archivos que se confirman juntos con fsync
+    (0 = sin fsync). Se puede pasar `channel_info` si ya se obtuvo antes.
+    """
+    # Crear directorios para los resultados
+    text_output_dir = os.path.join(output_dir, "texto")
+    os.makedirs(text_output_dir, exist_ok=True)
+    
+    # Registro de los videos ya vistos y procesados del canal
+    state = get_channel_state(output_dir)
+    hashes = get_content_hashes(output_dir)
+    if refresh and incremental:
+        print("El modo de actualización recorre el canal completo; se ignora --incremental.")
+        incremental = False
+    
+    run = ChannelRun(channel_id, output_dir, state, limit, force_refresh or refresh,
+                     incremental, resume, queue_size,
+                     Prefilter(prefilter, priority_window) if prefilter else None)
+    if not run.prepare(channel_info):
+        state.close()
+        hashes.close()
+        return False
+    
+    archive = open_packed_archive(output_dir) if store == 'packed' else None
+    index = _run_channels([run], text_output_dir, force_refresh, workers, rate, queue_size,
+                          transcript_options=transcript_options, formats=formats, store=archive,
+                          hashes=hashes, refresh=refresh, layout=layout, fsync_batch=fsync_batch)
+    run.finish()
+    state.close()
+    if archive is not None:
+        archive.close()
+    manifest_file = index.save_manifest()
+    
+    print(f"\n--- RESUMEN ---")
+    run.print_summary()
+    if refresh:
+        print_refresh_summary(hashes, output_dir)
+    hashes.close()
+    if archive is not None:
+        print(f"Almacén compacto de transcripciones: {archive.directory} ({len(archive)} videos)")
+    else:
+        print(f"Transcripciones de texto guardadas en: {text_output_dir}")
+    print(f"Índice de transcripciones: {manifest_file} "
+          f"({len(index.duplicates())} duplicados, {len(index.orphans())} huérfanos)")
+    
+    return True
+
+def process_channels(channel_ids, output_dir, limit=None, force_refresh=False,
+                     workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, queue_size=100,
+                     incremental=False, resume=None, active_channels=4, transcript_options=None,
+                     formats=None, store='txt', prefilter=None, priority_window=50, refresh=False,
+                     layout=DEFAULT_LAYOUT, fsync_batch=DEFAULT_FSYNC_BATCH):
+    """Procesa varios canales con un grupo de hilos y un límite de tasa compartidos.
+
+    Cada canal conserva su propio archivo de información, CSV y progreso, como
+    con `process_channel`. Los videos se reparten por turnos entre como mucho
+    `active_channels` canales a la vez; `limit` y `prefilter` se aplican a
+    cada canal, y `refresh`, `layout` y `fsync_batch` tienen el mismo sentido
+    que en `process_channel`.
+    """
+    text_output_dir = os.path.join(output_dir, "texto")
+    os.makedirs(text_output_dir, exist_ok=True)
+    
+    state = get_channel_state(output_dir)
+    if refresh and incremental:
+        print("El modo de actualización recorre los canales completos; se ignora --incremental.")
+        incremental = False
+    
+    # Obtener la información de todos los canales en lotes y planificar según
+    # la cuota disponible: solo se empiezan los canales cuya paginación cabe en
+    # el presupuesto restante, y el resto se deja para otra ejecución.
+    channels_info = get_channels_info(channel_ids)
+    remaining = quota_tracker.remaining()
+    
+    runs = []
+    deferred = []
+    for channel_id in channel_ids:
+        channel_info = channels_info.get(channel_id)
+        if not channel_info:
+            print(f"No se encontró el canal con ID: {channel_id}")
+            continue
+        
+        if remaining is not None:
+            cost = estimate_pagination_cost(channel_info, limit, incremental, bool(prefilter))
+            if cost > remaining and runs:
+                deferred.append(channel_id)
+                continue
+            remaining -= min(cost, remaining)
+        
+        print(f"\nPreparando canal: {channel_id}")
+        run = ChannelRun(channel_id, output_dir, state, limit, force_refresh or refresh,
+                         incremental, resume, queue_size,
+                         Prefilter(prefilter, priority_window) if prefilter else None)
+        if run.prepare(channel_info):
+            runs.append(run)
+    
+    if deferred:
+        print(f"\nCanales aplazados por falta de cuota ({len(deferred)}): {', '.join(deferred)}")
+    
+    if not runs:
+        print("No se pudo preparar ningún canal.")
+        state.close()
+        return False
+    
+    archive = open_packed_archive(output_dir) if store == 'packed' else None
+    hashes = get_content_hashes(output_dir)
+    index = _run_channels(runs, text_output_dir, force_refresh, workers, rate, queue_size,
+                          active_channels=active_channels, transcript_options=transcript_options,
+                          formats=formats, store=archive, hashes=hashes, refresh=refresh,
+                          layout=layout, fsync_batch=fsync_batch)
+    for run in runs:
+        run.finish()
+    state.close()
+    if archive is not None:
+        archive.close()
+    manifest_file = index.save_manifest()
+    
+    print(f"\n--- RESUMEN ---")
+    for run in runs:
+        run.print_summary()
+        print()
+    print(f"Canales procesados: {len(runs)} de {len(channel_ids)}")
+    if deferred:
+        print(f"Canales aplazados por falta de cuota: {len(deferred)}")
+    if refresh:
+        print_refresh_summary(hashes, output_dir)
+    hashes.close()
+    if archive is not None:
+        print(f"Almacén compacto de transcripciones: {archive.directory} ({len(archive)} videos)")
+    else:
+        print(f"Transcripciones de texto guardadas en: {text_output_dir}")
+    print(f"Índice de transcripciones: {manifest_file} "
+          f"({len(index.duplicates())} duplicados, {len(index.orphans())} huérfanos)")
+    
+    return True
+
+def read_channel_ids(source):
+    """Lee IDs de canales de un archivo (o de la entrada estándar si es '-').
+
+    Ignora líneas vacías y comentarios (#) y elimina los duplicados.
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    
+    channel_ids = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#') and line not in channel_ids:
+            channel_ids.append(line)
+    return channel_ids
+
+def process_videos(video_ids, output_dir, force_refresh=False,
+                   workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, transcript_options=None,
+                   formats=None, refresh=False, layout=DEFAULT_LAYOUT,
+                   fsync_batch=DEFAULT_FSYNC_BATCH):
+    """Procesa una lista de videos sueltos.
+
+    La información de los videos se obtiene en lotes de 50 y cada video pasa
+    por el mismo proceso de transcripción y guardado que los de un canal.
+    Con `refresh`, solo se reescriben las transcripciones que han cambiado.
+    `layout` y `fsync_batch` tienen el mismo sentido que en `process_channel`.
+    """
+    text_output_dir = os.path.join(output_dir, "texto")
+    os.makedirs(text_output_dir, exist_ok=True)
+    
+    print(f"Videos a procesar (sin duplicados): {len(video_ids)}")
+    
+    workers = max(1, workers or 1)
+    rate_limiter = AdaptiveRateController(rate, max_concurrency=workers)
+    
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    csv_filename = os.path.join(output_dir, f"videos_transcripciones_{channel_id}_{timestamp}.csv")
-    save_videos_to_csv(videos, csv_filename)
+    csv_filename = os.path.join(output_dir, f"videos_transcripciones_lote_{timestamp}.csv")
     
-    # Eliminar el archivo de progreso si se completó todo
-    progress_file = os.path.join(output_dir, f"progreso_{channel_id}.json")
-    if os.path.exists(progress_file):
-        os.remove(progress_file)
+    # Índice de las transcripciones ya guardadas, por ID de video
+    index = TranscriptIndex.scan(text_output_dir)
+    hashes = get_content_hashes(output_dir)
+    writer = TranscriptWriter(text_output_dir, layout, fsync_batch=fsync_batch)
+    
+    def process(video):
+        if video.get('details_error'):
+            # Sin la información del video no se guarda: queda como error temporal
+            run_metrics.increment('errors')
+            video['transcript_success'] = False
+            video['transcript_retryable'] = True
+            video['transcript_error'] = video['details_error']
+            return False
+        return process_video_transcript(video, text_output_dir, force_refresh, rate_limiter, index,
+                                        transcript_options, formats, None, hashes, refresh, writer)
+    
+    reorder = ReorderBuffer()
+    videos_with_transcripts = 0
+    details_errors = 0
+    finished = 0
+    quota_exhausted = False
+    
+    def videos(source):
+        nonlocal quota_exhausted
+        try:
+            yield from source
+        except QuotaExceededError as e:
+            # Se terminan los videos ya recibidos y se omiten los restantes
+            print(f"{e}. Se omiten los videos restantes.")
+            quota_exhausted = True
+    
+    with open(csv_filename, mode='w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(CSV_HEADER)
+        
+        def complete(position, video, has_transcript):
+            nonlocal videos_with_transcripts, details_errors, finished
+            if has_transcript:
+                videos_with_transcripts += 1
+            if video.get('details_error'):
+                details_errors += 1
+            finished += 1
+            video_log(f"Procesado video {finished}/{len(video_ids)}: {video['title']}")
+            
+            for ready in reorder.add(position, video):
+                csv_writer.writerow(video_to_csv_row(ready))
+        
+        # Cada video se cuenta cuando su archivo ya está escrito (o ha fallado)
+        prefetcher = Prefetcher(iter_video_details(video_ids))
+        waiting = []
+        try:
+            for position, video, future in run_bounded(process, videos(prefetcher), workers=workers):
+                waiting.append((complete, position, video, future.result()))
+                waiting = _complete_written(waiting)
+        finally:
+            prefetcher.close()
+            writer.close()
+        _complete_written(waiting, wait=True)
+    
+    manifest_file = index.save_manifest()
     
     print(f"\n--- RESUMEN ---")
-    print(f"Canal: {channel_info['title']} (ID: {channel_id})")
-    print(f"Total de videos procesados: {processed_count + total_videos}")
+    print(f"Videos solicitados: {len(video_ids)}")
+    print(f"Videos encontrados: {finished - details_errors}")
     print(f"Videos con transcripciones: {videos_with_transcripts}")
-    print(f"Videos sin transcripciones: {processed_count + total_videos - videos_with_transcripts}")
+    print(f"Videos sin transcripciones: "
+          f"{finished - videos_with_transcripts - writer.failed - details_errors}")
+    if details_errors:
+        print(f"Videos sin información por errores de la API (se reintentarán al repetir la lista): "
+              f"{details_errors}")
+    if writer.failed:
+        print(f"Videos con errores al guardar la transcripción: {writer.failed}")
+    if quota_exhausted:
+        print("Cuota de la API agotada: no se procesaron todos los videos solicitados.")
     print(f"Resultados guardados en CSV: {csv_filename}")
     print(f"Transcripciones de texto guardadas en: {text_output_dir}")
+    print(f"Índice de transcripciones: {manifest_file} "
+          f"({len(index.duplicates())} duplicados, {len(index.orphans())} huérfanos)")
+    if refresh:
+        print_refresh_summary(hashes, output_dir)
+    hashes.close()
     
     return True
 
+def print_refresh_summary(hashes, output_dir, shown=20):
+    """Muestra las transcripciones que han cambiado y guarda la lista completa en JSON."""
+    counters = run_metrics.counters()
+    print(f"Transcripciones sin cambios: {counters.get('unchanged', 0)}")
+    print(f"Transcripciones reescritas: {counters.get('changed', 0)}")
+    print(f"Páginas y lotes de la API sin cambios (304): {counters.get('not_modified', 0)}")
+    if not hashes.changes:
+        return None
+    for change in hashes.changes[:shown]:
+        print(f"  {change['id']} ({change['reason']}): {change['title']}")
+    if len(hashes.changes) > shown:
+        print(f"  ... y {len(hashes.changes) - shown} más")
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = hashes.write_changes(os.path.join(output_dir, f"cambios_transcripciones_{timestamp}.json"))
+    print(f"Lista de cambios guardada en: {path}")
+    return path
+
+def queue_directory(output_dir, queue_dir=None):
+    """Directorio de la cola de trabajos (por defecto, `cola/` en el directorio de salida)."""
+    return queue_dir or os.path.join(output_dir, "cola")
+
+def enqueue_jobs(queue_dir, kind, targets, limit=None, incremental=False):
+    """Añade videos o canales a la cola de trabajos."""
+    options = {}
+    if kind == 'channel':
+        options = {'limit': limit or None, 'incremental': incremental}
+    added = WorkQueue(queue_dir).add(kind, targets, options)
+    print(f"Trabajos añadidos a {queue_dir}: {added} "
+          f"({len(targets) - added} ya estaban en la cola)")
+    return added
+
+def report_queue(queue_dir, lease_seconds=300):
+    """Muestra el estado de la cola de trabajos."""
+    status = WorkQueue(queue_dir, lease_seconds).status()
+    print(f"Cola de trabajos: {queue_dir}")
+    print(f"Total: {status['total']}")
+    print(f"Terminados: {status['done']}")
+    print(f"En curso: {status['leased']}")
+    print(f"Abandonados (lease caducado): {status['expired']}")
+    print(f"Pendientes: {status['pending']}")
+    return status
+
+def _process_video_jobs(leases, text_output_dir, workers, rate_limiter, transcript_options,
+                        formats, store, hashes=None, writer=None, index=None):
+    """Procesa un lote de trabajos de video. Devuelve `{ID de trabajo: resultado}`.
+
+    Los videos con errores temporales (o cuya transcripción no se pudo
+    guardar) quedan sin resultado, para que se reintenten más tarde. Con
+    `writer`, se espera a que los archivos del lote estén escritos antes de
+    devolver los resultados. Con `index` (TranscriptIndex), los videos ya
+    guardados se reconocen por ID aunque haya cambiado su título.
+    """
+    video_ids = [lease.job['target'] for lease in leases]
+    try:
+        with run_metrics.span('video_details'):
+            video_response = execute_conditional(get_youtube().videos().list(
+                part='snippet',
+                id=','.join(video_ids),
+                maxResults=len(video_ids)
+            ), f"videos:snippet:{','.join(video_ids)}")
+    except Exception as e:
+        # Sin la información no se puede saber si los videos existen (falta de cuota, errores)
+        print(f"Error al obtener información de los videos: {e}")
+        return {}
+    videos = {item['id']: parse_video_item(item) for item in video_response.get('items', [])}
+    results = {}
+    
+    def process(video):
+        return process_video_transcript(video, text_output_dir, False, rate_limiter, index,
+                                        transcript_options, formats, store, hashes, False, writer)
+    
+    for _, video, future in run_bounded(process, videos.values(), workers=workers):
+        written = video.pop('transcript_write', None)
+        if video.get('transcript_retryable') or (written is not None and not written.result()):
+            continue
+        results[f"video-{video['id']}"] = {
+            'status': 'ok' if future.result() else 'no_transcript',
+            'language': video.get('transcript_language'),
+            'error': video.get('transcript_error')
+        }
+    for video_id in video_ids:
+        if video_id not in videos:
+            results[f"video-{video_id}"] = {'status': 'not_found'}
+    return results
+
+def _process_channel_job(job, output_dir, workers, rate, transcript_options, formats, store,
+                         layout, fsync_batch):
+    """Procesa un trabajo de canal. Devuelve `{ID de trabajo: resultado}`.
+
+    Solo hay resultado si el canal se completó o no existe. Si se detuvo antes
+    (falta de cuota, errores al paginar o errores temporales), el trabajo
+    queda sin resultado: cuando caduque su lease, otro proceso lo reanudará
+    desde el diario de progreso del canal.
+    """
+    channel_id = job['target']
+    try:
+        channel_info = fetch_channel_info(channel_id)
+    except Exception as e:
+        print(f"Error al obtener información del canal {channel_id}: {e}")
+        return {}
+    if channel_info is None:
+        print(f"No se encontró el canal con ID: {channel_id}")
+        return {job['id']: {'status': 'not_found'}}
+    
+    options = job.get('options', {})
+    processed = process_channel(channel_id, output_dir, options.get('limit'),
+                                workers=workers, rate=rate,
+                                incremental=options.get('incremental', False),
+                                resume=True, transcript_options=transcript_options,
+                                formats=formats, store=store, layout=layout,
+                                fsync_batch=fsync_batch, channel_info=channel_info)
+    # Si queda progreso guardado, el canal no se completó (cuota, errores)
+    if not processed or load_progress(output_dir, channel_id).has_progress():
+        print(f"El trabajo {job['id']} queda pendiente; se reanudará cuando caduque su lease.")
+        return {}
+    return {job['id']: {'status': 'ok'}}
+
+def run_queue_worker(queue_dir, output_dir, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+                     batch_size=50, lease_seconds=300, follow=False, poll_interval=10,
+                     transcript_options=None, formats=None, store='txt', worker_id=None,
+                     layout=DEFAULT_LAYOUT, fsync_batch=DEFAULT_FSYNC_BATCH):
+    """Procesa trabajos de la cola hasta que no queden pendientes.
+
+    Varios procesos (en la misma o en distintas máquinas con el directorio
+    compartido) pueden ejecutar esto a la vez: cada trabajo se reclama con un
+    lease y solo lo procesa quien lo reclamó. Los videos se reclaman en lotes
+    de `batch_size` y los canales de uno en uno. Con `follow`, el proceso
+    sigue esperando trabajos nuevos cada `poll_interval` segundos. `layout`
+    y `fsync_batch` tienen el mismo sentido que en `process_channel`.
+    """
+    queue = WorkQueue(queue_dir, lease_seconds)
+    worker_id = worker_id or default_worker_id()
+    keeper = LeaseKeeper(max(1, lease_seconds / 3))
+    text_output_dir = os.path.join(output_dir, "texto")
+    os.makedirs(text_output_dir, exist_ok=True)
+    workers = max(1, workers or 1)
+    rate_limiter = AdaptiveRateController(rate, max_concurrency=workers)
+    archive = open_packed_archive(output_dir) if store == 'packed' else None
+    hashes = get_content_hashes(output_dir)
+    writer = TranscriptWriter(text_output_dir, layout, fsync_batch=fsync_batch) if archive is None else None
+    # Índice de las transcripciones ya guardadas, por ID de video
+    index = TranscriptIndex.scan(text_output_dir) if archive is None else None
+    completed = 0
+    print(f"Procesando la cola {queue_dir} como {worker_id}")
+    
+    try:
+        while True:
+            # videos().list admite como mucho 50 IDs por solicitud
+            leases = queue.claim_batch(worker_id, min(max(1, batch_size), 50))
+            if not leases:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            for lease in leases:
+                keeper.add(lease)
+            try:
+                job = leases[0].job
+                if job['kind'] == 'video':
+                    results = _process_video_jobs(leases, text_output_dir, workers, rate_limiter,
+                                                  transcript_options, formats, archive, hashes, writer,
+                                                  index)
+                else:
+                    results = _process_channel_job(job, output_dir, workers, rate, transcript_options,
+                                                   formats, store, layout, fsync_batch)
+                # Los trabajos sin resultado (errores temporales, falta de cuota)
+                # conservan el lease sin renovarlo: se reintentarán cuando caduque
+                for lease in leases:
+                    keeper.discard(lease)
+                    if lease.job['id'] in results and queue.complete(lease, results[lease.job['id']]):
+                        completed += 1
+            except BaseException:
+                for lease in leases:
+                    keeper.discard(lease)
+                    lease.release()
+                raise
+            if quota_tracker.remaining() == 0:
+                print("Cuota de la API agotada. Deteniendo el proceso.")
+                break
+    except KeyboardInterrupt:
+        print("\nProcesamiento interrumpido por el usuario.")
+    finally:
+        keeper.close()
+        if writer is not None:
+            writer.close()
+        hashes.close()
+        if archive is not None:
+            archive.close()
+    
+    print(f"\nTrabajos terminados por {worker_id}: {completed}")
+    return completed
+
+def report_manifest(output_dir):
+    """Recorre el directorio de transcripciones y muestra duplicados y archivos huérfanos."""
+    text_output_dir = os.path.join(output_dir, "texto")
+    index = TranscriptIndex.scan(text_output_dir)
+    manifest_file = index.save_manifest()
+    
+    print(f"Videos con transcripción: {len(index)}")
+    
+    duplicates = index.duplicates()
+    print(f"Videos con archivos duplicados: {len(duplicates)}")
+    for video_id, files in duplicates.items():
+        print(f"  {video_id}: {', '.join(files)}")
+    
+    orphans = index.orphans()
+    print(f"Archivos huérfanos: {len(orphans)}")
+    for filename in orphans:
+        print(f"  {filename}")
+    
+    print(f"Índice guardado en: {manifest_file}")
+    return True
+
+def export_transcripts(output_dir, destination=None, workers=None, compress=False, rows_per_file=0):
+    """Exporta las transcripciones guardadas a un CSV de frases (como videos.csv)."""
+    text_output_dir = os.path.join(output_dir, "texto")
+    if not os.path.isdir(text_output_dir):
+        print(f"No existe el directorio de transcripciones: {text_output_dir}")
+        return False
+    
+    from corpus import export_corpus
+    
+    destination = destination or os.path.join(output_dir, "videos.csv")
+    print(f"Exportando transcripciones de {text_output_dir}...")
+    start_time = time.time()
+    result = export_corpus(text_output_dir, destination, workers, compress, rows_per_file)
+    
+    print(f"Videos exportados: {result['videos']}")
+    print(f"Frases exportadas: {result['sentences']}")
+    print(f"Tiempo: {time.time() - start_time:.1f}s")
+    for filename in result['files']:
+        print(f"  {filename}")
+    return True
+
+def update_search_index(output_dir, rebuild=False):
+    """Crea o actualiza el índice de búsqueda con las transcripciones de `texto/`."""
+    text_output_dir = os.path.join(output_dir, "texto")
+    if not os.path.isdir(text_output_dir):
+        print(f"No existe el directorio de transcripciones: {text_output_dir}")
+        return False
+    
+    search_index = open_default_index(output_dir, create=True)
+    start_time = time.time()
+    result = search_index.update_from_directory(text_output_dir, rebuild)
+    
+    print(f"Videos indexados: {result['added']}")
+    print(f"Videos sin cambios: {result['unchanged']}")
+    print(f"Videos eliminados del índice: {result['removed']}")
+    print(f"Tiempo: {time.time() - start_time:.1f}s")
+    print(f"Índice de búsqueda: {search_index.path} ({len(search_index)} videos)")
+    return True
+
+def search_transcripts(output_dir, query, limit=20):
+    """Busca un texto en las transcripciones indexadas y muestra los resultados."""
+    search_index = open_default_index(output_dir)
+    if search_index is None:
+        print("No existe el índice de búsqueda. Créalo primero con: python main.py index")
+        return False
+    
+    start_time = time.time()
+    hits = search_index.search(query, limit)
+    elapsed = (time.time() - start_time) * 1000
+    
+    for hit in hits:
+        hours, remainder = divmod(int(hit['start']), 3600)
+        minutes, seconds = divmod(remainder, 60)
+        print(f"[{hours:02d}:{minutes:02d}:{seconds:02d}] {hit['title']}")
+        print(f"    {hit['text']}")
+        print(f"    {hit['url']}")
+    print(f"\n{len(hits)} resultados en {elapsed:.0f} ms")
+    return True
+
+def show_transcript(output_dir, video_id, fmt='txt'):
+    """Muestra la transcripción de un video guardada en el almacén compacto."""
+    archive = open_packed_archive(output_dir)
+    video_id = get_video_id_from_url(video_id)
+    transcript_data = archive.read(video_id)
+    if transcript_data is None:
+        print(f"El video {video_id} no está en el almacén compacto.")
+        archive.close()
+        return False
+    
+    write_transcript(sys.stdout, transcript_data, fmt)
+    archive.close()
+    return True
+
+def write_run_report(output_dir, report_path=None, prometheus_path=None):
+    """Guarda el informe de la ejecución (JSON y, si se indica, formato Prometheus)."""
+    report_path = report_path or os.path.join(output_dir, 'informe_ejecucion.json')
+    report = run_metrics.write_json(report_path, quota={
+        'session_used': quota_tracker.session_used,
+        'by_method': quota_tracker.by_method()
+    })
+    if prometheus_path:
+        run_metrics.write_prometheus(prometheus_path)
+    counters = report['counters']
+    print(f"\nInforme de la ejecución: {report_path} ({report['duration_seconds']:.1f} s, "
+          f"{counters['successes']} transcripciones, {counters['no_transcript']} sin transcripción, "
+          f"{counters['disabled']} deshabilitadas, {counters['errors']} errores, "
+          f"{counters['retries']} reintentos)")
+    for stage, values in report['stages'].items():
+        print(f"  {stage}: {values['count']} veces, {values['total_seconds']:.2f} s "
+              f"(media {values['mean_ms']:.1f} ms, máximo {values['max_ms']:.1f} ms)")
+    return report
+
+def print_quota_summary():
+    """Muestra las unidades de cuota de la API usadas en esta ejecución y en el día."""
+    budget = f" de {quota_tracker.budget}" if quota_tracker.budget else ""
+    print(f"\nUnidades de cuota usadas en esta ejecución: {quota_tracker.session_used} "
+          f"(hoy: {quota_tracker.used_today}{budget})")
+    for method, units in sorted(quota_tracker.by_method().items()):
+        print(f"  {method}: {units}")
+
+def add_prefilter_arguments(parser):
+    """Opciones del filtro previo de videos, comunes a los modos de canal."""
+    parser.add_argument('--prefilter', action='store_true',
+                        help='Consultar los detalles de los videos en lotes de 50 y omitir los que no '
+                             'pueden tener subtítulos (emisiones en directo o programadas, duración cero)')
+    parser.add_argument('--priority', choices=sorted(PRIORITIES), default='channel',
+                        help='Orden en que se procesan los videos; cualquier valor distinto de '
+                             '"channel" activa el filtro previo (por defecto: channel)')
+    parser.add_argument('--priority-window', type=int, default=50,
+                        help='Videos que se ordenan juntos según la prioridad (0 = todo el canal, '
+                             'por defecto: 50)')
+
+def prefilter_priority(args):
+    """Prioridad del filtro previo según los argumentos, o None si está desactivado."""
+    if args.prefilter or args.priority != 'channel':
+        return args.priority
+    return None
+
 def parse_arguments():
     """Analiza los argumentos de la línea de comandos."""
     parser = argparse.ArgumentParser(description='Extractor de transcripciones de YouTube')
@@ -485,6 +1347,37 @@ def parse_arguments():
     # Argumentos generales
     parser.add_argument('--output', '-o', type=str, default=DEFAULT_OUTPUT_DIR,
                         help='Directorio de salida para las transcripciones')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='No usar la caché de transcripciones en disco')
+    parser.add_argument('--quota-budget', type=int, default=DEFAULT_QUOTA_BUDGET,
+                        help=f'Unidades de cuota diaria de la API de YouTube que se pueden usar '
+                             f'(0 = sin límite, por defecto: {DEFAULT_QUOTA_BUDGET})')
+    parser.add_argument('--languages', type=str, default=DEFAULT_LANGUAGES,
+                        help='Idiomas preferidos de la transcripción en orden, separados por comas '
+                             '(por ejemplo: es,en; vacío = cualquier idioma)')
+    parser.add_argument('--prefer-generated', action='store_true',
+                        help='Preferir las transcripciones automáticas a las manuales del mismo idioma')
+    parser.add_argument('--translate-to', type=str, default=None,
+                        help='Si no hay transcripción en este idioma, pedir a YouTube la traducción '
+                             'de la mejor disponible (por ejemplo: es)')
+    parser.add_argument('--formats', type=str, default=DEFAULT_FORMATS,
+                        help=f'Formatos de las transcripciones, separados por comas: txt, srt, vtt, '
+                             f'jsonl (txt se genera siempre, por defecto: {DEFAULT_FORMATS})')
+    parser.add_argument('--layout', choices=LAYOUTS, default=DEFAULT_LAYOUT,
+                        help='Disposición de texto/: todos los archivos juntos (flat) o en '
+                             'subdirectorios según los dos primeros caracteres del ID del video '
+                             f'(sharded, por defecto: {DEFAULT_LAYOUT})')
+    parser.add_argument('--fsync-batch', type=int, default=DEFAULT_FSYNC_BATCH,
+                        help='Sincronizar con el disco (fsync) los archivos escritos en grupos de '
+                             f'este tamaño antes de renombrarlos (0 = sin fsync, por defecto: '
+                             f'{DEFAULT_FSYNC_BATCH})')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help='No mostrar mensajes por cada video (solo errores y resumen)')
+    parser.add_argument('--report', type=str, default=None,
+                        help='Archivo JSON con los contadores y tiempos por etapa de la ejecución '
+                             '(por defecto: informe_ejecucion.json en el directorio de salida)')
+    parser.add_argument('--prometheus', type=str, default=None,
+                        help='Archivo donde guardar también las métricas en formato de texto de Prometheus')
     
     # Subparsers para diferentes modos
     subparsers = parser.add_subparsers(dest='mode', help='Modo de operación')
@@ -493,6 +1386,147 @@ def parse_arguments():
     video_parser = subparsers.add_parser('video', help='Procesar un solo video')
     video_parser.add_argument('video_url', type=str, help='URL o ID del video de YouTube')
     
+    # Modo de varios videos
+    videos_parser = subparsers.add_parser('videos', help='Procesar una lista de videos')
+    videos_parser.add_argument('source', type=str, nargs='?', default='-',
+                               help='Archivo con una URL o ID de video por línea '
+                                    '("-" para leer de la entrada estándar)')
+    videos_parser.add_argument('--force', '-f', action='store_true',
+                               help='Forzar el reprocesamiento de videos ya procesados')
+    videos_parser.add_argument('--refresh', action='store_true',
+                               help='Volver a descargar las transcripciones ya guardadas y reescribir '
+                                    'solo las que han cambiado')
+    videos_parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                               help=f'Número de hilos para obtener transcripciones en paralelo '
+                                    f'(por defecto: {DEFAULT_WORKERS})')
+    videos_parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                               help=f'Máximo de solicitudes de transcripción por segundo entre todos '
+                                    f'los hilos (0 = sin límite, por defecto: {DEFAULT_RATE})')
+    
+    # Modo de varios canales
+    channels_parser = subparsers.add_parser('channels', help='Procesar los videos de varios canales')
+    channels_parser.add_argument('source', type=str, nargs='?', default='-',
+                                 help='Archivo con un ID de canal por línea '
+                                      '("-" para leer de la entrada estándar)')
+    channels_parser.add_argument('--limit', '-l', type=int, default=DEFAULT_VIDEO_LIMIT,
+                                 help='Limitar el número de videos a procesar por canal (0 = sin límite)')
+    channels_parser.add_argument('--force', '-f', action='store_true',
+                                 help='Forzar el reprocesamiento de videos ya procesados')
+    channels_parser.add_argument('--refresh', action='store_true',
+                                 help='Recorrer los canales completos, volver a descargar las '
+                                      'transcripciones y reescribir solo las que han cambiado')
+    channels_parser.add_argument('--incremental', '-i', action='store_true',
+                                 help='Procesar solo los videos nuevos desde la última ejecución')
+    channels_resume_group = channels_parser.add_mutually_exclusive_group()
+    channels_resume_group.add_argument('--resume', dest='resume', action='store_true', default=None,
+                                       help='Reanudar el progreso guardado sin preguntar')
+    channels_resume_group.add_argument('--no-resume', dest='resume', action='store_false',
+                                       help='Ignorar el progreso guardado y empezar de nuevo')
+    channels_parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                                 help=f'Número de hilos compartidos por todos los canales '
+                                      f'(por defecto: {DEFAULT_WORKERS})')
+    channels_parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                                 help=f'Máximo de solicitudes de transcripción por segundo entre todos '
+                                      f'los canales (0 = sin límite, por defecto: {DEFAULT_RATE})')
+    channels_parser.add_argument('--active-channels', type=int, default=4,
+                                 help='Número de canales que se paginan y procesan a la vez '
+                                      '(por defecto: 4)')
+    channels_parser.add_argument('--store', choices=['txt', 'packed'], default=DEFAULT_STORE,
+                                 help='Dónde guardar las transcripciones: archivos .txt o el almacén '
+                                      f'compacto por canal (por defecto: {DEFAULT_STORE})')
+    add_prefilter_arguments(channels_parser)
+    
+    # Modo de índice de transcripciones
+    subparsers.add_parser('manifest', help='Generar el índice de transcripciones y '
+                                            'mostrar archivos duplicados o huérfanos')
+    
+    # Modo de exportación del corpus de frases
+    export_parser = subparsers.add_parser('export', help='Exportar las transcripciones guardadas '
+                                                         'a un CSV de frases')
+    export_parser.add_argument('destination', type=str, nargs='?', default=None,
+                               help='Archivo CSV de destino (por defecto: OUTPUT/videos.csv)')
+    export_parser.add_argument('--gzip', action='store_true',
+                               help='Comprimir los archivos CSV con gzip')
+    export_parser.add_argument('--rows-per-file', type=int, default=0,
+                               help='Dividir la salida en archivos de como mucho este número de '
+                                    'filas (0 = un solo archivo)')
+    export_parser.add_argument('--workers', '-w', type=int, default=None,
+                               help='Número de procesos para dividir las transcripciones en frases '
+                                    '(por defecto: número de CPU)')
+    
+    # Modos de índice de búsqueda
+    index_parser = subparsers.add_parser('index', help='Crear o actualizar el índice de búsqueda '
+                                                       'de las transcripciones')
+    index_parser.add_argument('--rebuild', action='store_true',
+                              help='Reconstruir el índice desde cero')
+    search_parser = subparsers.add_parser('search', help='Buscar un texto en las transcripciones')
+    search_parser.add_argument('query', type=str, nargs='+',
+                               help='Texto a buscar (entre comillas dobles para una frase exacta)')
+    search_parser.add_argument('--limit', '-l', type=int, default=20,
+                               help='Número máximo de resultados (por defecto: 20)')
+    
+    # Lectura del almacén compacto
+    show_parser = subparsers.add_parser('show', help='Mostrar una transcripción del almacén compacto')
+    show_parser.add_argument('video_id', type=str, help='URL o ID del video de YouTube')
+    show_parser.add_argument('--format', type=str, default='txt', choices=['txt', 'srt', 'vtt', 'jsonl'],
+                             help='Formato de salida (por defecto: txt)')
+    
+    # Cola de trabajos compartida entre varios procesos
+    enqueue_parser = subparsers.add_parser('enqueue', help='Añadir videos o canales a la cola de trabajos')
+    enqueue_parser.add_argument('source', type=str, nargs='?', default='-',
+                                help='Archivo con una URL o ID por línea ("-" para leer de la entrada estándar)')
+    enqueue_parser.add_argument('--channels', action='store_true',
+                                help='Los IDs son de canales (por defecto, de videos)')
+    enqueue_parser.add_argument('--limit', '-l', type=int, default=DEFAULT_VIDEO_LIMIT,
+                                help='Limitar el número de videos de cada canal (0 = sin límite)')
+    enqueue_parser.add_argument('--incremental', '-i', action='store_true',
+                                help='Procesar solo los videos nuevos de cada canal')
+    enqueue_parser.add_argument('--queue', type=str, default=None,
+                                help='Directorio de la cola (por defecto: cola/ en el directorio de salida)')
+    
+    work_parser = subparsers.add_parser('work', help='Procesar los trabajos de la cola')
+    work_parser.add_argument('--queue', type=str, default=None,
+                             help='Directorio de la cola (por defecto: cola/ en el directorio de salida)')
+    work_parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                             help=f'Número de hilos para obtener transcripciones en paralelo '
+                                  f'(por defecto: {DEFAULT_WORKERS})')
+    work_parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                             help=f'Máximo de solicitudes de transcripción por segundo entre todos '
+                                  f'los hilos (0 = sin límite, por defecto: {DEFAULT_RATE})')
+    work_parser.add_argument('--batch-size', type=int, default=50,
+                             help='Videos que se reclaman a la vez (por defecto: 50)')
+    work_parser.add_argument('--lease', type=int, default=300,
+                             help='Segundos tras los que un trabajo de un proceso que no responde '
+                                  'puede reclamarse de nuevo (por defecto: 300)')
+    work_parser.add_argument('--follow', action='store_true',
+                             help='Seguir esperando trabajos nuevos al vaciarse la cola')
+    work_parser.add_argument('--store', choices=['txt', 'packed'], default=DEFAULT_STORE,
+                             help='Dónde guardar las transcripciones: archivos .txt o el almacén '
+                                  f'compacto (por defecto: {DEFAULT_STORE})')
+    
+    queue_status_parser = subparsers.add_parser('queue-status', help='Mostrar el estado de la cola de trabajos')
+    queue_status_parser.add_argument('--queue', type=str, default=None,
+                                     help='Directorio de la cola (por defecto: cola/ en el directorio de salida)')
+    queue_status_parser.add_argument('--lease', type=int, default=300,
+                                     help='Duración de los leases en segundos (por defecto: 300)')
+    
+    # Modo de servicio
+    serve_parser = subparsers.add_parser('serve', help='Atender solicitudes de transcripciones por HTTP')
+    serve_parser.add_argument('--host', type=str, default='127.0.0.1',
+                              help='Dirección en la que escuchar (por defecto: 127.0.0.1)')
+    serve_parser.add_argument('--port', type=int, default=8080,
+                              help='Puerto en el que escuchar (por defecto: 8080)')
+    serve_parser.add_argument('--workers', '-w', type=int, default=4,
+                              help='Hilos para obtener transcripciones en paralelo (por defecto: 4)')
+    serve_parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                              help=f'Máximo de solicitudes de transcripción por segundo entre todos '
+                                   f'los hilos (0 = sin límite, por defecto: {DEFAULT_RATE})')
+    serve_parser.add_argument('--max-pending', type=int, default=100,
+                              help='Descargas en curso o en cola como máximo; por encima se responde '
+                                   '503 (por defecto: 100)')
+    serve_parser.add_argument('--verbose', '-v', action='store_true',
+                              help='Mostrar cada solicitud y los mensajes por video')
+    
     # Modo de canal
     channel_parser = subparsers.add_parser('channel', help='Procesar todos los videos de un canal')
     channel_parser.add_argument('channel_id', type=str, nargs='?', default=DEFAULT_CHANNEL_ID,
@@ -502,6 +1536,26 @@ def parse_arguments():
                                     f'por defecto: {DEFAULT_VIDEO_LIMIT})')
     channel_parser.add_argument('--force', '-f', action='store_true',
                                help='Forzar el reprocesamiento de videos ya procesados')
+    channel_parser.add_argument('--refresh', action='store_true',
+                               help='Recorrer el canal completo, volver a descargar las '
+                                    'transcripciones y reescribir solo las que han cambiado')
+    channel_parser.add_argument('--incremental', '-i', action='store_true',
+                               help='Procesar solo los videos nuevos desde la última ejecución')
+    resume_group = channel_parser.add_mutually_exclusive_group()
+    resume_group.add_argument('--resume', dest='resume', action='store_true', default=None,
+                              help='Reanudar el progreso guardado sin preguntar')
+    resume_group.add_argument('--no-resume', dest='resume', action='store_false',
+                              help='Ignorar el progreso guardado y empezar de nuevo')
+    channel_parser.add_argument('--workers', '-w', type=int, default=DEFAULT_WORKERS,
+                               help=f'Número de hilos para obtener transcripciones en paralelo '
+                                    f'(por defecto: {DEFAULT_WORKERS})')
+    channel_parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                               help=f'Máximo de solicitudes de transcripción por segundo entre todos '
+                                    f'los hilos (0 = sin límite, por defecto: {DEFAULT_RATE})')
+    channel_parser.add_argument('--store', choices=['txt', 'packed'], default=DEFAULT_STORE,
+                               help='Dónde guardar las transcripciones: archivos .txt o el almacén '
+                                    f'compacto del canal (por defecto: {DEFAULT_STORE})')
+    add_prefilter_arguments(channel_parser)
     
     args = parser.parse_args()
     
@@ -511,6 +1565,15 @@ def parse_arguments():
         args.channel_id = DEFAULT_CHANNEL_ID
         args.limit = DEFAULT_VIDEO_LIMIT
         args.force = False
+        args.refresh = False
+        args.workers = DEFAULT_WORKERS
+        args.rate = DEFAULT_RATE
+        args.incremental = False
+        args.resume = None
+        args.store = DEFAULT_STORE
+        args.prefilter = False
+        args.priority = 'channel'
+        args.priority_window = 50
     
     return args
 
@@ -519,22 +1582,113 @@ def main():
     # Analizar argumentos
     args = parse_arguments()
     
+    if args.no_cache:
+        disable_default_cache()
+    set_quiet(args.quiet)
+    
     # Crear directorio de salida
     output_dir = args.output
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
+    # La caché de transcripciones se guarda en el directorio de salida
+    set_default_cache_dir(output_dir)
+    
+    # Contabilizar la cuota diaria de la API en el directorio de salida
+    quota_tracker.configure(os.path.join(output_dir, 'cuota_youtube.json'), args.quota_budget)
+    
+    # Preferencia de idioma de las transcripciones
+    transcript_options = {
+        'languages': [code.strip() for code in args.languages.split(',') if code.strip()],
+        'prefer_generated': args.prefer_generated,
+        'translate_to': args.translate_to
+    }
+    # Si ya existe el índice de búsqueda, mantenerlo al día con las nuevas transcripciones
+    open_default_index(output_dir)
+    
+    try:
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    # Los modos que recorren canales o listas de videos necesitan la API de YouTube
+    if args.mode in ('videos', 'channels', 'channel', 'work') and not has_api_key():
+        print("Error: No se ha configurado la clave API de YouTube.")
+        print("Por favor, crea un archivo .env con la variable YOUTUBE_API_KEY.")
+        sys.exit(1)
+    
     # Procesar según el modo
     if args.mode == 'video':
         print(f"Procesando un solo video: {args.video_url}")
-        process_single_video(args.video_url, output_dir)
+        process_single_video(args.video_url, output_dir, transcript_options, formats, args.layout)
+    elif args.mode == 'videos':
+        video_ids = read_video_ids(args.source)
+        process_videos(video_ids, output_dir, args.force,
+                       workers=args.workers, rate=args.rate, transcript_options=transcript_options,
+                       formats=formats, refresh=args.refresh, layout=args.layout,
+                       fsync_batch=args.fsync_batch)
+    elif args.mode == 'channels':
+        channel_ids = read_channel_ids(args.source)
+        print(f"Procesando {len(channel_ids)} canales")
+        process_channels(channel_ids, output_dir, args.limit, args.force,
+                         workers=args.workers, rate=args.rate, incremental=args.incremental,
+                         resume=args.resume, active_channels=args.active_channels,
+                         transcript_options=transcript_options, formats=formats, store=args.store,
+                         prefilter=prefilter_priority(args), priority_window=args.priority_window,
+                         refresh=args.refresh, layout=args.layout, fsync_batch=args.fsync_batch)
+    elif args.mode == 'manifest':
+        report_manifest(output_dir)
+    elif args.mode == 'index':
+        update_search_index(output_dir, args.rebuild)
+    elif args.mode == 'search':
+        search_transcripts(output_dir, ' '.join(args.query), args.limit)
+        return True
+    elif args.mode == 'show':
+        return show_transcript(output_dir, args.video_id, args.format)
+    elif args.mode == 'enqueue':
+        if args.channels:
+            targets = read_channel_ids(args.source)
+        else:
+            targets = read_video_ids(args.source)
+        enqueue_jobs(queue_directory(output_dir, args.queue), 'channel' if args.channels else 'video',
+                     targets, args.limit, args.incremental)
+        return True
+    elif args.mode == 'queue-status':
+        report_queue(queue_directory(output_dir, args.queue), args.lease)
+        return True
+    elif args.mode == 'work':
+        run_queue_worker(queue_directory(output_dir, args.queue), output_dir, args.workers, args.rate,
+                         args.batch_size, args.lease, args.follow, transcript_options=transcript_options,
+                         formats=formats, store=args.store, layout=args.layout,
+                         fsync_batch=args.fsync_batch)
+    elif args.mode == 'serve':
+        # El servidor HTTP (y asyncio, que usa extractor) solo se carga en este modo
+        from service import serve
+        serve(args.host, args.port, args.workers, args.rate, args.max_pending, args.verbose)
+        return True
+    elif args.mode == 'export':
+        export_transcripts(output_dir, args.destination, args.workers, args.gzip,
+                           args.rows_per_file)
     elif args.mode == 'channel':
         print(f"Procesando canal: {args.channel_id}")
-        process_channel(args.channel_id, output_dir, args.limit, args.force)
+        process_channel(args.channel_id, output_dir, args.limit, args.force,
+                        workers=args.workers, rate=args.rate, incremental=args.incremental,
+                        resume=args.resume, transcript_options=transcript_options,
+                        formats=formats, store=args.store, prefilter=prefilter_priority(args),
+                        priority_window=args.priority_window, refresh=args.refresh,
+                        layout=args.layout, fsync_batch=args.fsync_batch)
     else:
         print(f"Modo no reconocido: {args.mode}")
         return False
     
+    print_quota_summary()
+    if args.mode in ('video', 'videos', 'channels', 'channel', 'work'):
+        report_path = args.report
+        if args.mode == 'work' and not report_path:
+            # Un informe por proceso: varios procesos comparten el directorio de salida
+            report_path = os.path.join(output_dir, f"informe_ejecucion_{default_worker_id()}.json")
+        write_run_report(output_dir, report_path, args.prometheus)
     return True
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Contadores de resultados que siempre aparecen en el informe (aunque valgan 0)
+RESULT_COUNTERS = ('successes', 'no_transcript', 'disabled', 'errors', 'retries')
+
+_PROMETHEUS_PREFIX = 'ytextractor'
+
+
+class RunMetrics:
+    """Tiempos por etapa y contadores de una ejecución.
+
+    `span(etapa)` mide cuánto tarda cada paso (paginación, lista de
+    transcripciones, descarga, escritura, ...) y acumula, por etapa, el número
+    de veces, el tiempo total y el máximo. `increment(contador)` cuenta los
+    resultados. Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = datetime.now()
+            self._started = time.perf_counter()
+            self._counters = {name: 0 for name in RESULT_COUNTERS}
+            self._stages = {}
+
+    def increment(self, counter, value=1):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + value
+
+    def record(self, stage, seconds):
+        with self._lock:
+            count, total, maximum = self._stages.get(stage, (0, 0.0, 0.0))
+            self._stages[stage] = (count + 1, total + seconds, max(maximum, seconds))
+
+    @contextmanager
+    def span(self, stage):
+        """Mide el tiempo del bloque y lo suma a la etapa `stage` (también si falla)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def report(self, **extra):
+        """Devuelve el informe de la ejecución como diccionario serializable en JSON."""
+        with self._lock:
+            duration = time.perf_counter() - self._started
+            stages = {
+                stage: {
+                    'count': count,
+                    'total_seconds': round(total, 6),
+                    'mean_ms': round(total / count * 1000, 3) if count else 0.0,
+                    'max_ms': round(maximum * 1000, 3)
+                }
+                for stage, (count, total, maximum) in sorted(self._stages.items())
+            }
+            report = {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'duration_seconds': round(duration, 3),
+                'counters': dict(self._counters),
+                'stages': stages
+            }
+        report.update(extra)
+        return report
+
+    def write_json(self, path, **extra):
+        """Guarda el informe en `path` y lo devuelve."""
+        report = self.report(**extra)
+        _write_atomic(path, json.dumps(report, ensure_ascii=False, indent=2))
+        return report
+
+    def prometheus_text(self):
+        """Devuelve los contadores y tiempos en formato de texto de Prometheus."""
+        report = self.report()
+        lines = [
+            f"# HELP {_PROMETHEUS_PREFIX}_events_total Resultados de la ejecución por tipo.",
+            f"# TYPE {_PROMETHEUS_PREFIX}_events_total counter",
+        ]
+        for name, value in sorted(report['counters'].items()):
+            lines.append(f'{_PROMETHEUS_PREFIX}_events_total{{event="{name}"}} {value}')
+        lines += [
+            f"# HELP {_PROMETHEUS_PREFIX}_stage_seconds Tiempo dedicado a cada etapa.",
+            f"# TYPE {_PROMETHEUS_PREFIX}_stage_seconds summary",
+        ]
+        for stage, values in report['stages'].items():
+            lines.append(f'{_PROMETHEUS_PREFIX}_stage_seconds_sum{{stage="{stage}"}} '
+                         f'{values["total_seconds"]}')
+            lines.append(f'{_PROMETHEUS_PREFIX}_stage_seconds_count{{stage="{stage}"}} '
+                         f'{values["count"]}')
+        lines += [
+            f"# HELP {_PROMETHEUS_PREFIX}_run_duration_seconds Duración de la ejecución.",
+            f"# TYPE {_PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{_PROMETHEUS_PREFIX}_run_duration_seconds {report['duration_seconds']}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Guarda las métricas en formato de texto de Prometheus.
+
+        El archivo se reemplaza de forma atómica, como espera el recolector de
+        archivos de texto de node_exporter.
+        """
+        _write_atomic(path, self.prometheus_text())
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# Métricas de la ejecución actual, compartidas por todos los módulos
+run_metrics = RunMetrics()
+
+_quiet = False
+# Modo silencioso de cada hilo (None = el global)
+_thread_quiet = threading.local()
+
+
+def set_quiet(quiet=True):
+    """Activa o desactiva el modo silencioso (sin mensajes por cada video)."""
+    global _quiet
+    _quiet = quiet
+
+
+@contextmanager
+def quiet_output(quiet=True):
+    """Activa o desactiva el modo silencioso solo en el hilo actual durante el bloque.
+
+    Permite que quien usa el extractor como biblioteca silencie sus propios
+    hilos sin cambiar los mensajes del resto del programa.
+    """
+    previous = getattr(_thread_quiet, 'value', None)
+    _thread_quiet.value = quiet
+    try:
+        yield
+    finally:
+        _thread_quiet.value = previous
+
+
+def video_log(message):
+    """Muestra un mensaje de progreso por video, salvo en modo silencioso."""
+    quiet = getattr(_thread_quiet, 'value', None)
+    if not (_quiet if quiet is None else quiet):
+        print(message)
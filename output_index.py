@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+
+# Los IDs de video de YouTube tienen 11 caracteres
+VIDEO_ID_LENGTH = 11
+
+# Extensiones de los otros formatos que se guardan junto a cada .txt
+EXTRA_EXTENSIONS = ('.srt', '.vtt', '.jsonl')
+
+# Disposición del directorio de transcripciones: todos los archivos en el
+# mismo directorio ('flat') o repartidos en subdirectorios según los primeros
+# caracteres del ID de video ('sharded'), para que ningún directorio tenga
+# decenas de miles de entradas
+LAYOUTS = ('flat', 'sharded')
+SHARD_LENGTH = 2
+
+# Archivos a medio escribir (se renombran al terminar)
+TMP_SUFFIX = '.tmp'
+
+
+def transcript_filename(video_info):
+    """Nombre del archivo de texto de un video: `{id}_{titulo}.txt`."""
+    # Crear un nombre de archivo seguro basado en el título del video
+    safe_title = "".join([c if c.isalnum() or c in [' ', '-', '_'] else '_' for c in video_info['title']])
+    safe_title = safe_title[:100]  # Limitar la longitud del título
+    return f"{video_info['id']}_{safe_title}.txt"
+
+
+def transcript_path(video_info, directory, layout='flat'):
+    """Ruta del archivo de texto de un video según la disposición del directorio."""
+    if layout == 'sharded':
+        return os.path.join(directory, video_info['id'][:SHARD_LENGTH], transcript_filename(video_info))
+    return os.path.join(directory, transcript_filename(video_info))
+
+
+def iter_transcript_entries(directory):
+    """Recorre los archivos del directorio y los de sus subdirectorios (un nivel).
+
+    Genera tuplas `(ruta relativa, DirEntry)`, de modo que se encuentran las
+    transcripciones con cualquiera de las dos disposiciones. Se omiten los
+    archivos a medio escribir.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                with os.scandir(entry.path) as shard_entries:
+                    for shard_entry in shard_entries:
+                        if shard_entry.is_file() and not shard_entry.name.endswith(TMP_SUFFIX):
+                            yield os.path.join(entry.name, shard_entry.name), shard_entry
+            elif entry.is_file() and not entry.name.endswith(TMP_SUFFIX):
+                yield entry.name, entry
+
+
+def video_id_from_filename(filename):
+    """Obtiene el ID de video de un archivo `{id}_{titulo}.txt`, o None."""
+    if not filename.endswith('.txt'):
+        return None
+    name = filename[:-4]
+    if len(name) > VIDEO_ID_LENGTH and name[VIDEO_ID_LENGTH] == '_':
+        return name[:VIDEO_ID_LENGTH]
+    if '_' in name:
+        return name.split('_', 1)[0]
+    return None
+
+
+class TranscriptIndex:
+    """Índice en memoria de los archivos de transcripción por ID de video.
+
+    Se construye con un único recorrido del directorio y se actualiza a
+    medida que se escriben archivos, de modo que comprobar si un video ya
+    tiene transcripción no depende del título ni requiere acceder al disco.
+    Los archivos se guardan con su ruta relativa al directorio (incluido el
+    subdirectorio con la disposición 'sharded').
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._files = {}
+        self._orphans = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def scan(cls, directory):
+        """Construye el índice recorriendo el directorio una sola vez."""
+        index = cls(directory)
+        if not os.path.isdir(directory):
+            return index
+        for name, entry in iter_transcript_entries(directory):
+            if entry.name.startswith('manifest.json') or entry.name.endswith(EXTRA_EXTENSIONS):
+                continue
+            video_id = video_id_from_filename(entry.name)
+            if video_id is None:
+                index._orphans.append(name)
+            else:
+                index._files.setdefault(video_id, []).append(name)
+        return index
+
+    def __contains__(self, video_id):
+        return video_id in self._files
+
+    def __len__(self):
+        return len(self._files)
+
+    def get(self, video_id):
+        """Devuelve la ruta del archivo de un video, o None si no existe."""
+        files = self._files.get(video_id)
+        if not files:
+            return None
+        return os.path.join(self.directory, files[-1])
+
+    def add(self, video_id, path, remove_previous=True):
+        """Registra el archivo escrito para un video.
+
+        Si el video ya tenía otro archivo (por ejemplo, con su título
+        anterior) y `remove_previous` es True, se elimina, junto con sus
+        archivos en otros formatos, para no dejar duplicados.
+        """
+        filename = os.path.relpath(path, self.directory)
+        with self._lock:
+            previous = self._files.get(video_id, [])
+            if remove_previous:
+                for old in previous:
+                    if old != filename:
+                        old_base = os.path.splitext(old)[0]
+                        for name in [old] + [old_base + ext for ext in EXTRA_EXTENSIONS]:
+                            try:
+                                os.remove(os.path.join(self.directory, name))
+                            except OSError:
+                                pass
+                self._files[video_id] = [filename]
+            elif filename not in previous:
+                self._files[video_id] = previous + [filename]
+
+    def duplicates(self):
+        """Devuelve los videos con más de un archivo de transcripción."""
+        return {video_id: files for video_id, files in self._files.items() if len(files) > 1}
+
+    def orphans(self):
+        """Devuelve los archivos del directorio que no corresponden a ningún video."""
+        return list(self._orphans)
+
+    def save_manifest(self):
+        """Guarda el índice en `manifest.json` dentro del directorio."""
+        manifest_file = os.path.join(self.directory, 'manifest.json')
+        with self._lock:
+            data = {
+                'videos': {video_id: files for video_id, files in sorted(self._files.items())},
+                'duplicates': self.duplicates(),
+                'orphans': self.orphans()
+            }
+        tmp_file = manifest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, manifest_file)
+        return manifest_file
@@ -0,0 +1,286 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from formatters import write_transcript
+from metrics import run_metrics, video_log
+from output_index import TMP_SUFFIX, transcript_path
+from search_index import get_default_index
+
+# Escritura de los archivos de transcripción. Cada archivo se escribe con un
+# nombre temporal en su directorio definitivo y después se renombra, de modo
+# que una interrupción nunca deja una transcripción a medio escribir con el
+# nombre final.
+
+
+def _write_header(f, video_info, transcript_info):
+    f.write(f"Título: {video_info['title']}\n")
+    f.write(f"URL: {video_info['url']}\n")
+    f.write(f"Canal: {video_info['channel_title']}\n")
+    f.write(f"ID del Canal: {video_info.get('channel_id', '')}\n")
+    f.write(f"Fecha de publicación: {video_info['published_at']}\n")
+    f.write(f"Idioma: {transcript_info['language']}\n")
+    f.write(f"Generada automáticamente: {'Sí' if transcript_info['is_generated'] else 'No'}\n")
+    if transcript_info.get('translated_from'):
+        f.write(f"Traducida de: {transcript_info['translated_from']}\n")
+    f.write("\n--- TRANSCRIPCIÓN ---\n\n")
+
+
+def stage_transcript_files(output_file, video_info, transcript_info, formats=None):
+    """Escribe los archivos de una transcripción con nombres temporales.
+
+    Los segmentos se escriben directamente en el archivo, sin construir el
+    texto completo en memoria. Además del .txt (con cabecera), se escribe un
+    archivo por cada formato de `formats` (srt, vtt, jsonl) con el mismo
+    nombre y su extensión. Devuelve la lista de pares `(temporal, definitivo)`;
+    si falla, elimina los temporales ya escritos y propaga la excepción.
+    """
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    suffix = f".{os.getpid()}{TMP_SUFFIX}"
+    staged = []
+    try:
+        tmp_file = output_file + suffix
+        staged.append((tmp_file, output_file))
+        with run_metrics.span('write_txt'), open(tmp_file, 'w', encoding='utf-8') as f:
+            _write_header(f, video_info, transcript_info)
+            write_transcript(f, transcript_info['transcript_data'], 'txt')
+
+        # Otros formatos, sin cabecera para que los reproductores puedan leerlos
+        base_name = os.path.splitext(output_file)[0]
+        for fmt in formats or []:
+            if fmt == 'txt':
+                continue
+            final_file = f"{base_name}.{fmt}"
+            staged.append((final_file + suffix, final_file))
+            with run_metrics.span(f'write_{fmt}'), open(final_file + suffix, 'w', encoding='utf-8') as f:
+                write_transcript(f, transcript_info['transcript_data'], fmt)
+    except BaseException:
+        discard_staged(staged)
+        raise
+    return staged
+
+
+def discard_staged(staged):
+    for tmp_file, _ in staged:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
+def _fsync_file(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_directory(path):
+    # Hace persistentes los renombrados (no disponible en todos los sistemas)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def commit_staged(staged, sync=False):
+    """Renombra los archivos temporales a sus nombres definitivos.
+
+    Con `sync`, primero se sincronizan con el disco los archivos y, después
+    de renombrarlos, sus directorios (una vez por directorio), de modo que
+    tras un corte de luz cada archivo está completo o no existe.
+    """
+    if sync:
+        with run_metrics.span('fsync'):
+            for tmp_file, _ in staged:
+                _fsync_file(tmp_file)
+    for tmp_file, final_file in staged:
+        os.replace(tmp_file, final_file)
+    if sync:
+        with run_metrics.span('fsync'):
+            for directory in {os.path.dirname(final_file) or '.' for _, final_file in staged}:
+                _fsync_directory(directory)
+
+
+def register_transcript(video_info, transcript_info, output_file, index=None):
+    """Registra un archivo ya escrito en el índice de archivos y en el de búsqueda.
+
+    Con `index`, se elimina el archivo de una versión anterior del mismo
+    video con otro título (o en otra carpeta).
+    """
+    if index is not None:
+        index.add(video_info['id'], output_file)
+    search_index = get_default_index()
+    if search_index is not None:
+        with run_metrics.span('search_index'):
+            search_index.add_transcript(video_info['id'], video_info['title'],
+                                        transcript_info['transcript_data'], output_file)
+
+
+class _WriteJob:
+    __slots__ = ('video_info', 'transcript_info', 'output_file', 'formats', 'index',
+                 'on_written', 'future', 'staged')
+
+    def __init__(self, video_info, transcript_info, output_file, formats, index, on_written):
+        self.video_info = video_info
+        self.transcript_info = transcript_info
+        self.output_file = output_file
+        self.formats = formats
+        self.index = index
+        self.on_written = on_written
+        self.future = Future()
+        self.staged = None
+
+
+class TranscriptWriter:
+    """Escritura en segundo plano ("write-behind") de los archivos de transcripción.
+
+    Los hilos que obtienen las transcripciones solo las dejan en una cola
+    acotada (`queue_size`); un único hilo escribe los archivos, los registra
+    en el índice de archivos y en el de búsqueda, y resuelve el `Future`
+    devuelto por `submit` (True si se guardó). Si la cola está llena, `submit`
+    espera: la memoria ocupada por las transcripciones pendientes no crece
+    sin límite.
+
+    Con `fsync_batch` mayor que 0, los archivos se escriben con nombres
+    temporales y se confirman en grupo: cuando hay `fsync_batch` pendientes,
+    o cuando la cola lleva `max_delay` segundos vacía, se sincronizan con el
+    disco, se renombran y se sincronizan sus directorios. Con 0 se renombran
+    al momento sin sincronizar (atómico frente a la interrupción del proceso,
+    pero no frente a un corte de luz). `layout` es la disposición del
+    directorio (`output_index.LAYOUTS`).
+    """
+
+    def __init__(self, directory, layout='flat', queue_size=100, fsync_batch=0, max_delay=1.0):
+        self.directory = directory
+        self.layout = layout
+        self.fsync_batch = max(0, fsync_batch or 0)
+        self.max_delay = max_delay
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._batch = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='escritura', daemon=True)
+        self._thread.start()
+
+    def path_for(self, video_info):
+        """Ruta definitiva del archivo de texto de un video."""
+        return transcript_path(video_info, self.directory, self.layout)
+
+    def submit(self, video_info, transcript_info, formats=None, index=None, on_written=None):
+        """Encola la escritura de una transcripción y devuelve un `Future`.
+
+        `on_written()` se llama desde el hilo de escritura cuando el archivo
+        ya tiene su nombre definitivo.
+        """
+        if self._closed:
+            raise RuntimeError("El escritor de transcripciones está cerrado")
+        job = _WriteJob(video_info, transcript_info, self.path_for(video_info), formats, index,
+                        on_written)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # Los hilos de descarga solo esperan si el disco no da abasto
+            with run_metrics.span('write_queue_wait'):
+                self._queue.put(job)
+        return job.future
+
+    def _run(self):
+        while True:
+            try:
+                job = self._queue.get(timeout=self.max_delay if self._batch else None)
+            except queue.Empty:
+                # Sin más trabajo por ahora: confirmar lo pendiente
+                self._commit_batch()
+                continue
+            if job is None:
+                self._commit_batch()
+                self._queue.task_done()
+                return
+            if isinstance(job, threading.Event):
+                self._commit_batch()
+                job.set()
+                self._queue.task_done()
+                continue
+            self._stage(job)
+            if len(self._batch) >= max(1, self.fsync_batch):
+                self._commit_batch()
+            self._queue.task_done()
+
+    def _stage(self, job):
+        try:
+            job.staged = stage_transcript_files(job.output_file, job.video_info,
+                                                job.transcript_info, job.formats)
+        except Exception as e:
+            self._fail(job, e)
+            return
+        self._batch.append(job)
+
+    def _commit_batch(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        staged = [pair for job in batch for pair in job.staged]
+        try:
+            commit_staged(staged, sync=self.fsync_batch > 0)
+        except Exception as e:
+            for job in batch:
+                discard_staged(job.staged)
+                self._fail(job, e)
+            return
+        for job in batch:
+            try:
+                register_transcript(job.video_info, job.transcript_info, job.output_file, job.index)
+                if job.on_written is not None:
+                    job.on_written()
+            except Exception as e:
+                # El archivo ya está escrito; solo falló su registro
+                print(f"Error al registrar la transcripción de {job.video_info['id']}: {e}")
+            self.written += 1
+            video_log(f"Transcripción guardada en: {job.output_file}")
+            job.future.set_result(True)
+
+    def _fail(self, job, error):
+        print(f"Error al guardar la transcripción de {job.video_info['id']}: {error}")
+        run_metrics.increment('write_errors')
+        # La transcripción se contó como obtenida al descargarla, pero no se guardó
+        run_metrics.increment('successes', -1)
+        run_metrics.increment('errors')
+        self.failed += 1
+        job.future.set_result(False)
+
+    def flush(self, timeout=None):
+        """Espera a que todas las transcripciones encoladas estén escritas y confirmadas."""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Escribe lo pendiente y detiene el hilo de escritura."""
+        if self._closed:
+            return
+        self._closed = True
+        started = time.perf_counter()
+        self._queue.put(None)
+        self._thread.join()
+        run_metrics.record('write_drain', time.perf_counter() - started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
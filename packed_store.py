@@ -0,0 +1,219 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+from formatters import iter_segments
+
+# Cabecera de cada registro: número de segmentos y longitud del texto comprimido
+_RECORD_HEADER = struct.Struct('<II')
+# Metadatos del video que se guardan en el índice
+_METADATA_FIELDS = ('title', 'url', 'channel_title', 'channel_id', 'published_at')
+
+
+def _column(values):
+    """Columna de números en float32 little-endian."""
+    column = array('f', values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(data):
+    column = array('f')
+    column.frombytes(data)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+class PackedStore:
+    """Almacén compacto de las transcripciones de un canal.
+
+    Los segmentos de cada video se guardan como un registro en `{nombre}.dat`:
+    una cabecera, las columnas `start` y `duration` como arrays de float32 y
+    los textos (separados por saltos de línea) comprimidos con zlib. El
+    archivo `{nombre}.idx` (JSONL) guarda, por ID de video, la posición y
+    longitud del registro y los metadatos del video. Cada registro se
+    comprime por separado, así que leer un video no requiere descomprimir el
+    resto, y la lectura usa un mapa en memoria del archivo de datos. Los
+    registros se añaden con el archivo de datos bloqueado (flock), de modo
+    que varios procesos pueden escribir en el mismo almacén.
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.data_path = base_path + '.dat'
+        self.index_path = base_path + '.idx'
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._data_file = None
+        self._index_file = None
+        self._mmap = None
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Línea incompleta por una interrupción: se ignora
+                    continue
+                # Solo se aceptan registros que llegaron a escribirse por completo
+                if entry['offset'] + entry['length'] <= size:
+                    self._entries[entry['id']] = entry
+
+    def __contains__(self, video_id):
+        return video_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def video_ids(self):
+        return list(self._entries)
+
+    def add(self, video_info, transcript_info):
+        """Añade (o reemplaza) la transcripción de un video.
+
+        Los registros solo se añaden al final: al reemplazar un video, el
+        índice pasa a apuntar al registro nuevo.
+        """
+        starts, durations, texts = [], [], []
+        for text, start, duration in iter_segments(transcript_info['transcript_data']):
+            starts.append(start)
+            durations.append(duration)
+            texts.append(text.replace('\n', ' '))
+        blob = zlib.compress('\n'.join(texts).encode('utf-8'))
+        record = (_RECORD_HEADER.pack(len(texts), len(blob))
+                  + _column(starts) + _column(durations) + blob)
+
+        entry = {field: video_info.get(field, '') for field in _METADATA_FIELDS}
+        entry.update({
+            'id': video_info['id'],
+            'language': transcript_info.get('language', ''),
+            'is_generated': transcript_info.get('is_generated', False),
+        })
+        with self._lock:
+            if self._data_file is None:
+                directory = os.path.dirname(self.data_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._data_file = open(self.data_path, 'ab')
+                self._index_file = open(self.index_path, 'a', encoding='utf-8')
+            # Varios procesos (`main.py work`) pueden añadir al mismo almacén: el
+            # bloqueo del archivo de datos cubre la posición, los datos y el índice
+            fcntl.flock(self._data_file, fcntl.LOCK_EX)
+            try:
+                self._data_file.seek(0, os.SEEK_END)
+                entry['offset'] = self._data_file.tell()
+                entry['length'] = len(record)
+                # Primero los datos y después la entrada del índice que los apunta
+                self._data_file.write(record)
+                self._data_file.flush()
+                self._index_file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                self._index_file.flush()
+            finally:
+                fcntl.flock(self._data_file, fcntl.LOCK_UN)
+            self._entries[entry['id']] = entry
+
+    def _map(self, end):
+        """Devuelve un mapa en memoria del archivo de datos que llegue al menos hasta `end`."""
+        if self._mmap is None or len(self._mmap) < end:
+            if self._mmap is not None:
+                self._mmap.close()
+            with open(self.data_path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def metadata(self, video_id):
+        """Devuelve los metadatos guardados de un video, o None."""
+        entry = self._entries.get(video_id)
+        return dict(entry) if entry else None
+
+    def read(self, video_id):
+        """Devuelve los segmentos de un video como lista de diccionarios, o None."""
+        entry = self._entries.get(video_id)
+        if entry is None:
+            return None
+        offset, length = entry['offset'], entry['length']
+        with self._lock:
+            data = self._map(offset + length)[offset:offset + length]
+        count, blob_length = _RECORD_HEADER.unpack_from(data)
+        position = _RECORD_HEADER.size
+        starts = _read_column(data[position:position + count * 4])
+        position += count * 4
+        durations = _read_column(data[position:position + count * 4])
+        position += count * 4
+        texts = zlib.decompress(data[position:position + blob_length]).decode('utf-8').split('\n')
+        return [{'text': text, 'start': start, 'duration': duration}
+                for text, start, duration in zip(texts, starts, durations)]
+
+    def close(self):
+        with self._lock:
+            for f in (self._data_file, self._index_file, self._mmap):
+                if f is not None:
+                    f.close()
+            self._data_file = self._index_file = self._mmap = None
+
+
+class PackedArchive:
+    """Conjunto de almacenes compactos, uno por canal, en un directorio.
+
+    Permite comprobar si un video ya está guardado y leerlo sin saber a qué
+    canal pertenece.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._stores = {}
+        self._lock = threading.Lock()
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.idx'):
+                    self._store(name[:-4])
+
+    def _store(self, name):
+        with self._lock:
+            store = self._stores.get(name)
+            if store is None:
+                store = PackedStore(os.path.join(self.directory, name))
+                self._stores[name] = store
+            return store
+
+    def _find(self, video_id):
+        for store in list(self._stores.values()):
+            if video_id in store:
+                return store
+        return None
+
+    def __contains__(self, video_id):
+        return self._find(video_id) is not None
+
+    def __len__(self):
+        return sum(len(store) for store in list(self._stores.values()))
+
+    def add(self, video_info, transcript_info):
+        """Guarda la transcripción en el almacén del canal del video."""
+        self._store(video_info.get('channel_id') or 'sin_canal').add(video_info, transcript_info)
+
+    def metadata(self, video_id):
+        store = self._find(video_id)
+        return store.metadata(video_id) if store else None
+
+    def read(self, video_id):
+        """Devuelve los segmentos de un video, o None si no está guardado."""
+        store = self._find(video_id)
+        return store.read(video_id) if store else None
+
+    def close(self):
+        for store in list(self._stores.values()):
+            store.close()
@@ -0,0 +1,189 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+_END = object()
+
+
+class Prefetcher:
+    """Recorre un iterable en un hilo de fondo y entrega sus elementos a
+    través de una cola acotada.
+
+    Permite que el productor (por ejemplo, la paginación de la API) avance
+    mientras se procesan los elementos ya recibidos, sin acumular más de
+    `maxsize` elementos en memoria.
+    """
+
+    def __init__(self, iterable, maxsize=100):
+        self._iterable = iterable
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self.exhausted = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        try:
+            for item in self._iterable:
+                if not self._put(item):
+                    return
+            self.exhausted = True
+            self._put(_END)
+        except BaseException as e:
+            self._put(e)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def close(self):
+        """Detiene el hilo productor."""
+        self._stop.set()
+
+
+def run_bounded(func, items, workers=1, window=None, start=0, executor_class=ThreadPoolExecutor):
+    """Ejecuta `func(item)` para cada elemento en un grupo de hilos.
+
+    Produce tuplas `(index, item, future)` a medida que terminan las tareas.
+    Nunca se envía un elemento cuyo índice supere en `window` o más al del
+    primer elemento aún sin terminar, de modo que la memoria ocupada por los
+    resultados pendientes de reordenar queda acotada. Los índices empiezan
+    en `start`. Con `executor_class=ProcessPoolExecutor` las tareas se
+    ejecutan en procesos (`func` y los elementos deben poder serializarse).
+    """
+    workers = max(1, workers or 1)
+    window = max(workers, window or workers * 4)
+    executor = executor_class(max_workers=workers)
+    futures = {}
+    finished = set()
+    low = start  # Primer índice aún sin terminar
+    next_index = start
+    iterator = iter(items)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(futures) < workers * 2 and next_index - low < window:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                futures[executor.submit(func, item)] = (next_index, item)
+                next_index += 1
+            if not futures:
+                return
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = futures.pop(future)
+                finished.add(index)
+                while low in finished:
+                    finished.remove(low)
+                    low += 1
+                yield index, item, future
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def round_robin(iterables, max_active=None):
+    """Intercala por turnos los elementos de varios iterables.
+
+    Como mucho `max_active` iterables están activos a la vez; cuando uno se
+    agota, se empieza el siguiente. Los iterables se crean (y empiezan a
+    producir) solo cuando les llega el turno.
+    """
+    waiting = iter(iterables)
+    active = []
+
+    def fill():
+        while max_active is None or len(active) < max_active:
+            try:
+                active.append(iter(next(waiting)))
+            except StopIteration:
+                return
+
+    fill()
+    while active:
+        for iterator in list(active):
+            try:
+                yield next(iterator)
+            except StopIteration:
+                active.remove(iterator)
+                fill()
+
+
+class ReorderBuffer:
+    """Reordena resultados que llegan desordenados.
+
+    `add(index, item)` devuelve la lista de elementos que ya pueden emitirse
+    en orden. `next_index` es el índice del siguiente elemento esperado.
+    """
+
+    def __init__(self, start=0):
+        self.next_index = start
+        self._pending = {}
+
+    def add(self, index, item):
+        self._pending[index] = item
+        ready = []
+        while self.next_index in self._pending:
+            ready.append(self._pending.pop(self.next_index))
+            self.next_index += 1
+        return ready
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class SingleFlight:
+    """Agrupa las llamadas simultáneas con la misma clave en una sola ejecución.
+
+    `submit(key, func)` envía `func` al `executor` si no hay ya una llamada en
+    curso con esa clave; si la hay, devuelve el mismo Future. Devuelve
+    `(future, nueva)`, donde `nueva` indica si se lanzó una ejecución. La
+    clave se libera al terminar, de modo que las llamadas posteriores vuelven
+    a ejecutar `func`.
+    """
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def submit(self, key, func, *args):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._executor.submit(func, *args)
+            self._inflight[key] = future
+        future.add_done_callback(lambda _: self._release(key, future))
+        return future, True
+
+    def _release(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._inflight
+
+    def __len__(self):
+        with self._lock:
+            return len(self._inflight)
@@ -0,0 +1,129 @@
+import itertools
+import re
+
+from core import execute_conditional, get_youtube
+from metrics import run_metrics, video_log
+from quota import QuotaExceededError
+
+# Máximo de IDs por solicitud de videos().list
+BATCH_SIZE = 50
+# Categoría "Música": sin subtítulos manuales, rara vez tienen transcripción útil
+MUSIC_CATEGORY = '10'
+
+_DURATION = re.compile(r'^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+# Orden de procesamiento: función que da la clave de ordenación de cada video
+PRIORITIES = {
+    'channel': None,
+    'newest': lambda video: video.get('published_at', ''),
+    'oldest': lambda video: video.get('published_at', ''),
+    'longest': lambda video: video.get('duration') or 0,
+    'shortest': lambda video: video.get('duration') or 0,
+}
+_DESCENDING = ('newest', 'longest')
+
+
+def parse_iso_duration(value):
+    """Convierte una duración ISO 8601 de la API (por ejemplo, PT1H2M3S) a segundos."""
+    match = _DURATION.match(value or '')
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def classify_video(item):
+    """Decide si merece la pena pedir la transcripción de un video.
+
+    Devuelve `(acción, motivo)`, donde la acción es `'skip'` (no puede tener
+    subtítulos: emisión en directo o programada, duración cero), `'defer'`
+    (es poco probable que tenga una transcripción útil; se procesa al final)
+    o `'keep'`.
+    """
+    snippet = item.get('snippet', {})
+    details = item.get('contentDetails', {})
+    live = snippet.get('liveBroadcastContent', 'none')
+    if live in ('live', 'upcoming'):
+        return 'skip', 'emisión en directo' if live == 'live' else 'emisión programada'
+    if parse_iso_duration(details.get('duration')) == 0:
+        return 'skip', 'duración cero'
+    if snippet.get('categoryId') == MUSIC_CATEGORY and details.get('caption') != 'true':
+        return 'defer', 'música sin subtítulos'
+    return 'keep', None
+
+
+class Prefilter:
+    """Filtra y ordena los videos de un canal antes de pedir sus transcripciones.
+
+    Obtiene `contentDetails` y `snippet` de los videos
+    en lotes de 50 (una unidad de cuota por lote), omite los que no pueden
+    tener subtítulos, deja para el final los poco prometedores y ordena el
+    resto según `priority` en bloques de `window` videos (0 = todo el canal,
+    lo que obliga a esperar a que termine la paginación).
+    """
+
+    def __init__(self, priority='channel', window=BATCH_SIZE):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridad no válida: {priority}")
+        self.priority = priority
+        self.window = window
+        self.skipped = 0
+        self.deferred = 0
+
+    def _fetch_details(self, video_ids):
+        """Devuelve `{ID: elemento}` de la API, o None si no se pudo obtener."""
+        try:
+            with run_metrics.span('prefilter'):
+                response = execute_conditional(get_youtube().videos().list(
+                    part='snippet,contentDetails',
+                    id=','.join(video_ids),
+                    maxResults=len(video_ids)
+                ), f"videos:details:{','.join(video_ids)}")
+        except QuotaExceededError:
+            raise
+        except Exception as e:
+            print(f"Error al obtener los detalles de los videos: {e}. Se procesan sin filtrar.")
+            return None
+        return {item['id']: item for item in response.get('items', [])}
+
+    def _order(self, videos):
+        key = PRIORITIES[self.priority]
+        if key is None:
+            return videos
+        return sorted(videos, key=key, reverse=self.priority in _DESCENDING)
+
+    def filter(self, videos):
+        """Genera los videos de `videos` que se deben procesar, en orden de prioridad."""
+        videos = iter(videos)
+        buffer = []
+        deferred = []
+        while True:
+            batch = list(itertools.islice(videos, BATCH_SIZE))
+            if not batch:
+                break
+            details = self._fetch_details([video['id'] for video in batch])
+            for video in batch:
+                if details is None:
+                    buffer.append(video)
+                    continue
+                item = details.get(video['id'])
+                if item is None:
+                    action, reason = 'skip', 'no disponible'
+                else:
+                    action, reason = classify_video(item)
+                    video['duration'] = parse_iso_duration(item.get('contentDetails', {}).get('duration'))
+                if action == 'skip':
+                    self.skipped += 1
+                    run_metrics.increment('prefiltered')
+                    video_log(f"Omitido el video {video['id']} ({reason})")
+                elif action == 'defer':
+                    self.deferred += 1
+                    deferred.append(video)
+                else:
+                    buffer.append(video)
+            if self.window and len(buffer) >= self.window:
+                yield from self._order(buffer)
+                buffer = []
+        yield from self._order(buffer)
+        # Los poco prometedores al final, cuando ya se han procesado los demás
+        yield from self._order(deferred)
@@ -0,0 +1,131 @@
+import json
+import os
+from datetime import datetime
+
+
+class ProgressJournal:
+    """Diario de progreso de solo anexado (JSONL) para un canal.
+
+    Cada línea es un evento: `seen` (video recibido de la API), `done` (video
+    terminado), `paginated` (la paginación del canal terminó) o `snapshot`
+    (estado completo tras una compactación). El estado se reconstruye
+    reproduciendo los eventos, de modo que guardar el progreso cuesta una
+    línea por video en lugar de reescribir toda la lista.
+    """
+
+    def __init__(self, path, channel_id, compact_every=1000):
+        self.path = path
+        self.channel_id = channel_id
+        self.compact_every = compact_every
+        self.done = set()
+        self.pending = {}
+        self.pagination_complete = False
+        self._events_since_compaction = 0
+        self._file = None
+        self._mode = 'w'
+
+    @classmethod
+    def load(cls, path, channel_id, compact_every=1000):
+        """Reconstruye el estado reproduciendo el diario existente (si lo hay)."""
+        journal = cls(path, channel_id, compact_every)
+        if not os.path.exists(path):
+            return journal
+        journal._mode = 'a'
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Una línea incompleta solo puede ser la última (escritura interrumpida)
+                    continue
+                journal._apply(event)
+                journal._events_since_compaction += 1
+        return journal
+
+    def _apply(self, event):
+        kind = event.get('e')
+        if kind == 'snapshot':
+            if event.get('channel_id') != self.channel_id:
+                print(f"El archivo de progreso es para otro canal "
+                      f"({event.get('channel_id')}). Ignorando.")
+                return
+            self.done = set(event.get('done', []))
+            self.pending = {video['id']: video for video in event.get('pending', [])}
+            self.pagination_complete = event.get('pagination_complete', False)
+        elif kind == 'seen':
+            video = event['video']
+            if video['id'] not in self.done:
+                self.pending[video['id']] = video
+        elif kind == 'done':
+            self.done.add(event['id'])
+            self.pending.pop(event['id'], None)
+        elif kind == 'paginated':
+            self.pagination_complete = True
+
+    def has_progress(self):
+        return bool(self.done or self.pending)
+
+    def _write(self, event):
+        if self._file is None:
+            self._file = open(self.path, self._mode, encoding='utf-8')
+            if self._mode == 'w':
+                self._mode = 'a'
+                self._events_since_compaction = 1
+                self._file.write(json.dumps(self._snapshot(), ensure_ascii=False) + "\n")
+        self._apply(event)
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._events_since_compaction += 1
+        # Compactar cuando el diario ocupa más que una instantánea del estado,
+        # de modo que el coste total de compactar sea lineal
+        if self._events_since_compaction >= max(self.compact_every,
+                                                len(self.done) + len(self.pending)):
+            self.compact()
+
+    def record_seen(self, video):
+        """Registra un video recibido de la API y aún sin procesar."""
+        self._write({'e': 'seen', 'video': {
+            key: value for key, value in video.items() if key != 'transcript_data'
+        }})
+
+    def record_done(self, video):
+        """Registra un video terminado (con o sin transcripción)."""
+        self._write({'e': 'done', 'id': video['id'],
+                     'success': bool(video.get('transcript_success'))})
+
+    def record_paginated(self):
+        """Registra que ya se recibieron todos los videos del canal."""
+        self._write({'e': 'paginated'})
+
+    def _snapshot(self):
+        return {
+            'e': 'snapshot',
+            'channel_id': self.channel_id,
+            'done': sorted(self.done),
+            'pending': list(self.pending.values()),
+            'pagination_complete': self.pagination_complete,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def compact(self):
+        """Reescribe el diario con una sola línea con el estado actual."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self._snapshot(), ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._mode = 'a'
+        self._events_since_compaction = 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """Elimina el diario (al terminar el procesamiento completo)."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
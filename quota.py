@@ -0,0 +1,189 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    # La cuota diaria de la API de YouTube se reinicia a medianoche, hora del Pacífico
+    QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except Exception:
+    QUOTA_TIMEZONE = timezone.utc
+
+# Coste en unidades de cuota de cada método de la API de YouTube Data v3
+QUOTA_COSTS = {
+    'channels.list': 1,
+    'playlistItems.list': 1,
+    'videos.list': 1,
+    'playlists.list': 1,
+    'search.list': 100,
+}
+
+
+class QuotaExceededError(Exception):
+    """Se lanza cuando una llamada superaría el presupuesto de cuota configurado."""
+
+
+class QuotaTracker:
+    """Contabiliza las unidades de cuota usadas por método y por día.
+
+    El uso del día se guarda en `path` (si se indica) para que varias
+    ejecuciones del mismo día compartan el presupuesto. Cada llamada relee y
+    actualiza el archivo con un bloqueo (flock), de modo que varios procesos
+    a la vez (`main.py work`) suman su uso y comparten el mismo presupuesto.
+    Con `budget`, las llamadas que lo superarían lanzan `QuotaExceededError`
+    antes de hacerse.
+    """
+
+    def __init__(self, path=None, budget=None):
+        self.session_used = 0
+        self._lock = threading.Lock()
+        self.configure(path, budget)
+
+    def configure(self, path=None, budget=None):
+        """Cambia el archivo de uso diario y el presupuesto, y recarga el uso guardado."""
+        with self._lock:
+            self.path = path
+            self.budget = budget if budget and budget > 0 else None
+            self._date = self._today()
+            self._used = 0
+            self._by_method = {}
+            self._load()
+
+    @staticmethod
+    def _today():
+        return datetime.now(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+    def _load(self):
+        self._used = 0
+        self._by_method = {}
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('date') == self._date:
+                self._used = data.get('used', 0)
+                self._by_method = data.get('by_method', {})
+        except Exception as e:
+            print(f"Error al cargar el uso de cuota: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        # Nombre temporal propio: varios procesos pueden compartir el archivo de uso
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'date': self._date,
+                'used': self._used,
+                'by_method': self._by_method
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _shared(self):
+        """Bloquea el archivo de uso entre procesos y recarga el uso guardado por todos."""
+        if not self.path:
+            self._roll_day()
+            yield
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # El archivo de uso se reemplaza al guardarlo: el bloqueo va en uno aparte
+        with open(self.path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._date = self._today()
+                self._load()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _roll_day(self):
+        today = self._today()
+        if today != self._date:
+            self._date = today
+            self._used = 0
+            self._by_method = {}
+
+    def charge(self, method, units=None):
+        """Registra una llamada a `method` o lanza QuotaExceededError si no hay presupuesto."""
+        units = QUOTA_COSTS.get(method, 1) if units is None else units
+        with self._lock, self._shared():
+            if self.budget is not None and self._used + units > self.budget:
+                raise QuotaExceededError(
+                    f"Presupuesto de cuota agotado ({self._used}/{self.budget} unidades usadas hoy)"
+                )
+            self._used += units
+            self.session_used += units
+            self._by_method[method] = self._by_method.get(method, 0) + units
+            self._save()
+
+    @property
+    def used_today(self):
+        with self._lock, self._shared():
+            return self._used
+
+    def remaining(self):
+        """Unidades disponibles hoy, o None si no hay presupuesto."""
+        if self.budget is None:
+            return None
+        return max(0, self.budget - self.used_today)
+
+    def by_method(self):
+        with self._lock, self._shared():
+            return dict(self._by_method)
+
+
+class _MeteredRequest:
+    def __init__(self, request, tracker, method):
+        self._request = request
+        self._tracker = tracker
+        self._method = method
+
+    def execute(self, *args, **kwargs):
+        self._tracker.charge(self._method)
+        return self._request.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+class _MeteredResource:
+    def __init__(self, resource, tracker, name):
+        self._resource = resource
+        self._tracker = tracker
+        self._name = name
+
+    def __getattr__(self, method_name):
+        method = getattr(self._resource, method_name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            request = method(*args, **kwargs)
+            if request is None:
+                return None
+            return _MeteredRequest(request, self._tracker, f"{self._name}.{method_name}")
+        return call
+
+
+class MeteredYouTube:
+    """Envuelve el servicio de `build('youtube', 'v3')` contabilizando la cuota de cada llamada."""
+
+    def __init__(self, service, tracker):
+        self._service = service
+        self.tracker = tracker
+
+    def __getattr__(self, name):
+        attribute = getattr(self._service, name)
+        if not callable(attribute):
+            return attribute
+
+        def resource(*args, **kwargs):
+            return _MeteredResource(attribute(*args, **kwargs), self.tracker, name)
+        return resource
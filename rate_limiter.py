@@ -0,0 +1,42 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Limitador de tasa de tipo "token bucket" compartido entre hilos.
+
+    Permite hasta `rate` operaciones por segundo de media, con ráfagas de
+    hasta `capacity` operaciones. `acquire()` bloquea hasta que haya un
+    token disponible.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("La tasa debe ser mayor que cero.")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def set_rate(self, rate):
+        """Cambia la tasa (por ejemplo, al reducirla tras una limitación del servidor)."""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def acquire(self, tokens=1):
+        """Espera hasta poder consumir `tokens` tokens."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,191 @@
+import random
+import re
+import socket
+import threading
+import time
+
+from metrics import run_metrics
+from rate_limiter import TokenBucket
+
+# Tipos de error
+THROTTLED = 'throttled'      # El servidor nos está limitando (429, captcha, rateLimitExceeded)
+TRANSIENT = 'transient'      # Error temporal (5xx, red, tiempo de espera)
+PERMANENT = 'permanent'      # No tiene sentido reintentar
+
+
+def _http_status(exc):
+    """Obtiene el código HTTP de una excepción, si lo tiene."""
+    resp = getattr(exc, 'resp', None)  # googleapiclient.errors.HttpError
+    if resp is not None and getattr(resp, 'status', None):
+        return int(resp.status)
+    response = getattr(exc, 'response', None)  # requests.HTTPError
+    if response is not None and getattr(response, 'status_code', None):
+        return int(response.status_code)
+    # YouTubeRequestFailed solo conserva el mensaje ("429 Client Error: ...")
+    match = re.search(r'\b([45]\d\d) (?:Client|Server) Error', str(exc))
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def classify_error(exc):
+    """Clasifica una excepción como THROTTLED, TRANSIENT o PERMANENT."""
+    name = type(exc).__name__
+    if name == 'QuotaExceededError':
+        return PERMANENT
+    if name == 'TooManyRequests':
+        return THROTTLED
+    if name in ('NoTranscriptFound', 'TranscriptsDisabled', 'NoTranscriptAvailable',
+                'VideoUnavailable', 'InvalidVideoId', 'NotTranslatable',
+                'TranslationLanguageNotAvailable'):
+        return PERMANENT
+
+    status = _http_status(exc)
+    if status is not None:
+        if status == 429:
+            return THROTTLED
+        if status == 403 and ('rateLimitExceeded' in str(exc) or 'userRateLimitExceeded' in str(exc)):
+            return THROTTLED
+        if status >= 500:
+            return TRANSIENT
+        return PERMANENT
+
+    if isinstance(exc, (ConnectionError, TimeoutError, socket.timeout)):
+        return TRANSIENT
+    if name in ('ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout',
+                'ChunkedEncodingError', 'ServerNotFoundError'):
+        return TRANSIENT
+    return PERMANENT
+
+
+def is_retryable(exc):
+    """Indica si un error es temporal (el resultado no es definitivo)."""
+    return classify_error(exc) in (THROTTLED, TRANSIENT)
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0):
+    """Espera con retroceso exponencial y variación aleatoria ("full jitter")."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retries(func, controller=None, max_attempts=5, base_delay=1.0, max_delay=60.0):
+    """Llama a `func()` reintentando los errores temporales.
+
+    Si se indica `controller` (AdaptiveRateController), cada intento espera su
+    turno y le informa del resultado para que ajuste la tasa.
+    """
+    attempt = 0
+    while True:
+        if controller:
+            controller.acquire()
+        try:
+            result = func()
+        except Exception as e:
+            kind = classify_error(e)
+            if controller:
+                controller.release(kind)
+            if kind == PERMANENT or attempt + 1 >= max_attempts:
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if controller:
+                controller.record_retry()
+            run_metrics.increment('retries')
+            print(f"Error temporal ({kind}): {e}. Reintentando en {delay:.1f}s "
+                  f"(intento {attempt + 2}/{max_attempts})...")
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if controller:
+            controller.release(None)
+        return result
+
+
+class AdaptiveRateController:
+    """Controla la tasa y la concurrencia de las solicitudes de forma adaptativa.
+
+    Reduce a la mitad la tasa y la concurrencia cuando el servidor nos limita
+    y las aumenta poco a poco tras una racha de éxitos. Si se acumulan
+    `breaker_threshold` limitaciones seguidas, abre el circuito y pausa todas
+    las solicitudes durante `breaker_cooldown` segundos (que se duplica si el
+    bloqueo continúa).
+    """
+
+    def __init__(self, rate=None, max_concurrency=None, min_rate=0.2,
+                 increase_after=20, breaker_threshold=5, breaker_cooldown=30.0,
+                 max_breaker_cooldown=600.0):
+        self.max_rate = rate if rate and rate > 0 else None
+        self.bucket = TokenBucket(rate) if self.max_rate else None
+        self.min_rate = min_rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.increase_after = increase_after
+        self.breaker_threshold = breaker_threshold
+        self.base_breaker_cooldown = breaker_cooldown
+        self.breaker_cooldown = breaker_cooldown
+        self.max_breaker_cooldown = max_breaker_cooldown
+        self.throttled = 0
+        self.retries = 0
+        self.breaker_trips = 0
+        self._active = 0
+        self._successes = 0
+        self._consecutive_throttles = 0
+        self._open_until = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Espera a que el circuito esté cerrado, haya un hueco de concurrencia y un token."""
+        with self._condition:
+            while True:
+                wait = self._open_until - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                if self.concurrency is not None and self._active >= self.concurrency:
+                    self._condition.wait(1.0)
+                    continue
+                self._active += 1
+                break
+        if self.bucket:
+            self.bucket.acquire()
+
+    def release(self, error_kind):
+        """Libera el hueco e informa del resultado (None si fue un éxito)."""
+        with self._condition:
+            self._active -= 1
+            if error_kind == THROTTLED:
+                self._on_throttle()
+            elif error_kind is None:
+                self._on_success()
+            self._condition.notify_all()
+
+    def record_retry(self):
+        with self._condition:
+            self.retries += 1
+
+    def _on_success(self):
+        self._consecutive_throttles = 0
+        self.breaker_cooldown = self.base_breaker_cooldown
+        self._successes += 1
+        if self._successes < self.increase_after:
+            return
+        self._successes = 0
+        if self.bucket and self.bucket.rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate * 1.25))
+        if self.concurrency is not None and self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+
+    def _on_throttle(self):
+        self.throttled += 1
+        self._successes = 0
+        self._consecutive_throttles += 1
+        if self.bucket:
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate / 2))
+        if self.concurrency is not None:
+            self.concurrency = max(1, self.concurrency // 2)
+        if self._consecutive_throttles >= self.breaker_threshold:
+            self._consecutive_throttles = 0
+            self.breaker_trips += 1
+            self._open_until = time.monotonic() + self.breaker_cooldown
+            print(f"Demasiadas limitaciones seguidas del servidor. "
+                  f"Pausando todas las solicitudes durante {self.breaker_cooldown:.0f}s...")
+            self.breaker_cooldown = min(self.max_breaker_cooldown, self.breaker_cooldown * 2)
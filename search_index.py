@@ -0,0 +1,197 @@
+import os
+import re
+import sqlite3
+import threading
+
+from corpus import read_transcript_file
+from formatters import iter_segments
+from output_index import iter_transcript_entries, video_id_from_filename
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def build_match_query(query):
+    """Convierte el texto de búsqueda en una consulta FTS5.
+
+    Las palabras entre comillas dobles se buscan como frase exacta; el resto
+    se buscan como palabras sueltas que deben aparecer todas en el segmento.
+    """
+    terms = []
+    for phrase, words in re.findall(r'"([^"]*)"|([^"\s]+)', query):
+        tokens = _WORD.findall(phrase or words)
+        if tokens:
+            terms.append('"' + ' '.join(tokens) + '"')
+    return ' '.join(terms)
+
+
+def video_link(video_id, start):
+    """Enlace al video en el segundo `start`."""
+    return f"https://www.youtube.com/watch?v={video_id}&t={int(start)}"
+
+
+class SearchIndex:
+    """Índice invertido en disco de los segmentos de las transcripciones.
+
+    Usa una tabla FTS5 de SQLite (palabras -> segmentos, con el ID de video y
+    el segundo en que empieza cada uno) y una tabla de videos con el rango de
+    filas de cada uno, de modo que volver a indexar un video reemplaza sus
+    segmentos sin recorrer el índice completo. Los videos del almacén
+    compacto no tienen archivo (`path` es NULL).
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5("
+            "text, video_id UNINDEXED, start UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "video_id TEXT PRIMARY KEY, title TEXT, path TEXT, mtime REAL, "
+            "first_row INTEGER, last_row INTEGER)"
+        )
+        self._conn.commit()
+
+    def _remove(self, video_id):
+        row = self._conn.execute(
+            "SELECT first_row, last_row FROM videos WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        if row is not None and row[0] is not None:
+            self._conn.execute("DELETE FROM segments WHERE rowid BETWEEN ? AND ?", row)
+        self._conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+
+    def _add(self, video_id, title, path, mtime, segments):
+        self._remove(video_id)
+        first_row = last_row = None
+        for start, text in segments:
+            cursor = self._conn.execute(
+                "INSERT INTO segments (text, video_id, start) VALUES (?, ?, ?)",
+                (text, video_id, start)
+            )
+            if first_row is None:
+                first_row = cursor.lastrowid
+            last_row = cursor.lastrowid
+        self._conn.execute(
+            "INSERT INTO videos (video_id, title, path, mtime, first_row, last_row) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (video_id, title, path, mtime, first_row, last_row)
+        )
+
+    def add_transcript(self, video_id, title, transcript_data, path=None):
+        """Indexa (o vuelve a indexar) los segmentos de un video."""
+        segments = [(start, text) for text, start, _ in iter_segments(transcript_data)]
+        mtime = os.path.getmtime(path) if path and os.path.exists(path) else None
+        with self._lock:
+            self._add(video_id, title, path, mtime, segments)
+            self._conn.commit()
+
+    def update_from_directory(self, directory, rebuild=False):
+        """Indexa los archivos .txt de `directory` (y de sus subdirectorios) que han cambiado.
+
+        Los videos cuyo archivo ya no existe se eliminan del índice; los del
+        almacén compacto, que no tienen archivo, se conservan (también con
+        `rebuild`). Devuelve un diccionario con el número de videos añadidos,
+        sin cambios y eliminados.
+        """
+        with self._lock:
+            known = {video_id: (path, mtime) for video_id, path, mtime in
+                     self._conn.execute("SELECT video_id, path, mtime FROM videos "
+                                        "WHERE path IS NOT NULL")}
+            if rebuild:
+                for video_id in known:
+                    self._remove(video_id)
+                known = {}
+        added = unchanged = 0
+        seen = set()
+        for _, entry in iter_transcript_entries(directory):
+            video_id = video_id_from_filename(entry.name)
+            if video_id is None:
+                continue
+            seen.add(video_id)
+            mtime = entry.stat().st_mtime
+            if known.get(video_id) == (entry.path, mtime):
+                unchanged += 1
+                continue
+            try:
+                metadata, segments = read_transcript_file(entry.path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error al leer {entry.path}: {e}")
+                continue
+            with self._lock:
+                self._add(video_id, metadata.get('Título', ''), entry.path, mtime, segments)
+            added += 1
+            if added % 500 == 0:
+                with self._lock:
+                    self._conn.commit()
+                print(f"Videos indexados: {added}")
+        removed = [video_id for video_id in known if video_id not in seen]
+        with self._lock:
+            for video_id in removed:
+                self._remove(video_id)
+            self._conn.commit()
+        return {'added': added, 'unchanged': unchanged, 'removed': len(removed)}
+
+    def search(self, query, limit=20):
+        """Busca segmentos por texto y devuelve los más relevantes primero.
+
+        Cada resultado es un diccionario con `video_id`, `title`, `start`,
+        `text` y `url` (enlace al momento exacto del video).
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.video_id, v.title, s.start, s.text FROM segments AS s "
+                "LEFT JOIN videos AS v ON v.video_id = s.video_id "
+                "WHERE segments MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        return [{
+            'video_id': video_id,
+            'title': title or '',
+            'start': start,
+            'text': text,
+            'url': video_link(video_id, start)
+        } for video_id, title, start, text in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_index = None
+
+
+def search_index_path(output_dir):
+    """Ruta del índice de búsqueda dentro del directorio de salida."""
+    return os.path.join(output_dir, 'indice_busqueda.sqlite')
+
+
+def open_default_index(output_dir, create=False):
+    """Abre el índice de búsqueda del directorio de salida como índice por defecto.
+
+    Si el índice no existe y `create` es False, no se abre (el índice solo se
+    mantiene una vez creado con el comando `index`). Devuelve el índice o None.
+    """
+    global _default_index
+    path = search_index_path(output_dir)
+    if not create and not os.path.exists(path):
+        return None
+    _default_index = SearchIndex(path)
+    return _default_index
+
+
+def get_default_index():
+    """Devuelve el índice de búsqueda abierto con `open_default_index`, o None."""
+    return _default_index
@@ -0,0 +1,173 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from core import get_cached_transcript, get_transcript, get_video_id_from_url
+from extractor import VideoResult
+from metrics import run_metrics, set_quiet
+from pipeline import SingleFlight
+from retry import AdaptiveRateController
+from transcript_cache import get_default_cache
+
+# Servicio de larga duración que atiende solicitudes de transcripciones por
+# HTTP con un grupo de hilos, un límite de tasa y una caché compartidos.
+#
+#     GET /transcript?v=ID[&languages=es,en][&prefer_generated=1][&translate_to=es]
+#     GET /health     estado del servicio (en JSON)
+#     GET /metrics    contadores y tiempos en formato de texto de Prometheus
+
+
+class QueueFullError(Exception):
+    """Se lanza cuando hay demasiadas descargas pendientes para aceptar otra."""
+
+
+class TranscriptService:
+    """Obtiene transcripciones con un grupo de hilos y una caché compartidos.
+
+    Las solicitudes simultáneas del mismo video (con las mismas preferencias
+    de idioma) se agrupan en una sola descarga. Como mucho hay
+    `max_pending` descargas en curso o en cola; por encima de ese número,
+    `get` lanza `QueueFullError` en lugar de seguir acumulando trabajo.
+    """
+
+    def __init__(self, workers=4, rate=5, max_pending=100, timeout=120):
+        self.workers = max(1, workers or 1)
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self.rate_limiter = AdaptiveRateController(rate, max_concurrency=self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='servicio')
+        self._flights = SingleFlight(self._executor)
+        self._lock = threading.Lock()
+
+    def _fetch(self, video_id, options):
+        return get_transcript(video_id, self.rate_limiter, **options)
+
+    def get(self, video_id, languages=None, prefer_generated=False, translate_to=None):
+        """Devuelve `(transcript_info, origen)`.
+
+        `origen` es `'cache'` si la transcripción estaba en la caché,
+        `'upstream'` si se descargó para esta solicitud o `'shared'` si se
+        reutilizó una descarga ya en curso para otra solicitud.
+        """
+        options = {
+            'languages': list(languages or []),
+            'prefer_generated': prefer_generated,
+            'translate_to': translate_to
+        }
+        cache = get_default_cache()
+        if cache:
+            with run_metrics.span('cache_lookup'):
+                cached_info = get_cached_transcript(cache, video_id, **options)
+            if cached_info:
+                run_metrics.increment('service_cache')
+                return cached_info, 'cache'
+
+        key = (video_id, tuple(options['languages']), prefer_generated, translate_to)
+        with self._lock:
+            if len(self._flights) >= self.max_pending and key not in self._flights:
+                run_metrics.increment('service_rejected')
+                raise QueueFullError(f"Hay {len(self._flights)} descargas pendientes "
+                                     f"(máximo {self.max_pending})")
+            future, started = self._flights.submit(key, self._fetch, video_id, options)
+        run_metrics.increment('service_upstream' if started else 'service_shared')
+        return future.result(timeout=self.timeout), 'upstream' if started else 'shared'
+
+    def status(self):
+        return {
+            'workers': self.workers,
+            'pending': len(self._flights),
+            'max_pending': self.max_pending,
+            'counters': run_metrics.counters()
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type + '; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, data, status=200, headers=None):
+        self._send(status, json.dumps(data, ensure_ascii=False), headers=headers)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == '/transcript':
+            self._transcript(query)
+        elif url.path == '/health':
+            self._send_json(self.server.service.status())
+        elif url.path == '/metrics':
+            self._send(200, run_metrics.prometheus_text(), 'text/plain; version=0.0.4')
+        else:
+            self._send_json({'error': 'Ruta no encontrada'}, 404)
+
+    def _transcript(self, query):
+        if not query.get('v'):
+            self._send_json({'error': 'Falta el parámetro v (URL o ID del video)'}, 400)
+            return
+        video_id = get_video_id_from_url(query['v'])
+        languages = [code.strip() for code in query.get('languages', '').split(',') if code.strip()]
+        try:
+            transcript_info, source = self.server.service.get(
+                video_id, languages, query.get('prefer_generated') in ('1', 'true'),
+                query.get('translate_to') or None)
+        except QueueFullError as e:
+            self._send_json({'error': str(e)}, 503, {'Retry-After': '5'})
+            return
+        except TimeoutError:
+            self._send_json({'error': 'Tiempo de espera agotado'}, 504)
+            return
+        except Exception as e:
+            print(f"Error al atender la solicitud de {video_id}: {e}")
+            self._send_json({'error': str(e)}, 500)
+            return
+
+        response = VideoResult({'id': video_id}, transcript_info).to_dict()
+        response['source'] = source
+        if transcript_info.get('retryable'):
+            # Error temporal de YouTube: el cliente puede volver a intentarlo
+            self._send_json(response, 503, {'Retry-After': '30'})
+        else:
+            self._send_json(response)
+
+
+class TranscriptServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, verbose=False):
+        super().__init__(address, _Handler)
+        self.service = service
+        self.verbose = verbose
+
+
+def serve(host='127.0.0.1', port=8080, workers=4, rate=5, max_pending=100, verbose=False):
+    """Arranca el servicio y atiende solicitudes hasta que se interrumpe."""
+    set_quiet(not verbose)
+    service = TranscriptService(workers, rate, max_pending)
+    server = TranscriptServer((host, port), service, verbose)
+    print(f"Servicio de transcripciones en http://{host}:{server.server_address[1]} "
+          f"({service.workers} hilos, máximo {service.max_pending} descargas pendientes)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServicio detenido.")
+    finally:
+        server.server_close()
+        service.close()
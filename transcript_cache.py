@@ -0,0 +1,214 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+HOUR = 3600
+
+
+class TranscriptCache:
+    """Caché en disco de transcripciones basada en SQLite.
+
+    Guarda, por ID de video, la lista de transcripciones disponibles (o el
+    resultado "sin transcripción") y, por video e idioma, los segmentos
+    originales. También guarda las respuestas de la API de YouTube Data con
+    su ETag, para repetir esas solicitudes de forma condicional. Cada entrada caduca según su tipo y, cuando el tamaño total
+    supera `max_bytes`, se eliminan primero las entradas usadas hace más
+    tiempo (LRU).
+    """
+
+    def __init__(self, path, max_bytes=500 * 1024 * 1024,
+                 ttl_no_transcript=24 * HOUR, ttl_generated=7 * 24 * HOUR,
+                 ttl_manual=30 * 24 * HOUR):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_no_transcript = ttl_no_transcript
+        self.ttl_generated = ttl_generated
+        self.ttl_manual = ttl_manual
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    # Operaciones genéricas
+
+    def get(self, key):
+        """Devuelve el valor guardado para `key` o None si no existe o ha caducado."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, size, expires_at = row
+            if expires_at < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total -= size
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return json.loads(zlib.decompress(value).decode('utf-8'))
+
+    def set(self, key, value, ttl):
+        """Guarda `value` (serializable a JSON) durante `ttl` segundos."""
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._total -= row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl, now)
+            )
+            self._total += len(blob)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Elimina entradas caducadas y, si hace falta, las menos usadas."""
+        if self._total <= self.max_bytes:
+            return
+        self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),))
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while self._total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    break
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Operaciones específicas de transcripciones
+
+    def get_transcript_list(self, video_id):
+        """Devuelve la lista de transcripciones guardada para un video.
+
+        El resultado es un diccionario con `tracks` (lista de diccionarios con
+        `language`, `language_code`, `is_generated` y `translation_languages`)
+        y `error` (mensaje si el video no tiene transcripciones), o None si no
+        está en la caché.
+        """
+        return self.get(f"list:{video_id}")
+
+    def set_transcript_list(self, video_id, transcript_list):
+        """Guarda los metadatos de las transcripciones disponibles de un video."""
+        tracks = [{
+            'language': transcript.language,
+            'language_code': transcript.language_code,
+            'is_generated': transcript.is_generated,
+            'translation_languages': [language['language_code'] for language
+                                      in getattr(transcript, 'translation_languages', [])]
+        } for transcript in transcript_list]
+        self.set(f"list:{video_id}", {'tracks': tracks, 'error': None}, self.ttl_generated)
+
+    def set_no_transcript(self, video_id, error):
+        """Guarda que un video no tiene transcripciones (con una caducidad corta)."""
+        self.set(f"list:{video_id}", {'tracks': [], 'error': error}, self.ttl_no_transcript)
+
+    def get_segments(self, video_id, language_code):
+        """Devuelve los segmentos guardados de una transcripción o None.
+
+        Las traducciones se guardan con el código `origen>destino` (por
+        ejemplo, `en>es`).
+        """
+        return self.get(f"segments:{video_id}:{language_code}")
+
+    def set_segments(self, video_id, language_code, segments, is_generated):
+        """Guarda los segmentos originales de una transcripción."""
+        data = [{
+            'text': item['text'] if isinstance(item, dict) else item.text,
+            'start': item['start'] if isinstance(item, dict) else item.start,
+            'duration': item['duration'] if isinstance(item, dict) else item.duration
+        } for item in segments]
+        ttl = self.ttl_generated if is_generated else self.ttl_manual
+        self.set(f"segments:{video_id}:{language_code}", data, ttl)
+
+    # Respuestas de la API de YouTube Data para las solicitudes condicionales
+
+    def get_response(self, key):
+        """Devuelve `{'etag', 'response'}` guardado para una solicitud de la API, o None."""
+        return self.get(f"api:{key}")
+
+    def set_response(self, key, etag, response):
+        """Guarda una respuesta de la API junto con su ETag."""
+        self.set(f"api:{key}", {'etag': etag, 'response': response}, self.ttl_generated)
+
+
+_default_cache = None
+_default_cache_enabled = True
+_default_cache_dir = None
+_default_cache_lock = threading.Lock()
+
+
+def disable_default_cache():
+    """Desactiva la caché por defecto (por ejemplo, con la opción --no-cache)."""
+    global _default_cache_enabled
+    _default_cache_enabled = False
+
+
+def set_default_cache_dir(directory):
+    """Indica el directorio en el que se crea la caché por defecto (el de salida).
+
+    Si la caché ya estaba abierta en otro directorio, se cierra y se abrirá
+    en el nuevo la próxima vez que se use.
+    """
+    global _default_cache, _default_cache_dir
+    with _default_cache_lock:
+        _default_cache_dir = directory
+        if _default_cache is not None and not os.getenv('TRANSCRIPT_CACHE_PATH'):
+            _default_cache.close()
+            _default_cache = None
+
+
+def get_default_cache():
+    """Devuelve la caché configurada mediante variables de entorno, o None si está desactivada.
+
+    La caché se crea en el directorio indicado con `set_default_cache_dir`
+    (por defecto, DEFAULT_OUTPUT_DIR). Variables: TRANSCRIPT_CACHE_ENABLED,
+    TRANSCRIPT_CACHE_PATH, TRANSCRIPT_CACHE_MAX_MB,
+    TRANSCRIPT_CACHE_TTL_NO_TRANSCRIPT_HOURS, TRANSCRIPT_CACHE_TTL_GENERATED_HOURS
+    y TRANSCRIPT_CACHE_TTL_MANUAL_HOURS. Se leen al abrir la caché, de modo
+    que también valen las que se cargan desde .env después de importar el
+    módulo.
+    """
+    global _default_cache
+    if not _default_cache_enabled:
+        return None
+    if os.getenv('TRANSCRIPT_CACHE_ENABLED', '1').lower() in ('0', 'false', 'no'):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            output_dir = _default_cache_dir or os.getenv('DEFAULT_OUTPUT_DIR', 'transcripciones')
+            path = os.getenv('TRANSCRIPT_CACHE_PATH',
+                             os.path.join(output_dir, 'cache_transcripciones.sqlite'))
+            _default_cache = TranscriptCache(
+                path,
+                max_bytes=int(float(os.getenv('TRANSCRIPT_CACHE_MAX_MB', 500)) * 1024 * 1024),
+                ttl_no_transcript=float(os.getenv('TRANSCRIPT_CACHE_TTL_NO_TRANSCRIPT_HOURS', 24)) * HOUR,
+                ttl_generated=float(os.getenv('TRANSCRIPT_CACHE_TTL_GENERATED_HOURS', 168)) * HOUR,
+                ttl_manual=float(os.getenv('TRANSCRIPT_CACHE_TTL_MANUAL_HOURS', 720)) * HOUR
+            )
+        return _default_cache
@@ -0,0 +1,325 @@
+import fcntl
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+# Cola de trabajos en disco para repartir la extracción entre varios procesos
+# (en una o varias máquinas que comparten el sistema de archivos):
+#
+#   trabajos.jsonl   un trabajo por línea; los productores solo añaden líneas
+#   leases/ID        trabajo reclamado por un proceso (se crea con O_EXCL)
+#   done/ID.json     trabajo terminado y su resultado
+#
+# Un trabajo solo puede reclamarse si no está terminado y no tiene un lease
+# vigente. El proceso que lo reclama renueva el lease (su fecha de
+# modificación) mientras trabaja; si muere, el lease caduca y otro proceso
+# puede reclamar el trabajo.
+
+JOBS_FILE = 'trabajos.jsonl'
+JOB_KINDS = ('video', 'channel')
+
+
+def job_id(kind, target):
+    """ID de un trabajo: el mismo video o canal siempre tiene el mismo ID."""
+    return f"{kind}-{target}"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class Lease:
+    """Reclamación de un trabajo por un proceso."""
+
+    def __init__(self, queue, job, worker_id):
+        self.queue = queue
+        self.job = job
+        self.worker_id = worker_id
+        self.path = queue.lease_path(job['id'])
+        self.lost = False
+
+    def is_owned(self):
+        """Comprueba que el lease sigue existiendo y es de este proceso."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('worker') == self.worker_id
+        except (OSError, ValueError):
+            return False
+
+    def renew(self):
+        """Renueva el lease. Devuelve False (y marca `lost`) si otro proceso lo reclamó."""
+        if self.lost or not self.is_owned():
+            self.lost = True
+            return False
+        try:
+            os.utime(self.path)
+        except OSError:
+            self.lost = True
+        return not self.lost
+
+    def release(self):
+        if not self.lost and self.is_owned():
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class LeaseKeeper:
+    """Hilo que renueva los leases activos cada `interval` segundos."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._leases = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, lease):
+        with self._lock:
+            self._leases.add(lease)
+
+    def discard(self, lease):
+        with self._lock:
+            self._leases.discard(lease)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                leases = list(self._leases)
+            for lease in leases:
+                if not lease.renew():
+                    print(f"Se perdió el lease del trabajo {lease.job['id']}; "
+                          f"otro proceso puede haberlo reclamado.")
+                    self.discard(lease)
+
+    def close(self):
+        self._stop.set()
+
+
+class WorkQueue:
+    """Cola de trabajos (videos o canales) compartida por varios procesos.
+
+    `lease_seconds` es el tiempo tras el que un trabajo reclamado por un
+    proceso que ya no renueva su lease se considera abandonado. Debe ser
+    bastante mayor que la diferencia de hora entre las máquinas.
+    """
+
+    def __init__(self, directory, lease_seconds=300):
+        self.directory = directory
+        self.lease_seconds = lease_seconds
+        self.jobs_path = os.path.join(directory, JOBS_FILE)
+        self.leases_dir = os.path.join(directory, 'leases')
+        self.done_dir = os.path.join(directory, 'done')
+        os.makedirs(self.leases_dir, exist_ok=True)
+        os.makedirs(self.done_dir, exist_ok=True)
+        # Lectura incremental de la cola por este proceso (ver `claim_batch`)
+        self._offset = 0
+        self._seen = set()
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def lease_path(self, job_id):
+        return os.path.join(self.leases_dir, job_id)
+
+    def done_path(self, job_id):
+        return os.path.join(self.done_dir, job_id + '.json')
+
+    def add(self, kind, targets, options=None):
+        """Añade a la cola un trabajo por cada video o canal de `targets`.
+
+        Se omiten los que ya están en la cola. Las líneas se añaden con el
+        archivo bloqueado, de modo que varios productores pueden escribir a
+        la vez. Devuelve el número de trabajos añadidos.
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Tipo de trabajo no válido: {kind}")
+        known = {job['id'] for job in self.iter_jobs()}
+        lines = []
+        for target in targets:
+            job = {
+                'id': job_id(kind, target),
+                'kind': kind,
+                'target': target,
+                'options': options or {},
+                'added_at': datetime.now().isoformat(timespec='seconds')
+            }
+            if job['id'] not in known:
+                known.add(job['id'])
+                lines.append(json.dumps(job, ensure_ascii=False) + '\n')
+        if lines:
+            with open(self.jobs_path, 'a', encoding='utf-8') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.write(''.join(lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return len(lines)
+
+    def iter_jobs(self):
+        """Recorre los trabajos de la cola en orden (sin repetir IDs)."""
+        if not os.path.exists(self.jobs_path):
+            return
+        seen = set()
+        with open(self.jobs_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    job = json.loads(line)
+                except ValueError:
+                    # Línea que otro productor está escribiendo todavía
+                    continue
+                if job['id'] not in seen:
+                    seen.add(job['id'])
+                    yield job
+
+    def done_ids(self):
+        return {name[:-5] for name in os.listdir(self.done_dir) if name.endswith('.json')}
+
+    def is_done(self, job_id):
+        return os.path.exists(self.done_path(job_id))
+
+    def _lease_expired(self, path):
+        try:
+            return time.time() - os.path.getmtime(path) > self.lease_seconds
+        except FileNotFoundError:
+            return True
+
+    def claim(self, job, worker_id):
+        """Intenta reclamar un trabajo. Devuelve un `Lease` o None.
+
+        Un lease caducado se retira renombrándolo (solo un proceso puede
+        hacerlo) antes de crear el nuevo con O_EXCL, así que dos procesos
+        nunca reclaman a la vez el mismo trabajo.
+        """
+        path = self.lease_path(job['id'])
+        if os.path.exists(path):
+            if not self._lease_expired(path):
+                return None
+            stale_path = f"{path}.caducado.{worker_id}"
+            try:
+                os.rename(path, stale_path)
+            except FileNotFoundError:
+                return None
+            if not self._lease_expired(stale_path):
+                # Otro proceso lo reclamó justo antes: se le devuelve su lease
+                try:
+                    os.link(stale_path, path)
+                except FileExistsError:
+                    pass
+                os.remove(stale_path)
+                return None
+            os.remove(stale_path)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'worker': worker_id, 'claimed_at': datetime.now().isoformat(timespec='seconds')}, f)
+        # Otro proceso pudo terminarlo entre la lectura de la cola y la reclamación
+        if self.is_done(job['id']):
+            os.remove(path)
+            return None
+        return Lease(self, job, worker_id)
+
+    def complete(self, lease, result):
+        """Registra el resultado de un trabajo y libera su lease.
+
+        Si el lease se perdió (otro proceso reclamó el trabajo), no se
+        registra nada y devuelve False.
+        """
+        if lease.lost or not lease.is_owned():
+            lease.lost = True
+            return False
+        record = dict(result, id=lease.job['id'], worker=lease.worker_id,
+                      finished_at=datetime.now().isoformat(timespec='seconds'))
+        # Primero el resultado y después el lease: quien reclame el trabajo
+        # tras liberarse el lease ya lo verá terminado
+        _write_atomic(self.done_path(lease.job['id']), record)
+        lease.release()
+        return True
+
+    def _read_new_jobs(self):
+        """Añade a `_pending` los trabajos escritos en la cola desde la última lectura.
+
+        Solo se leen las líneas completas a partir de la posición guardada; una
+        línea que otro productor está escribiendo todavía se lee la próxima vez.
+        """
+        try:
+            f = open(self.jobs_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._offset += len(line)
+                try:
+                    job = json.loads(line)
+                except ValueError:
+                    continue
+                if job['id'] not in self._seen:
+                    self._seen.add(job['id'])
+                    self._pending.append(job)
+
+    def claim_batch(self, worker_id, size=1):
+        """Reclama el siguiente trabajo pendiente de la cola.
+
+        Si es un video, reclama además los siguientes videos pendientes hasta
+        `size` (para obtener su información en un solo lote); los canales se
+        reclaman de uno en uno. Devuelve la lista de leases (vacía si no hay
+        trabajos disponibles).
+
+        Cada proceso lee la cola de forma incremental y olvida los trabajos
+        que ve terminados, así que una reclamación solo recorre los trabajos
+        nuevos y los que siguen sin terminar, no la cola completa.
+        """
+        with self._lock:
+            self._read_new_jobs()
+            leases = []
+            kind = None
+            remaining = []
+            for position, job in enumerate(self._pending):
+                if leases and (kind == 'channel' or len(leases) >= size):
+                    remaining.extend(self._pending[position:])
+                    break
+                if self.is_done(job['id']):
+                    continue
+                remaining.append(job)
+                if kind and job['kind'] != kind:
+                    continue
+                lease = self.claim(job, worker_id)
+                if lease is None:
+                    continue
+                leases.append(lease)
+                kind = job['kind']
+            self._pending = remaining
+        return leases
+
+    def status(self):
+        """Devuelve el número de trabajos terminados, en curso, abandonados y pendientes."""
+        done = self.done_ids()
+        counts = {'total': 0, 'done': 0, 'leased': 0, 'expired': 0, 'pending': 0}
+        for job in self.iter_jobs():
+            counts['total'] += 1
+            path = self.lease_path(job['id'])
+            if job['id'] in done:
+                counts['done'] += 1
+            elif os.path.exists(path):
+                counts['expired' if self._lease_expired(path) else 'leased'] += 1
+            else:
+                counts['pending'] += 1
+        return counts